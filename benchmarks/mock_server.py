@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+"""Local stand-in for the chat providers, for benchmarks and offline testing
+
+Speaks OpenAI/OpenRouter server-sent events (POST /v1/chat/completions),
+the Anthropic event stream (POST /v1/messages) and Ollama NDJSON
+(POST /api/chat) and embeddings (POST /api/embed), plus their model
+listings. Point the app at it with
+OPENAI_BASE_URL / OPENROUTER_BASE_URL / ANTHROPIC_BASE_URL = http://host:port/v1
+and OLLAMA_BASE_URL = http://host:port/api in the [API] config section.
+
+    python -m benchmarks.mock_server --port 8089 --token-rate 50 --first-token-delay-ms 300
+"""
+
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+MODEL = "mock-model"
+EMBED_DIM = 64
+
+# Replies are built from this text, so every run streams the same bytes
+REPLY_TEXT = """Here is an answer with some **Markdown** in it, so rendering does real work.
+
+1. The first point explains the idea in a sentence or two.
+2. The second point adds `inline code` and a [link](https://example.com).
+
+```python
+def fibonacci(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+```
+
+A closing paragraph wraps up the reply and mentions nothing in particular.
+"""
+
+class MockSettings:
+    """Behaviour of the mock server"""
+    
+    def __init__(self, token_rate: float = 0, first_token_delay: float = 0, reply_tokens: int = 200,
+                 error_rate: float = 0, error_status: int = 500, retry_after: float = 1, seed: int = 0):
+        self.token_rate = token_rate                # Tokens per second; 0 sends as fast as possible
+        self.first_token_delay = first_token_delay  # Seconds before the first token
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate                # Fraction of requests answered with error_status
+        self.error_status = error_status
+        self.retry_after = retry_after              # Sent with 429 responses
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+    
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+def reply_tokens(count: int) -> List[str]:
+    """Split the canned reply into ``count`` word-sized tokens, repeating it as needed"""
+    words = REPLY_TEXT.replace("\n", " \n ").split(" ")
+    tokens = []
+    while len(tokens) < count:
+        for word in words:
+            if len(tokens) == count:
+                break
+            tokens.append(word if word == "\n" else word + " ")
+    return tokens
+
+def text_of(content) -> str:
+    """Text of a message or system prompt given as a string or as content blocks"""
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content)
+    return content or ""
+
+class PromptCache:
+    """Remembers prompt prefixes, like a provider's prompt cache
+    
+    A prompt is split into parts (system prompt, then each message) and
+    sized at about four characters per token. The cached part of a prompt
+    is its longest prefix of whole parts seen in an earlier prompt.
+    """
+    
+    def __init__(self):
+        self.seen = set()
+        self.lock = threading.Lock()
+    
+    def lookup(self, api: str, parts: List[str], store: bool = True) -> Tuple[int, int]:
+        """Get (cached tokens, total tokens), remembering the prefixes if ``store``"""
+        digest = hashlib.sha256(api.encode())
+        cached = total = 0
+        keys = []
+        with self.lock:
+            for part in parts:
+                digest.update(part.encode() + b"\0")
+                total += len(part) // 4 + 1
+                key = digest.hexdigest()
+                if key in self.seen:
+                    cached = total
+                keys.append(key)
+            if store:
+                self.seen.update(keys)
+        return cached, total
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = MockSettings()
+    prompt_cache = PromptCache()
+    
+    def log_message(self, *args):
+        pass
+    
+    def _send_json(self, status: int, data: Dict, headers: Dict = None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+    
+    def _write_chunk(self, data: str):
+        body = data.encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(body), body))
+        self.wfile.flush()
+    
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+    
+    def _paced(self, tokens: List[str]):
+        """Yield tokens after the first-token delay, at the configured rate"""
+        start = time.perf_counter() + self.settings.first_token_delay
+        for i, token in enumerate(tokens):
+            if self.settings.token_rate > 0:
+                due = start + i / self.settings.token_rate
+            else:
+                due = start
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield token
+    
+    def do_GET(self):
+        if self.path.endswith("/models"):
+            self._send_json(200, {"data": [{"id": MODEL, "context_length": 32768,
+                                            "pricing": {"prompt": "0", "completion": "0"}}]})
+        elif self.path.endswith("/tags"):
+            self._send_json(200, {"models": [{"name": MODEL}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        
+        if self.settings.should_fail():
+            status = self.settings.error_status
+            headers = {"Retry-After": str(self.settings.retry_after)} if status == 429 else {}
+            self._send_json(status, {"error": {"message": f"injected {status}"}}, headers)
+            return
+        
+        tokens = reply_tokens(self.settings.reply_tokens)
+        if self.path.endswith("/chat/completions"):
+            self._openai(request, tokens)
+        elif self.path.endswith("/messages"):
+            self._anthropic(request, tokens)
+        elif self.path.endswith("/api/chat"):
+            self._ollama(request, tokens)
+        elif self.path.endswith("/api/embed"):
+            self._ollama_embed(request)
+        else:
+            self._send_json(404, {"error": "not found"})
+    
+    def _openai(self, request: Dict, tokens: List[str]):
+        # Prefix caching is automatic, as with OpenAI
+        cached, total = self.prompt_cache.lookup("openai", [text_of(msg.get("content"))
+                                                            for msg in request.get("messages", [])])
+        usage = {"prompt_tokens": total, "completion_tokens": len(tokens),
+                 "prompt_tokens_details": {"cached_tokens": cached}}
+        if not request.get("stream"):
+            text = "".join(self._paced(tokens))
+            self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": text}}],
+                                  "usage": usage})
+            return
+        self._start_stream("text/event-stream")
+        for token in self._paced(tokens):
+            chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        if request.get("stream_options", {}).get("include_usage"):
+            self._write_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self._end_stream()
+    
+    def _anthropic(self, request: Dict, tokens: List[str]):
+        # Only prompts marked with cache_control are cached, as with Anthropic
+        messages = request.get("messages", [])
+        marked = any(isinstance(item.get("content"), list) and
+                     any("cache_control" in block for block in item["content"])
+                     for item in messages + [{"content": request.get("system")}])
+        parts = [text_of(request.get("system"))] + [text_of(msg.get("content")) for msg in messages]
+        cached, total = self.prompt_cache.lookup("anthropic", parts, store=marked)
+        written = total - cached if marked else 0
+        usage = {"input_tokens": total - cached - written, "output_tokens": 1,
+                 "cache_read_input_tokens": cached, "cache_creation_input_tokens": written}
+        if not request.get("stream"):
+            text = "".join(self._paced(tokens))
+            self._send_json(200, {"content": [{"type": "text", "text": text}],
+                                  "usage": dict(usage, output_tokens=len(tokens))})
+            return
+        
+        def event(name, data):
+            self._write_chunk(f"event: {name}\ndata: {json.dumps(data)}\n\n")
+        
+        self._start_stream("text/event-stream")
+        event("message_start", {"type": "message_start", "message": {"usage": usage}})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}})
+        for token in self._paced(tokens):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": token}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta", "usage": {"output_tokens": len(tokens)}})
+        event("message_stop", {"type": "message_stop"})
+        self._end_stream()
+    
+    def _ollama(self, request: Dict, tokens: List[str]):
+        if not request.get("messages"):
+            # An empty chat only loads the model
+            self._send_json(200, {"model": request.get("model"), "message": {"role": "assistant", "content": ""},
+                                  "done_reason": "load", "done": True})
+            return
+        # Ollama only evaluates the part of the prompt missing from its KV cache
+        cached, total = self.prompt_cache.lookup("ollama", [text_of(msg.get("content"))
+                                                            for msg in request.get("messages", [])])
+        counts = {"prompt_eval_count": total - cached, "eval_count": len(tokens)}
+        if not request.get("stream", True):
+            text = "".join(self._paced(tokens))
+            self._send_json(200, dict(counts, message={"role": "assistant", "content": text}, done=True))
+            return
+        self._start_stream("application/x-ndjson")
+        for token in self._paced(tokens):
+            self._write_chunk(json.dumps({"message": {"role": "assistant", "content": token}, "done": False}) + "\n")
+        self._write_chunk(json.dumps(dict(counts, message={"role": "assistant", "content": ""}, done=True)) + "\n")
+        self._end_stream()
+    
+    def _ollama_embed(self, request: Dict):
+        texts = request.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        # Deterministic vectors: texts sharing words come out similar
+        embeddings = []
+        for text in texts:
+            vector = [0.0] * EMBED_DIM
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % EMBED_DIM] += 1.0
+            embeddings.append(vector)
+        self._send_json(200, {"model": request.get("model"), "embeddings": embeddings})
+
+class MockServer:
+    """Run the mock provider server in a background thread"""
+    
+    def __init__(self, settings: MockSettings = None, host: str = "127.0.0.1", port: int = 0):
+        handler = type("Handler", (MockHandler,), {"settings": settings or MockSettings(),
+                                                   "prompt_cache": PromptCache()})
+        self.settings = handler.settings
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def base_urls(self) -> Dict[str, str]:
+        """[API] settings that point every provider at this server"""
+        return {
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "OPENROUTER_BASE_URL": f"{self.url}/v1",
+            "ANTHROPIC_BASE_URL": f"{self.url}/v1",
+            "OLLAMA_BASE_URL": f"{self.url}/api"
+        }
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Anthropic/OpenRouter/Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--token-rate", type=float, default=0, help="Tokens per second (0 = unthrottled)")
+    parser.add_argument("--first-token-delay-ms", type=float, default=0)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="Status for injected errors, e.g. 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+    
+    settings = MockSettings(args.token_rate, args.first_token_delay_ms / 1000, args.reply_tokens,
+                            args.error_rate, args.error_status, args.retry_after)
+    server = MockServer(settings, args.host, args.port)
+    print(f"Mock provider server on {server.url}")
+    for name, value in server.base_urls().items():
+        print(f"  {name} = {value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
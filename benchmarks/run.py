@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+"""Offline benchmarks for the chat client's hot paths
+
+Everything runs against a temporary config directory and the local mock
+provider server, so no API key or network access is needed:
+
+    python -m benchmarks.run                          # run everything
+    python -m benchmarks.run --only render,export     # a subset
+    python -m benchmarks.run --output before.json     # save results
+    python -m benchmarks.run --compare before.json    # diff against them
+
+Each benchmark is repeated and the median and fastest run are reported.
+Compare medians from the same machine; the saved metadata records the
+commit, Python version and whether tiktoken was available.
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+from benchmarks.mock_server import MODEL, REPLY_TEXT, MockServer, MockSettings, reply_tokens
+from terminal_llm_chat.config import Config
+from terminal_llm_chat.llm import LLMProvider, PROVIDERS
+from terminal_llm_chat.ui import TerminalUI
+from terminal_llm_chat.chat import ChatSession
+from terminal_llm_chat.messages import MessageList
+from terminal_llm_chat.tokens import TokenCounter
+
+class _Discard(io.TextIOBase):
+    """Console output sink; rendering still happens, the bytes go nowhere"""
+    
+    def write(self, text):
+        return len(text)
+    
+    def isatty(self):
+        return True
+
+class _EndOfScript(Exception):
+    """Raised by the scripted input to leave the chat loop"""
+
+class BenchEnv:
+    """A chat session wired to the mock server, with output discarded
+    
+    One session is shared by every benchmark; the turn benchmark swaps in
+    an LLMProvider per provider.
+    """
+    
+    def __init__(self, args):
+        self.args = args
+        self.config_dir = tempfile.mkdtemp(prefix="terminal-chat-bench-")
+        settings = MockSettings(token_rate=args.token_rate, first_token_delay=args.first_token_delay_ms / 1000,
+                                reply_tokens=args.reply_tokens)
+        self.server = MockServer(settings).start()
+        
+        self.config = Config(config_dir=self.config_dir)
+        for name, value in self.server.base_urls().items():
+            self.config.set("API", name, value)
+        self.config.set("API", "API_KEY", "benchmark")
+        self.config.set("API", "MODEL", MODEL)
+        self.config.set("UI", "ENABLE_SOUNDS", "false")
+        self.config.save()
+        
+        self.ui = TerminalUI(self.config)
+        self.ui.console = Console(file=_Discard(), force_terminal=True, width=100, height=40)
+        self.llms: Dict[str, LLMProvider] = {}
+        self.chat = ChatSession(self.ui, self.llm("openai"), self.config)
+    
+    def llm(self, provider: str) -> LLMProvider:
+        """Get an LLMProvider talking to ``provider`` on the mock server"""
+        if provider not in self.llms:
+            self.config.set("API", "PROVIDER", provider)
+            self.llms[provider] = LLMProvider(self.config)
+        return self.llms[provider]
+    
+    def close(self):
+        self.chat.close()
+        for llm in self.llms.values():
+            llm.close()
+        self.server.stop()
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+def conversation(count: int) -> List[Dict]:
+    """A system prompt followed by ``count`` alternating user/assistant messages"""
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"Question {i}: how would I do step {i} of the task?"})
+        else:
+            messages.append({"role": "assistant", "content": f"Answer {i}.\n\n{REPLY_TEXT}"})
+    return messages
+
+def use_conversation(session: ChatSession, messages: List[Dict]):
+    """Replace a session's conversation without going through the journal or index"""
+    session.messages = MessageList(messages)
+    session.context.reset(session.messages)
+    session._turn_starts = []
+    session._turns_scanned = 0
+
+# Each benchmark returns {case: (setup, run, units, unit)}: setup() runs
+# untimed before every repetition, run() is timed, and ``units`` of
+# ``unit`` per run give a throughput figure.
+Case = Tuple[Optional[Callable[[], None]], Callable[[], None], int, str]
+
+def bench_render(env: BenchEnv) -> Dict[str, Case]:
+    """display_ai_message throughput, streamed and static"""
+    tokens = reply_tokens(env.args.reply_tokens * 5)
+    text = "".join(tokens)
+    ui = env.ui
+    return {
+        "render.stream": (None, lambda: ui.display_ai_message(iter(tokens)), len(text), "chars"),
+        "render.static": (None, lambda: ui.display_ai_message(text, streaming=False), len(text), "chars")
+    }
+
+def bench_save_load(env: BenchEnv) -> Dict[str, Case]:
+    """cmd_save and cmd_load on a long conversation"""
+    session = env.chat
+    messages = conversation(env.args.messages)
+    count = len(messages)
+    return {
+        "save": (lambda: use_conversation(session, messages), lambda: session.cmd_save(["bench"]), count, "msgs"),
+        # Saving the same session again, as after a few more turns
+        "save.again": (None, lambda: session.cmd_save(["bench"]), count, "msgs"),
+        "load": (lambda: session.cmd_save(["bench"]), lambda: session.cmd_load(["bench"]), count, "msgs"),
+        # The compressed format written with FORMAT = compact in [ARCHIVE]
+        "save.compact": (lambda: use_conversation(session, messages),
+                         lambda: session.cmd_save(["bench.chatz"]), count, "msgs"),
+        "load.compact": (lambda: session.cmd_save(["bench.chatz"]),
+                         lambda: session.cmd_load(["bench.chatz"]), count, "msgs")
+    }
+
+def bench_export(env: BenchEnv) -> Dict[str, Case]:
+    """cmd_export in every format on a long conversation"""
+    session = env.chat
+    messages = conversation(env.args.messages)
+    setup = lambda: use_conversation(session, messages)
+    return {
+        f"export.{fmt}": (setup, lambda fmt=fmt: session.cmd_export([fmt, "bench"]), len(messages), "msgs")
+        for fmt in ("md", "txt", "html")
+    }
+
+def bench_tokens(env: BenchEnv) -> Dict[str, Case]:
+    """Counting a long conversation's tokens with a cold and a warm cache"""
+    messages = conversation(env.args.messages)
+    cold = {}
+    
+    def fresh():
+        cold["counter"] = TokenCounter(MODEL)
+        cold["messages"] = MessageList(messages)
+        # Load the encoding outside the timed part
+        cold["counter"].count("warm up")
+    
+    warm = TokenCounter(MODEL)
+    warm_messages = MessageList(messages)
+    warm.count_messages(warm_messages)
+    return {
+        "tokens.cold": (fresh, lambda: cold["counter"].count_messages(cold["messages"]), len(messages), "msgs"),
+        "tokens.warm": (None, lambda: warm.count_messages(warm_messages), len(messages), "msgs")
+    }
+
+def bench_turn(env: BenchEnv) -> Dict[str, Case]:
+    """End-to-end turns through ChatSession.run against each mock provider
+    
+    Times a run of turns from the prompt being entered to the reply being
+    rendered and stored, so it covers context packing, the HTTP request,
+    stream parsing, rendering and bookkeeping.
+    """
+    turns = env.args.turns
+    session = env.chat
+    cases = {}
+    for provider in PROVIDERS:
+        llm = env.llm(provider)
+        
+        def run(llm=llm, provider=provider):
+            session.llm = llm
+            use_conversation(session, session.messages[:1])
+            script = iter(["Tell me something."] * turns)
+            
+            def scripted_input():
+                try:
+                    return next(script)
+                except StopIteration:
+                    raise _EndOfScript()
+            
+            env.ui.get_user_input = scripted_input
+            try:
+                session.run()
+            except _EndOfScript:
+                pass
+            replies = [msg for msg in session.messages if msg["role"] == "assistant"]
+            if len(replies) != turns:
+                raise RuntimeError(f"{provider}: expected {turns} replies, got {len(replies)}")
+        
+        cases[f"turn.{provider}"] = (None, run, turns, "turns")
+    return cases
+
+def bench_memory(env: BenchEnv) -> Dict[str, Case]:
+    """Semantic memory: indexing a long conversation and recalling from it"""
+    try:
+        from terminal_llm_chat.memory import HashingVectorizer, SemanticMemory
+    except ImportError:
+        print("Skipping memory benchmarks: NumPy is not installed", file=sys.stderr)
+        return {}
+    messages = conversation(env.args.messages)
+    state = {}
+    
+    def fresh():
+        folder = tempfile.mkdtemp(dir=env.config_dir)
+        state["memory"] = SemanticMemory(folder, HashingVectorizer())
+    
+    def indexed():
+        if "indexed" not in state:
+            fresh()
+            state["memory"].add_messages("bench", messages)
+            state["indexed"] = state["memory"]
+    
+    query = "how would I do step 42 of the task?"
+    return {
+        "memory.index": (fresh, lambda: state["memory"].add_messages("bench", messages), len(messages), "msgs"),
+        "memory.recall": (indexed, lambda: state["indexed"].recall(query), 1, "queries")
+    }
+
+BENCHMARKS: Dict[str, Callable[[BenchEnv], Dict[str, Case]]] = {
+    "render": bench_render,
+    "save_load": bench_save_load,
+    "export": bench_export,
+    "tokens": bench_tokens,
+    "memory": bench_memory,
+    "turn": bench_turn
+}
+
+def measure(setup, run, repeat: int) -> List[float]:
+    """Time ``run`` ``repeat`` times, after one untimed warm-up run"""
+    times = []
+    for i in range(repeat + 1):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if i:
+            times.append(elapsed)
+    return times
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def metadata(args) -> Dict:
+    try:
+        import tiktoken  # noqa: F401
+        have_tiktoken = True
+    except ImportError:
+        have_tiktoken = False
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tiktoken": have_tiktoken,
+        "settings": {key: value for key, value in vars(args).items()
+                     if key in ("repeat", "messages", "reply_tokens", "turns", "token_rate", "first_token_delay_ms")}
+    }
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+def report(results: Dict, baseline: Dict = None):
+    """Print one line per case, with the change against a baseline if given"""
+    header = f"{'benchmark':<16} {'median':>11} {'min':>11} {'throughput':>20}"
+    if baseline:
+        header += f" {'baseline':>11} {'change':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        rate = result["units"] / result["median"] if result["median"] else 0
+        line = (f"{name:<16} {format_time(result['median']):>11} {format_time(result['min']):>11} "
+                f"{rate:>14,.0f} {result['unit'] + '/s':<5}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (result["median"] - previous["median"]) / previous["median"] * 100
+            line += f" {format_time(previous['median']):>11} {change:>+7.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for terminal-llm-chat")
+    parser.add_argument("--only", help=f"Comma-separated benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--messages", type=int, default=10000, help="Messages in the save/load/export conversation")
+    parser.add_argument("--reply-tokens", type=int, default=200, help="Tokens per mock reply")
+    parser.add_argument("--turns", type=int, default=5, help="Chat turns per end-to-end run")
+    parser.add_argument("--token-rate", type=float, default=0,
+                        help="Mock tokens per second for the turn benchmark (0 = unthrottled)")
+    parser.add_argument("--first-token-delay-ms", type=float, default=0, help="Mock delay before the first token")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Show the change against results saved with --output")
+    args = parser.parse_args()
+    
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        meta = baseline["meta"]
+        print(f"Baseline: commit {meta['commit']}, Python {meta['python']}")
+        if meta["settings"] != metadata(args)["settings"]:
+            print("Warning: the baseline was run with different settings; times are not comparable")
+    
+    env = BenchEnv(args)
+    results = {}
+    try:
+        for name in names:
+            for case, (setup, run, units, unit) in BENCHMARKS[name](env).items():
+                times = measure(setup, run, max(1, args.repeat))
+                results[case] = {"median": median(times), "min": min(times), "runs": times,
+                                 "units": units, "unit": unit}
+    finally:
+        env.close()
+    
+    report(results, baseline["results"] if baseline else None)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -32,6 +32,11 @@ setup(
         "tiktoken>=0.3.0",
         "configparser>=5.0.0",
     ],
+    extras_require={
+        "zstd": ["zstandard>=0.15.0"],
+        "memory": ["numpy>=1.17.0"],
+        "test": ["pytest>=6.0"],
+    },
     entry_points={
         "console_scripts": [
             "terminal-chat=terminal_llm_chat.main:main",
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import mmap
+import zlib
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from terminal_llm_chat.messages import Message
+
+# A compact conversation file:
+#
+#   MAGIC | block | block | ... | index (JSON) | index offset (<Q) | END
+#
+# Each block is a compressed JSON array of up to BLOCK_MESSAGES messages.
+# The index holds the conversation's metadata and each block's
+# [offset, length, message count], so it can be read without touching
+# the blocks.
+ARCHIVE_EXT = ".chatz"
+MAGIC = b"TLCHAT1\n"
+END = b"TLCHEND\n"
+_TRAILER = struct.Struct("<Q")
+
+CODECS = ("gzip", "zstd")
+
+def _zstd():
+    """The zstd module, from the standard library (3.14+) or zstandard"""
+    try:
+        from compression import zstd
+        return zstd.compress, zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+    return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+def codec(name: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Get (compress, decompress) functions for a codec name"""
+    if name == "gzip":
+        def compress(data: bytes) -> bytes:
+            # wbits=31 writes gzip framing, so a block can be checked with gunzip
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return compressor.compress(data) + compressor.flush()
+        return compress, lambda data: zlib.decompress(data, 31)
+    if name == "zstd":
+        return _zstd()
+    raise ValueError(f"Unknown compression: {name}")
+
+def title_of(content: str, width: int = 60) -> str:
+    """A one-line title from the first user message"""
+    line = content.strip().split("\n", 1)[0]
+    return line if len(line) <= width else line[:width - 3] + "..."
+
+def _message_json(msg) -> str:
+    if isinstance(msg, Message):
+        return msg.json()
+    return json.dumps({"role": msg["role"], "content": msg["content"]}, separators=(",", ":"))
+
+def write_archive(path: str, messages: Iterable, fields: Dict, compression: str = "gzip",
+                  block_messages: int = 256) -> Dict:
+    """Write a compact conversation file; returns its index
+    
+    ``messages`` is consumed once, so it may stream from another file;
+    ``fields`` (model, timestamp) is read after the last message, when a
+    streamed source has filled it in. The file is written to a temporary
+    name and renamed, so readers never see half of it.
+    """
+    compress, _ = codec(compression)
+    blocks = []
+    count = turns = 0
+    title = ""
+    temp = path + ".tmp"
+    try:
+        with open(temp, 'wb') as f:
+            f.write(MAGIC)
+            offset = len(MAGIC)
+            batch = []
+            
+            def flush():
+                nonlocal offset
+                data = compress(("[" + ",".join(batch) + "]").encode("utf-8"))
+                f.write(data)
+                blocks.append([offset, len(data), len(batch)])
+                offset += len(data)
+                batch.clear()
+            
+            for msg in messages:
+                if msg["role"] == "user":
+                    turns += 1
+                    if not title:
+                        title = title_of(msg["content"])
+                batch.append(_message_json(msg))
+                count += 1
+                if len(batch) >= block_messages:
+                    flush()
+            if batch:
+                flush()
+            
+            index = {
+                "version": 1,
+                "codec": compression,
+                "model": fields.get("model"),
+                "timestamp": fields.get("timestamp"),
+                "title": title,
+                "count": count,
+                "turns": turns,
+                "blocks": blocks
+            }
+            f.write(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+            f.write(_TRAILER.pack(offset))
+            f.write(END)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    os.replace(temp, path)
+    return index
+
+def is_archive(f) -> bool:
+    """Whether an open binary file is a compact conversation file (rewinds it)"""
+    magic = f.read(len(MAGIC))
+    f.seek(0)
+    return magic == MAGIC
+
+def read_index(f) -> Dict:
+    """Read the index of an open compact conversation file"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size < len(MAGIC) + _TRAILER.size + len(END):
+        raise ValueError("Truncated conversation archive")
+    f.seek(size - _TRAILER.size - len(END))
+    trailer = f.read(_TRAILER.size + len(END))
+    if trailer[_TRAILER.size:] != END:
+        raise ValueError("Truncated conversation archive")
+    offset, = _TRAILER.unpack(trailer[:_TRAILER.size])
+    f.seek(offset)
+    return json.loads(f.read(size - offset - len(trailer)).decode("utf-8"))
+
+def iter_archive(f) -> Iterator[Tuple[str, object]]:
+    """Like ``iter_conversation`` for a compact file: the metadata fields
+    first, then ("message", message) for each message, a block at a time
+    """
+    index = read_index(f)
+    for key in ("model", "timestamp"):
+        if index.get(key) is not None:
+            yield key, index[key]
+    _, decompress = codec(index["codec"])
+    for offset, length, _ in index["blocks"]:
+        f.seek(offset)
+        for message in json.loads(decompress(f.read(length))):
+            yield "message", message
+
+def describe(path: str) -> Dict:
+    """Manifest entry for a saved conversation of either format
+    
+    A compact file's index is read directly; a JSON file is streamed once
+    to count turns and find the title.
+    """
+    with open(path, 'rb') as f:
+        if is_archive(f):
+            index = read_index(f)
+            entry = {key: index[key] for key in Manifest.FIELDS}
+        else:
+            from terminal_llm_chat.conversation_io import iter_conversation
+            entry = {"model": None, "timestamp": None, "title": "", "count": 0, "turns": 0}
+            for key, value in iter_conversation(io.TextIOWrapper(f, encoding="utf-8")):
+                if key != "message":
+                    if key in ("model", "timestamp"):
+                        entry[key] = value
+                    continue
+                entry["count"] += 1
+                if value["role"] == "user":
+                    entry["turns"] += 1
+                    if not entry["title"]:
+                        entry["title"] = title_of(value["content"])
+    return entry
+
+class Manifest:
+    """Metadata of every saved conversation, for /list without opening them
+    
+    Entries are appended to one file as length-prefixed JSON records, a
+    later record for a name replacing earlier ones, and read back through
+    mmap. Each entry keeps the size and mtime of the file it describes;
+    files that are new or changed since (e.g. legacy JSON saves) are
+    described once and appended, and the file is rewritten when most of
+    its records are stale.
+    """
+    
+    FILENAME = ".manifest"
+    FIELDS = ("model", "timestamp", "title", "count", "turns", "blocks")
+    _LENGTH = struct.Struct("<I")
+    
+    def __init__(self, conversations_dir: str):
+        self.conversations_dir = conversations_dir
+        self.path = os.path.join(conversations_dir, self.FILENAME)
+    
+    def _read(self) -> Tuple[Dict[str, Dict], int]:
+        """Get the latest entry per name and the number of records read"""
+        entries = {}
+        records = 0
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return entries, 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    pos = 0
+                    size = len(data)
+                    while pos + self._LENGTH.size <= size:
+                        length, = self._LENGTH.unpack_from(data, pos)
+                        start = pos + self._LENGTH.size
+                        if start + length > size:
+                            # Torn by a crash mid-append
+                            break
+                        try:
+                            entry = json.loads(data[start:start + length])
+                        except ValueError:
+                            break
+                        entries[entry["name"]] = entry
+                        records += 1
+                        pos = start + length
+        except FileNotFoundError:
+            pass
+        return entries, records
+    
+    @classmethod
+    def _encode(cls, entry: Dict) -> bytes:
+        data = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        return cls._LENGTH.pack(len(data)) + data
+    
+    def _append(self, entries: List[Dict]):
+        if not entries:
+            return
+        # One write per call, so concurrent sessions' records don't interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, b"".join(self._encode(entry) for entry in entries))
+        finally:
+            os.close(fd)
+    
+    def _rewrite(self, entries: List[Dict]):
+        temp = self.path + ".tmp"
+        with open(temp, 'wb') as f:
+            f.write(b"".join(self._encode(entry) for entry in entries))
+        os.replace(temp, self.path)
+    
+    def record(self, name: str, entry: Dict):
+        """Record the metadata of a conversation that was just saved"""
+        stat = os.stat(os.path.join(self.conversations_dir, name))
+        entry = {key: entry[key] for key in self.FIELDS if key in entry}
+        self._append([dict(entry, name=name, size=stat.st_size, mtime=stat.st_mtime_ns)])
+    
+    def entries(self) -> List[Dict]:
+        """Entries for every saved conversation, newest first
+        
+        Only conversations missing from the manifest or changed since they
+        were recorded are opened.
+        """
+        known, records = self._read()
+        current = []
+        added = []
+        for item in os.scandir(self.conversations_dir):
+            if not item.name.endswith((".json", ARCHIVE_EXT)) or not item.is_file():
+                continue
+            stat = item.stat()
+            entry = known.get(item.name)
+            if entry is None or entry.get("size") != stat.st_size or entry.get("mtime") != stat.st_mtime_ns:
+                try:
+                    entry = dict(describe(item.path), name=item.name, size=stat.st_size, mtime=stat.st_mtime_ns)
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+                added.append(entry)
+            current.append(entry)
+        
+        if records + len(added) > 2 * len(current) + 100:
+            self._rewrite(current)
+        else:
+            self._append(added)
+        current.sort(key=lambda entry: entry["mtime"], reverse=True)
+        return current
+
+def convert_file(source: str, target: str, compression: str = "gzip", block_messages: int = 256) -> Dict:
+    """Rewrite a saved conversation of either format as a compact file"""
+    from terminal_llm_chat.conversation_io import iter_messages
+    fields = {}
+    return write_archive(target, iter_messages(source, fields), fields, compression, block_messages)
+
+def run_convert(conversations_dir: str, names: Optional[List[str]], compression: str,
+                block_messages: int, remove_json: bool) -> int:
+    """Convert JSON conversations to compact files from the command line"""
+    import sys
+    from terminal_llm_chat.conversation_io import find_conversation
+    
+    if not os.path.isdir(conversations_dir):
+        print(f"Conversations folder not found: {conversations_dir}", file=sys.stderr)
+        return 1
+    if names is None:
+        sources = sorted(os.path.join(conversations_dir, name) for name in os.listdir(conversations_dir)
+                         if name.endswith(".json"))
+    else:
+        sources = [find_conversation(conversations_dir, name) for name in names]
+        missing = [name for name, source in zip(names, sources) if source is None]
+        if missing:
+            print(f"Conversation not found: {', '.join(missing)}", file=sys.stderr)
+            return 1
+        sources = [source for source in sources if source.endswith(".json")]
+    
+    manifest = Manifest(conversations_dir)
+    before = after = failed = 0
+    for source in sources:
+        target = source[:-len(".json")] + ARCHIVE_EXT
+        try:
+            index = convert_file(source, target, compression, block_messages)
+            manifest.record(os.path.basename(target), index)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"{os.path.basename(source)}: {str(e)}", file=sys.stderr)
+            failed += 1
+            continue
+        before += os.path.getsize(source)
+        after += os.path.getsize(target)
+        if remove_json:
+            os.remove(source)
+    converted = len(sources) - failed
+    print(f"{converted} converted ({failed} failed), {before / 1048576:.1f} MiB -> {after / 1048576:.1f} MiB",
+          file=sys.stderr)
+    return 1 if failed else 0
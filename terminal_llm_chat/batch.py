@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class BatchRunner:
+    """Run independent prompts from a JSONL file through a worker pool
+    
+    Each input line is either ``{"prompt": "..."}`` or ``{"messages": [...]}``
+    and may set ``"id"``, ``"system"`` and ``"model"`` (``provider:model``
+    works as in /compare). One result line is written per input line, in
+    input order, as soon as every earlier line has finished. Because the
+    output is always an in-order prefix of the input, an interrupted run is
+    resumed by skipping as many inputs as there are complete output lines.
+    """
+    
+    def __init__(self, llm, concurrency: int = 8, window: Optional[int] = None):
+        self.llm = llm
+        self.concurrency = max(1, concurrency)
+        # Bound the work in flight so one slow prompt can't make the
+        # reorder buffer hold the rest of the file
+        self.window = window or self.concurrency * 4
+        # One pooled connection per worker, or requests discards them
+        self.llm.pool_size = max(self.llm.pool_size, self.concurrency)
+        self.done = 0
+        self.failed = 0
+    
+    @staticmethod
+    def completed_lines(output_path: str) -> int:
+        """Count complete result lines, cutting off a line torn by a crash"""
+        if not os.path.exists(output_path):
+            return 0
+        count = 0
+        good_end = 0
+        with open(output_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                count += 1
+                good_end += len(line)
+        if good_end != os.path.getsize(output_path):
+            with open(output_path, 'r+b') as f:
+                f.truncate(good_end)
+        return count
+    
+    @staticmethod
+    def read_inputs(input_path: str, skip: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Yield (index, request) for each non-blank input line after ``skip``"""
+        index = 0
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if index >= skip:
+                    try:
+                        request = json.loads(line)
+                    except ValueError as e:
+                        request = {"error": f"Invalid JSON: {e}"}
+                    yield index, request
+                index += 1
+    
+    def build_messages(self, request: Dict) -> List[Dict]:
+        """Turn an input request into chat messages with a system prompt"""
+        system = request.get("system", self.llm.system_prompt)
+        if "messages" in request:
+            messages = list(request["messages"])
+            if not messages or messages[0].get("role") != "system":
+                messages.insert(0, {"role": "system", "content": system})
+            return messages
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": str(request["prompt"])}
+        ]
+    
+    def run_one(self, index: int, request: Dict) -> Dict:
+        """Get the reply to one request as a result record"""
+        result = {"index": index}
+        if not isinstance(request, dict):
+            result["error"] = "Request must be a JSON object"
+            return result
+        if "id" in request:
+            result["id"] = request["id"]
+        if request.get("error"):
+            result["error"] = request["error"]
+            return result
+        if "prompt" not in request and "messages" not in request:
+            result["error"] = "Request needs a 'prompt' or 'messages' field"
+            return result
+        if not isinstance(request.get("model", ""), str):
+            result["error"] = "'model' must be a string such as provider:model"
+            return result
+        
+        start = time.perf_counter()
+        try:
+            # Without a model of its own a request may fail over like chat turns do
+            provider, model = self.llm.parse_target(request["model"]) if "model" in request else (None, None)
+            result["model"] = f"{provider or self.llm.provider}:{model or self.llm.model}"
+            chunks = self.llm.get_completion(self.build_messages(request), stream=True,
+                                             model=model, provider=provider)
+            response = "".join(chunks)
+        except Exception as e:
+            result["error"] = str(e)
+        else:
+            result["model"] = f"{chunks.provider}:{chunks.model}"
+            if response.startswith("ERROR:"):
+                result["error"] = response[len("ERROR:"):].strip()
+            else:
+                result["response"] = response
+                result["usage"] = dict(chunks.usage)
+                result["cached"] = chunks.cached
+        result["elapsed"] = round(time.perf_counter() - start, 3)
+        return result
+    
+    def run(self, input_path: str, output_path: str, progress=None) -> Dict:
+        """Process the input file, appending results to ``output_path``
+        
+        ``progress`` is called as ``progress(done, failed)`` after each write.
+        Returns counts of skipped (already done), completed and failed lines.
+        """
+        skip = self.completed_lines(output_path)
+        next_index = skip
+        inputs = self.read_inputs(input_path, skip)
+        exhausted = False
+        pending = set()
+        finished = {}
+        
+        with open(output_path, 'a', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            try:
+                while True:
+                    while not exhausted and len(pending) + len(finished) < self.window:
+                        item = next(inputs, None)
+                        if item is None:
+                            exhausted = True
+                            break
+                        pending.add(pool.submit(self.run_one, *item))
+                    if not pending:
+                        break
+                    
+                    completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        result = future.result()
+                        finished[result["index"]] = result
+                    
+                    # Write the contiguous run of finished results, in input order
+                    while next_index in finished:
+                        result = finished.pop(next_index)
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                        self.done += 1
+                        if "error" in result:
+                            self.failed += 1
+                        next_index += 1
+                    out.flush()
+                    if progress:
+                        progress(self.done, self.failed)
+            except KeyboardInterrupt:
+                # Drop queued work; the pool still waits for running requests
+                for future in pending:
+                    future.cancel()
+                raise
+        
+        return {"skipped": skip, "completed": self.done, "failed": self.failed}
+
+def run_batch(llm, input_path: str, output_path: str, concurrency: int) -> int:
+    """Run a batch from the command line, reporting progress on stderr"""
+    if not os.path.exists(input_path):
+        print(f"Input file not found: {input_path}", file=sys.stderr)
+        return 1
+    
+    start = time.perf_counter()
+    interactive = sys.stderr.isatty()
+    
+    def progress(done, failed):
+        if interactive:
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            sys.stderr.write(f"\r{done} done, {failed} failed ({rate:.1f}/s)")
+            sys.stderr.flush()
+    
+    # Requests also share the provider's rate limiter, which caps them first
+    limit = llm.limiter(llm.provider).max_concurrency
+    if concurrency > limit:
+        print(f"Warning: [RATE_LIMIT] MAX_CONCURRENCY is {limit}, so at most {limit} requests "
+              f"run at once against {llm.provider}, not {concurrency}", file=sys.stderr)
+    
+    runner = BatchRunner(llm, concurrency)
+    try:
+        counts = runner.run(input_path, output_path, progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after {runner.done} results; run again to resume.", file=sys.stderr)
+        return 130
+    if interactive:
+        sys.stderr.write("\n")
+    elapsed = time.perf_counter() - start
+    print(f"{counts['completed']} completed ({counts['failed']} failed), "
+          f"{counts['skipped']} already done, in {elapsed:.1f}s", file=sys.stderr)
+    return 1 if counts["failed"] else 0
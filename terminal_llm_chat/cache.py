@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+class ResponseCache:
+    """On-disk SQLite cache of completed responses
+    
+    Entries expire after a TTL and the least recently used ones are evicted
+    once the cache grows past its entry or size limit.
+    """
+    
+    def __init__(self, config):
+        self.path = os.path.join(config.config_dir, "response_cache.sqlite3")
+        self.ttl = config.get_int("CACHE", "TTL", 7 * 24 * 3600)
+        self.max_entries = config.get_int("CACHE", "MAX_ENTRIES", 10000)
+        self.max_bytes = config.get_int("CACHE", "MAX_BYTES", 100 * 1024 * 1024)
+        self.force = config.get_bool("CACHE", "FORCE", False)
+        self.hits = 0
+        self.misses = 0
+        
+        # Shared by the worker threads of /compare, so guard it with a lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                usage TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.db.commit()
+    
+    def make_key(self, provider: str, model: str, system_prompt: str, messages: List[Dict],
+                 temperature: float, max_tokens: int) -> str:
+        """Hash everything that determines a response into a cache key"""
+        request = json.dumps([provider, model, system_prompt, messages, temperature, max_tokens],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+    
+    def should_cache(self, temperature: float) -> bool:
+        """Only deterministic requests are cached unless FORCE is set"""
+        return self.force or temperature <= 0
+    
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """Get a cached (response, usage) pair, or None on a miss"""
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT response, usage, created FROM responses WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is None or (self.ttl > 0 and row[2] + self.ttl < now):
+                if row is not None:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.db.commit()
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.hits += 1
+        return row[0], json.loads(row[1])
+    
+    def put(self, key: str, response: str, usage: Dict):
+        """Store a response and evict old entries if over the limits"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, response, json.dumps(usage), size, now, now))
+            self._evict()
+            self.db.commit()
+    
+    def _evict(self):
+        """Drop expired entries, then least recently used ones over the limits"""
+        if self.ttl > 0:
+            self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        
+        excess_count = max(0, count - self.max_entries)
+        excess_bytes = max(0, total - self.max_bytes)
+        doomed = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if excess_count <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_count -= 1
+            excess_bytes -= size
+        self.db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+    
+    def stats(self) -> Dict:
+        """Get entry count, size on disk and this session's hit rate"""
+        with self.lock:
+            count, total = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "path": self.path
+        }
+    
+    def clear(self):
+        """Delete all cached responses"""
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+            self.db.execute("VACUUM")
+        self.hits = 0
+        self.misses = 0
+    
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.db.close()
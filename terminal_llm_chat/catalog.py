@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+# Models to offer when a provider's model list can't be fetched
+FALLBACK_MODELS = {
+    "openai": ["gpt-3.5-turbo", "gpt-4"],
+    "anthropic": [
+        "claude-3-opus",
+        "claude-3-sonnet",
+        "claude-3-haiku",
+        "claude-2.1",
+        "claude-2.0",
+        "claude-instant-1.2"
+    ],
+    "openrouter": ["openai/gpt-3.5-turbo", "anthropic/claude-3-opus"],
+    "ollama": ["llama3", "mistral", "gemma"]
+}
+
+class ModelCatalog:
+    """Per-provider model lists and metadata cached in the config dir
+    
+    Entries are refreshed in background threads once they are older than
+    the provider's TTL, so listing models never waits on the network unless
+    nothing has been cached yet.
+    """
+    
+    def __init__(self, llm, config):
+        self.llm = llm
+        self.config = config
+        self.path = os.path.join(config.config_dir, "models_cache.json")
+        self.default_ttl = config.get_int("CATALOG", "TTL", 24 * 3600)
+        self.lock = threading.Lock()
+        self.refreshing = {}
+        self.errors = {}
+        self.entries = self._load()
+    
+    def _load(self) -> Dict:
+        """Read the cached catalog from disk"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save(self):
+        """Write the catalog to disk atomically"""
+        with self.lock:
+            data = json.dumps(self.entries)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+    
+    def ttl(self, provider: str) -> int:
+        """Get the refresh interval for a provider in seconds"""
+        # Local Ollama models change more often than hosted catalogs
+        default = 300 if provider == "ollama" else self.default_ttl
+        return self.config.get_int("CATALOG", f"{provider.upper()}_TTL", default)
+    
+    def is_stale(self, provider: str) -> bool:
+        """Check whether a provider's entry is missing or past its TTL"""
+        entry = self.entries.get(provider)
+        return entry is None or entry["fetched"] + self.ttl(provider) < time.time()
+    
+    def refresh(self, provider: str):
+        """Fetch a provider's models now and update the cache"""
+        try:
+            models = self.llm.fetch_models(provider)
+        except Exception as e:
+            self.errors[provider] = str(e)
+            return
+        self.errors.pop(provider, None)
+        with self.lock:
+            self.entries[provider] = {"fetched": time.time(), "models": models}
+        self._save()
+    
+    def refresh_async(self, provider: str) -> threading.Thread:
+        """Refresh a provider in a background thread unless one is running"""
+        with self.lock:
+            thread = self.refreshing.get(provider)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self.refresh, args=(provider,), daemon=True)
+                self.refreshing[provider] = thread
+                thread.start()
+        return thread
+    
+    def prefetch(self, providers: Optional[List[str]] = None):
+        """Start background refreshes for stale providers"""
+        for provider in providers or [self.llm.provider]:
+            if self.is_stale(provider):
+                self.refresh_async(provider)
+    
+    def get_models(self, provider: str) -> List[str]:
+        """Get a provider's model names, refreshing stale entries in the background"""
+        if provider not in self.entries and provider not in self.errors:
+            # Nothing cached yet, so this one time wait for the fetch
+            self.refresh_async(provider).join()
+        elif self.is_stale(provider):
+            self.refresh_async(provider)
+        
+        entry = self.entries.get(provider)
+        if entry is None:
+            return FALLBACK_MODELS.get(provider, [self.llm.model])
+        return list(entry["models"])
+    
+    def model_info(self, model: str, provider: Optional[str] = None) -> Dict:
+        """Get cached metadata (context_length, pricing) for a model"""
+        providers = [provider] if provider else list(self.entries)
+        for name in providers:
+            info = self.entries.get(name, {}).get("models", {}).get(model)
+            if info:
+                return info
+        return {}
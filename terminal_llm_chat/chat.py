@@ -2,49 +2,338 @@
 
 import os
 import json
+import time
+import sqlite3
 from datetime import datetime
+from itertools import islice
 from typing import List, Dict
+from terminal_llm_chat.archive import ARCHIVE_EXT, Manifest, title_of, write_archive
+from terminal_llm_chat.context import ContextWindow
+from terminal_llm_chat.conversation_io import EXTENSIONS, find_conversation, read_conversation
+from terminal_llm_chat.export import FORMATS, write_export
+from terminal_llm_chat.journal import SessionJournal
+from terminal_llm_chat.messages import Message, MessageList
+from terminal_llm_chat.profiling import TurnProfiler
+from terminal_llm_chat.store import ConversationStore
+from terminal_llm_chat.tokens import TokenCounter, UsageTracker
 
 class ChatSession:
     def __init__(self, ui, llm, config):
         self.ui = ui
         self.llm = llm
         self.config = config
-        self.messages = []
+        self.messages = MessageList()
+        self.token_counter = TokenCounter(self.llm.model)
+        self.usage = UsageTracker(catalog=self.llm.catalog)
+        slack = config.get_float("PROMPT_CACHE", "TRIM_SLACK", 0.2) if self.llm.prompt_cache else 0.0
+        self.context = ContextWindow(self.token_counter, self.llm.max_tokens,
+                                     config.get_int("SYSTEM", "CONTEXT_WINDOW", 0),
+                                     catalog=self.llm.catalog, slack=slack)
+        self.report_prompt_cache = config.get_bool("PROMPT_CACHE", "REPORT", True)
         self.history_file = os.path.join(config.config_dir, "history")
         self.conversations_dir = os.path.join(config.config_dir, "conversations")
+        self.manifest = Manifest(self.conversations_dir)
+        self.save_format = config.get("ARCHIVE", "FORMAT", "json").lower()
+        self.compression = config.get("ARCHIVE", "COMPRESSION", "gzip").lower()
+        self.block_messages = max(1, config.get_int("ARCHIVE", "BLOCK_MESSAGES", 256))
+        
+        self.journal_dir = os.path.join(config.config_dir, "journal")
+        
+        # Paging through long conversations with /more and /history
+        self.page_size = config.get_int("UI", "LOAD_TURNS", 10)
+        self.history_cursor = 0
+        self._turn_starts = []
+        self._turns_scanned = 0
         
         # Create history and conversations directories if they don't exist
         os.makedirs(self.history_file, exist_ok=True)
         os.makedirs(self.conversations_dir, exist_ok=True)
         
+        # Autosave every message to an append-only journal
+        self.journal = None
+        if config.get_bool("JOURNAL", "ENABLED", True):
+            fsync_interval = config.get_int("JOURNAL", "FSYNC_INTERVAL_MS", 200) / 1000
+            self.journal = SessionJournal(self.journal_dir, self.llm.model, fsync_interval)
+        
+        # Full-text index of this and all saved conversations
+        self.store = None
+        self.conversation_id = None
+        # A loaded conversation being indexed on a worker thread, and the
+        # messages added meanwhile, written once it has an id
+        self.indexer = None
+        self.store_indexing = None
+        self.store_pending = []
+        if config.get_bool("STORE", "ENABLED", True):
+            try:
+                self.store = ConversationStore(config.config_dir)
+            except sqlite3.Error as e:
+                # e.g. an SQLite build without FTS5
+                self.ui.display_error(f"Conversation search unavailable: {str(e)}")
+        session_name = self.journal.session_id if self.journal else datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Created with the first indexed message, so sessions that never
+        # say anything leave nothing behind
+        self.store_name = f"session_{session_name}"
+        
+        # Snippets of this and saved conversations recalled into the prompt by similarity
+        self.memory = None
+        self.memory_source = f"session_{session_name}"
+        self.last_recall = []
+        if config.get_bool("MEMORY", "ENABLED", False):
+            self.memory = self.open_memory(config)
+        
+        # CPU and allocation profiles per turn, for /profile and --profile
+        self.profiler = TurnProfiler(config.config_dir, self.ui.display_system_message,
+                                     top=config.get_int("PROFILE", "TOP", 20),
+                                     sample_interval=config.get_int("PROFILE", "SAMPLE_MS", 0) / 1000,
+                                     memory=config.get_bool("PROFILE", "MEMORY", True))
+        
         # Add system message
         self.add_message("system", self.llm.system_prompt)
     
+    def open_memory(self, config):
+        """Set up semantic memory, or return None if NumPy is missing"""
+        try:
+            from terminal_llm_chat.memory import HashingVectorizer, OllamaEmbedder, SemanticMemory
+        except ImportError:
+            self.ui.display_error("Semantic memory needs NumPy (pip install numpy)")
+            return None
+        
+        embedder = config.get("MEMORY", "EMBEDDER", "hash")
+        if embedder.startswith("ollama:"):
+            embedder = OllamaEmbedder(self.llm, embedder[len("ollama:"):])
+        else:
+            embedder = HashingVectorizer(config.get_int("MEMORY", "DIM", 1024))
+        memory = SemanticMemory(config.config_dir, embedder,
+                                chunk_chars=config.get_int("MEMORY", "CHUNK_CHARS", 800),
+                                top_k=config.get_int("MEMORY", "TOP_K", 4),
+                                min_score=config.get_float("MEMORY", "MIN_SCORE", 0.2))
+        # Older turns are left to recall instead of being resent every time
+        self.context.history_limit = config.get_int("MEMORY", "HISTORY_TOKENS", 4000)
+        if config.get_bool("MEMORY", "INDEX_SAVED", True):
+            memory.index_directory_async(self.conversations_dir)
+        return memory
+    
     def add_message(self, role, content):
         """Add a message to the conversation"""
-        self.messages.append({"role": role, "content": content})
+        message = self.messages.append(Message(role, content))
+        self.context.append(message)
+        if self.journal:
+            self.journal.add_message(message)
+        if self.store and role != "system":
+            # Numbered by user turn, as /history counts them
+            turn = len(self.turn_starts())
+            if self.finish_indexing():
+                self.use_store(lambda store: self.index_message(store, turn, role, content))
+            else:
+                self.store_pending.append((turn, role, content))
+        if self.memory:
+            self.memory.add_message(self.memory_source, len(self.messages) - 1, role, content)
+    
+    def use_store(self, use):
+        """Run ``use(store)`` against the search index
+        
+        A database error (e.g. another instance holding a lock past the
+        busy timeout) turns search off for the session instead of ending
+        it. Returns None when search is off.
+        """
+        if not self.store:
+            return None
+        try:
+            return use(self.store)
+        except sqlite3.Error as e:
+            self.ui.display_error(f"Conversation search disabled: {str(e)}")
+            try:
+                self.store.db.close()
+            except sqlite3.Error:
+                pass
+            self.store = None
+            return None
+    
+    def index_message(self, store, turn, role, content):
+        """Index a new message, creating the session's conversation first if needed"""
+        if self.conversation_id is None:
+            self.conversation_id = store.start_conversation(self.store_name, self.llm.model)
+        store.add_message(self.conversation_id, turn, role, content)
+    
+    def index_in_background(self, name, messages, count, model, source_mtime):
+        """Index the first ``count`` messages under ``name`` on a worker thread
+        
+        The worker uses its own connection; ``finish_indexing`` picks up the
+        conversation id when it is done.
+        """
+        if self.indexer is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.indexer = ThreadPoolExecutor(max_workers=1)
+        config_dir = self.config.config_dir
+        
+        def index():
+            store = ConversationStore(config_dir)
+            try:
+                return store.index_messages(name, islice(messages, count), model, source_mtime)
+            finally:
+                store.close()
+        
+        self.conversation_id = None
+        self.store_indexing = self.indexer.submit(index)
+    
+    def finish_indexing(self, wait=False) -> bool:
+        """Take the id from a finished background index and write the held messages
+        
+        Returns False if indexing is still running and ``wait`` is not set.
+        """
+        if self.store_indexing is None:
+            return True
+        if not wait and not self.store_indexing.done():
+            return False
+        indexing, self.store_indexing = self.store_indexing, None
+        pending, self.store_pending = self.store_pending, []
+        
+        def finish(store):
+            conversation_id = indexing.result()
+            for turn, role, content in pending:
+                store.add_message(conversation_id, turn, role, content)
+            return conversation_id
+        
+        self.conversation_id = self.use_store(finish)
+        return True
+    
+    def recover_journal(self):
+        """Offer to restore a session that did not exit cleanly"""
+        if not self.journal:
+            return
+        
+        for path in reversed(SessionJournal.find_unfinished(self.journal_dir, exclude=self.journal.path)):
+            try:
+                data = SessionJournal.replay(path)
+            except Exception as e:
+                self.ui.display_error(f"Could not read unfinished session {os.path.basename(path)}: {str(e)}")
+                SessionJournal.mark_ended(path)
+                continue
+            
+            turns = sum(1 for msg in data["messages"] if msg["role"] == "user")
+            if turns == 0:
+                SessionJournal.mark_ended(path)
+                continue
+            
+            started = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M")
+            recover = self.ui.confirm(f"Recover unfinished session from {started} ({turns} turns)?")
+            SessionJournal.mark_ended(path)
+            if recover:
+                self.messages = MessageList(data["messages"])
+                self.context.reset(self.messages)
+                if data["model"]:
+                    self.llm.set_model(data["model"])
+                self.journal.reset(self.messages, self.llm.model)
+                self.conversation_id = self.use_store(lambda store: store.index_messages(
+                    f"session_{self.journal.session_id}", self.messages, self.llm.model))
+                self.ui.display_system_message(f"Recovered {len(self.messages)} messages")
+                return
+    
+    def close(self):
+        """Finish the session's journal and search index"""
+        if self.journal:
+            self.journal.close()
+            SessionJournal.prune(self.journal_dir, self.config.get_int("JOURNAL", "KEEP", 20))
+        self.finish_indexing(wait=True)
+        if self.indexer:
+            self.indexer.shutdown()
+            self.indexer = None
+        self.use_store(lambda store: store.close())
+        self.store = None
+        if self.memory:
+            self.memory.close()
+            self.memory = None
     
     def run(self):
         """Run the main chat loop"""
         while True:
             user_input = self.ui.get_user_input()
-            
-            # Check if it's a command
-            if user_input.startswith("/"):
-                self.handle_command(user_input)
-                continue
-            
-            # Process normal user message
-            self.add_message("user", user_input)
-            
-            # Get AI response
-            try:
-                response = self.llm.get_completion(self.messages)
-                self.add_message("assistant", response)
-                self.ui.display_ai_message(response)
-            except Exception as e:
-                self.ui.display_error(f"Error getting AI response: {str(e)}")
+            with self.profiler.turn() as turn:
+                # Check if it's a command
+                if user_input.startswith("/"):
+                    self.handle_command(user_input)
+                    continue
+                
+                # Process normal user message
+                self.add_message("user", user_input)
+                self.respond(turn)
+    
+    def respond(self, turn):
+        """Get, display and store the AI's reply to the conversation so far"""
+        chunks = None
+        try:
+            start = time.perf_counter()
+            request = self.context.pack(self.messages, self.llm.model)
+            if self.memory:
+                request = self.add_recall(request)
+            chunks = self.llm.get_completion(request, stream=True)
+            turn.phase("build", time.perf_counter() - start)
+            # Recorded below, once the render time is known too
+            chunks.auto_record = False
+            response = self.ui.display_ai_message(turn.stream(chunks))
+            turn.phase("rendering", self.ui.last_render_time)
+            if chunks.metrics:
+                chunks.metrics["render"] = self.ui.last_render_time
+                self.llm.metrics.record(chunks.metrics)
+            self.record_usage(chunks.model, chunks.usage, request, response, chunks.cached)
+            if self.report_prompt_cache and "cached_tokens" in chunks.usage:
+                self.display_prompt_cache(chunks.usage)
+            if (chunks.provider, chunks.model) != (self.llm.provider, self.llm.model):
+                self.ui.display_system_message(f"Answered by {chunks.provider}:{chunks.model} (failover)")
+            self.add_message("assistant", response)
+        except Exception as e:
+            if chunks is not None and chunks.metrics:
+                self.llm.metrics.record(chunks.metrics)
+            self.ui.display_error(f"Error getting AI response: {str(e)}")
+    
+    def add_recall(self, request):
+        """Put snippets of earlier conversations relevant to the newest message
+        in front of it
+        
+        They go into the last message rather than a system message, so the
+        start of the prompt, and the provider's cache of it, stays the same.
+        """
+        last = request[-1]
+        if last["role"] != "user":
+            return request
+        try:
+            # Messages already in the prompt needn't be recalled
+            self.last_recall = self.memory.recall(last["content"], exclude=[msg["content"] for msg in request])
+        except Exception as e:
+            self.ui.display_error(f"Memory recall failed: {str(e)}")
+            return request
+        if self.last_recall:
+            content = f"{self.memory.format_recall(self.last_recall)}\n\n---\n\n{last['content']}"
+            request[-1] = dict(last, content=content)
+        return request
+    
+    def record_usage(self, model, usage, messages, response, cached=False):
+        """Add a request's token usage to the session totals
+        
+        Uses the counts reported by the provider when available and local
+        estimates otherwise; responses served from the cache cost nothing and
+        are not added. Returns the (prompt, completion) token counts.
+        """
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        else:
+            prompt_tokens = self.token_counter.count_messages(messages)
+            completion_tokens = self.token_counter.count(response)
+        if not cached:
+            self.usage.record(model, prompt_tokens, completion_tokens, estimated=not usage,
+                              cached_tokens=(usage or {}).get("cached_tokens", 0))
+        return prompt_tokens, completion_tokens
+    
+    def display_prompt_cache(self, usage):
+        """Show how much of the last prompt the provider read from its cache"""
+        prompt = usage.get("prompt_tokens", 0)
+        read = usage["cached_tokens"]
+        share = f" ({100 * read / prompt:.0f}%)" if prompt else ""
+        message = f"Prompt cache: {read} of {prompt} prompt tokens read{share}"
+        if usage.get("cache_write_tokens"):
+            message += f", {usage['cache_write_tokens']} written"
+        self.ui.display_system_message(message)
     
     def handle_command(self, command):
         """Handle chat commands"""
@@ -62,11 +351,21 @@ class ChatSession:
             "/quit": self.cmd_exit,
             "/save": self.cmd_save,
             "/load": self.cmd_load,
+            "/list": self.cmd_list,
+            "/more": self.cmd_more,
+            "/history": self.cmd_history,
             "/theme": self.cmd_theme,
             "/system": self.cmd_system,
             "/models": self.cmd_models,
             "/model": self.cmd_model,
+            "/compare": self.cmd_compare,
             "/tokens": self.cmd_tokens,
+            "/cache": self.cmd_cache,
+            "/search": self.cmd_search,
+            "/recall": self.cmd_recall,
+            "/stats": self.cmd_stats,
+            "/profile": self.cmd_profile,
+            "/warm": self.cmd_warm,
             "/export": self.cmd_export
         }
         
@@ -83,11 +382,21 @@ class ChatSession:
             "/exit, /quit": "Exit the application",
             "/save [filename]": "Save the current conversation",
             "/load [filename]": "Load a previous conversation",
+            "/list [count]": "List saved conversations, newest first",
+            "/more": "Show earlier turns of a loaded conversation",
+            "/history <from>-<to>": "Show a range of turns",
             "/theme [name]": "Change the color theme",
             "/system [prompt]": "View or change the system instructions",
-            "/models": "List available AI models",
+            "/models [refresh]": "List available AI models",
             "/model [name]": "Switch to a different model",
+            "/compare <models...>": "Ask several models the last question in parallel",
             "/tokens": "Show token usage statistics",
+            "/cache [stats|clear|on|off]": "Manage the response cache",
+            "/search <query>": "Search all saved conversations (--reindex to rescan files)",
+            "/recall [query]": "Show the snippets semantic memory recalls for a query",
+            "/stats [reset]": "Show latency percentiles per model",
+            "/profile [on|off]": "Profile CPU time and memory of each turn",
+            "/warm [models...]": "Preload Ollama models, or show their status",
             "/export [format]": "Export conversation (md, txt, html)"
         }
         self.ui.display_help(commands)
@@ -99,64 +408,181 @@ class ChatSession:
     
     def cmd_exit(self, args):
         """Exit the application"""
+        self.close()
+        self.llm.close()
         self.ui.display_exit_message()
         exit(0)
     
     def cmd_save(self, args):
         """Save the current conversation"""
         filename = args[0] if args else f"conversation_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        if not filename.endswith(".json"):
-            filename += ".json"
+        if not filename.endswith(EXTENSIONS):
+            filename += ARCHIVE_EXT if self.save_format == "compact" else ".json"
         
         filepath = os.path.join(self.conversations_dir, filename)
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump({
-                    "messages": self.messages,
-                    "model": self.llm.model,
-                    "timestamp": datetime.now().isoformat()
-                }, f, indent=2)
+            fields = {
+                "model": self.llm.model,
+                "timestamp": datetime.now().isoformat()
+            }
+            if filename.endswith(ARCHIVE_EXT):
+                index = write_archive(filepath, self.messages, fields, self.compression, self.block_messages)
+            else:
+                with open(filepath, 'w') as f:
+                    # Each message's JSON is cached, so saving again only encodes new ones.
+                    # The model goes first so exports can stream the messages.
+                    header = json.dumps(fields, separators=(",", ":"))
+                    f.write(header[:-1] + ',"messages":')
+                    self.messages.write_json(f)
+                    f.write("}")
+                index = None
+            # Everything so far is in the saved file; the journal only needs what follows
+            if self.journal:
+                self.journal.compact(filepath, len(self.messages), self.llm.model)
+            mtime = os.path.getmtime(filepath)
+            self.finish_indexing(wait=True)
+            if self.conversation_id is None:
+                # Nothing indexed yet; later messages go under the saved name
+                self.store_name = filename
+            else:
+                self.use_store(lambda store: store.rename(self.conversation_id, filename, mtime))
+            self.record_manifest(filename, fields, index)
+            self.memory_source = filename
             self.ui.display_system_message(f"Conversation saved to {filename}")
         except Exception as e:
             self.ui.display_error(f"Error saving conversation: {str(e)}")
     
+    def record_manifest(self, filename, fields, index):
+        """Add a just-saved conversation to the manifest behind /list"""
+        if index is None:
+            starts = self.turn_starts()
+            first = self.messages[starts[0]].content if starts else ""
+            index = dict(fields, title=title_of(first) if starts else "",
+                         count=len(self.messages), turns=len(starts))
+        try:
+            self.manifest.record(filename, index)
+        except OSError:
+            # /list describes the file itself next time
+            pass
+    
     def cmd_load(self, args):
         """Load a previous conversation"""
         if not args:
             self.ui.display_error("Please specify a file to load")
             return
         
-        filename = args[0]
-        if not filename.endswith(".json"):
-            filename += ".json"
-        
-        filepath = os.path.join(self.conversations_dir, filename)
-        
-        if not os.path.exists(filepath):
-            self.ui.display_error(f"File not found: {filename}")
+        filepath = find_conversation(self.conversations_dir, args[0])
+        if filepath is None:
+            self.ui.display_error(f"File not found: {args[0]}")
             return
+        filename = os.path.basename(filepath)
         
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            data = read_conversation(filepath, MessageList())
             
             self.messages = data["messages"]
+            self.context.reset(self.messages)
             if "model" in data:
                 self.llm.set_model(data["model"])
+            # The file already holds every loaded message; journal a pointer to it
+            if self.journal:
+                self.journal.compact(filepath, len(self.messages), self.llm.model)
+            # Keep indexing new messages under the loaded conversation. It is
+            # only indexed again, off the UI thread, if it changed since.
+            self.finish_indexing(wait=True)
+            mtime = os.path.getmtime(filepath)
+            count = sum(1 for msg in self.messages if msg.role != "system")
+            self.conversation_id = self.use_store(lambda store: store.find_indexed(filename, mtime, count))
+            if self.store and self.conversation_id is None:
+                self.index_in_background(filename, self.messages, len(self.messages), self.llm.model, mtime)
+            # Saved conversations are indexed for recall in the background
+            self.memory_source = filename
+            
+            self._turn_starts = []
+            self._turns_scanned = 0
+            total = len(self.turn_starts())
             
             self.ui.clear_screen()
-            self.ui.display_system_message(f"Loaded conversation from {filename}")
+            self.ui.display_system_message(f"Loaded conversation from {filename} ({total} turns)")
             
-            # Display conversation
-            for msg in self.messages:
-                if msg["role"] == "user":
-                    self.ui.display_user_message(msg["content"])
-                elif msg["role"] == "assistant":
-                    self.ui.display_ai_message(msg["content"], streaming=False)
+            # Only render the tail; older turns are paged in on demand
+            self.history_cursor = max(0, total - self.page_size)
+            if self.history_cursor > 0:
+                self.ui.display_system_message(
+                    f"Showing the last {total - self.history_cursor} turns. "
+                    "Use /more for earlier turns or /history <from>-<to>."
+                )
+            self.display_turns(self.history_cursor, total)
         except Exception as e:
             self.ui.display_error(f"Error loading conversation: {str(e)}")
     
+    def cmd_list(self, args):
+        """List saved conversations from the manifest"""
+        start = time.perf_counter()
+        try:
+            entries = self.manifest.entries()
+        except OSError as e:
+            self.ui.display_error(f"Error listing conversations: {str(e)}")
+            return
+        elapsed = time.perf_counter() - start
+        limit = int(args[0]) if args and args[0].isdigit() else 0
+        self.ui.display_conversation_list(entries[:limit] if limit else entries, len(entries), elapsed)
+    
+    def turn_starts(self) -> List[int]:
+        """Get the message index where each turn (a user message onwards) starts"""
+        for i in range(self._turns_scanned, len(self.messages)):
+            if self.messages[i].role == "user":
+                self._turn_starts.append(i)
+        self._turns_scanned = len(self.messages)
+        return self._turn_starts
+    
+    def display_turns(self, start, end):
+        """Render turns start..end-1 (0-based) of the conversation"""
+        starts = self.turn_starts()
+        if start >= end:
+            return
+        last = starts[end] if end < len(starts) else len(self.messages)
+        for msg in self.messages[starts[start]:last]:
+            if msg["role"] == "user":
+                self.ui.display_user_message(msg["content"])
+            elif msg["role"] == "assistant":
+                self.ui.display_ai_message(msg["content"], streaming=False)
+    
+    def cmd_more(self, args):
+        """Show the page of turns before the earliest one shown"""
+        if self.history_cursor <= 0:
+            self.ui.display_system_message("No earlier turns")
+            return
+        
+        end = self.history_cursor
+        self.history_cursor = max(0, end - self.page_size)
+        self.ui.display_system_message(f"Turns {self.history_cursor + 1}-{end} of {len(self.turn_starts())}")
+        self.display_turns(self.history_cursor, end)
+    
+    def cmd_history(self, args):
+        """Show a range of turns, e.g. /history 10-20"""
+        total = len(self.turn_starts())
+        if not args:
+            self.ui.display_system_message(f"{total} turns in this conversation. Use /history <from>-<to> to show some.")
+            return
+        
+        try:
+            first, _, last = args[0].partition("-")
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            self.ui.display_error("Usage: /history <from>-<to> (turn numbers start at 1)")
+            return
+        
+        first = max(1, first)
+        last = min(total, last)
+        if first > last:
+            self.ui.display_error(f"No turns in that range; this conversation has {total}")
+            return
+        self.ui.display_system_message(f"Turns {first}-{last} of {total}")
+        self.display_turns(first - 1, last)
+    
     def cmd_theme(self, args):
         """Change the color theme"""
         if not args:
@@ -191,6 +617,8 @@ class ChatSession:
             if msg["role"] == "system":
                 self.messages[i]["content"] = new_prompt
                 break
+        if self.journal:
+            self.journal.update_system(new_prompt)
         
         self.config.set("SYSTEM", "DEFAULT_PROMPT", new_prompt)
         self.config.save()
@@ -199,9 +627,14 @@ class ChatSession:
     def cmd_models(self, args):
         """List available AI models"""
         try:
+            if args and args[0].lower() == "refresh":
+                self.llm.catalog.refresh(self.llm.provider)
             models = self.llm.get_available_models()
             self.ui.display_system_message(f"Current model: {self.llm.model}")
             self.ui.display_system_message(f"Available models:\n{', '.join(models)}")
+            error = self.llm.catalog.errors.get(self.llm.provider)
+            if error:
+                self.ui.display_error(f"Could not refresh the model list, showing cached or default models: {error}")
         except Exception as e:
             self.ui.display_error(f"Error fetching models: {str(e)}")
     
@@ -217,11 +650,236 @@ class ChatSession:
         self.config.set("API", "MODEL", model)
         self.config.save()
         self.ui.display_system_message(f"Model changed to {model}")
+        if self.llm.auto_warm:
+            self.llm.warm_up()
+    
+    def cmd_warm(self, args):
+        """Load Ollama models in the background, or show their status"""
+        if not args:
+            if not self.llm.warm_status:
+                self.ui.display_system_message("No models warmed yet. Use /warm <model> [model...]")
+            for model, status in self.llm.warm_status.items():
+                self.ui.display_system_message(f"{model}: {status}")
+            return
+        
+        for target in args:
+            provider, model = self.llm.parse_target(target)
+            if provider != "ollama":
+                self.ui.display_system_message(f"{target}: only local Ollama models need warming")
+            elif self.llm.warm_up(model, provider):
+                self.ui.display_system_message(f"Loading {model} in the background")
+            else:
+                self.ui.display_system_message(f"{model} is already loading")
+    
+    def cmd_compare(self, args):
+        """Send the conversation to several models in parallel"""
+        if len(args) < 2:
+            self.ui.display_error("Usage: /compare <model> <model> [...] (use provider:model for other providers)")
+            return
+        
+        # Re-ask the most recent user message, dropping any reply to it
+        last_user = None
+        for i in range(len(self.messages) - 1, -1, -1):
+            if self.messages[i]["role"] == "user":
+                last_user = i
+                break
+        if last_user is None:
+            self.ui.display_error("Send a message first, then /compare models on it")
+            return
+        targets = {target: self.llm.parse_target(target) for target in args}
+        packed = {label: self.context.pack(self.messages, model, end=last_user + 1)
+                    for label, (provider, model) in targets.items()}
+        results = {}
+        with self.ui.comparison_view(targets) as view:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+                futures = {label: pool.submit(self._compare_worker, view, label, provider, model,
+                                              packed[label], results)
+                           for label, (provider, model) in targets.items()}
+        
+        for label, (provider, model) in targets.items():
+            # A worker that failed outside its own error handling left no result
+            error = futures[label].exception()
+            result = results.setdefault(label, {"error": str(error) if error else "no reply"})
+            if not result.get("error"):
+                _, result["tokens"] = self.record_usage(model, result.pop("usage"), packed[label],
+                                                        result.pop("text"), result.pop("cached"))
+                generation = result["total"] - (result["first_token"] or 0)
+                result["tokens_per_sec"] = result["tokens"] / generation if generation > 0 else 0.0
+        self.ui.display_comparison_summary({label: results[label] for label in targets})
+    
+    def _compare_worker(self, view, label, provider, model, messages, results):
+        """Stream one model's reply into its comparison region"""
+        start = time.perf_counter()
+        first_token = None
+        parts = []
+        try:
+            chunks = self.llm.get_completion(messages, stream=True, model=model, provider=provider)
+            for delta in chunks:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(delta)
+                view.append(label, delta)
+        except Exception as e:
+            view.set_status(label, "error")
+            results[label] = {"error": str(e)}
+            return
+        
+        total = time.perf_counter() - start
+        view.set_status(label, f"done in {total:.2f}s")
+        results[label] = {
+            "first_token": first_token,
+            "total": total,
+            "text": "".join(parts),
+            "usage": chunks.usage,
+            "cached": chunks.cached
+        }
+    
+    def cmd_stats(self, args):
+        """Show latency percentiles per model, or reset them"""
+        if args and args[0] == "reset":
+            self.llm.metrics.reset()
+            self.ui.display_system_message("Latency statistics cleared")
+            return
+        limiters = {}
+        providers = {self.llm.provider} | {provider for provider, _ in self.llm.failover_chain}
+        for provider in sorted(providers):
+            state = self.llm.limiter(provider).stats()
+            if state["throttled"] or state["retries"] or state["waited"]:
+                limiters[provider] = state
+        self.ui.display_stats(self.llm.metrics.summary(), limiters)
+    
+    def cmd_profile(self, args):
+        """Turn per-turn CPU and memory profiling on or off"""
+        action = args[0].lower() if args else "status"
+        if action == "on":
+            folder = self.profiler.start()
+            self.ui.display_system_message(f"Profiling each turn; profiles are written to {folder}")
+        elif action == "off":
+            self.profiler.stop()
+            self.ui.display_system_message("Profiling stopped")
+        elif action == "status":
+            state = "on" if self.profiler.enabled else "off"
+            self.ui.display_system_message(f"Profiling is {state}. Use /profile on|off.")
+        else:
+            self.ui.display_error("Usage: /profile [on|off]")
     
     def cmd_tokens(self, args):
         """Show token usage statistics"""
-        # This is a placeholder - a real implementation would track token usage
-        self.ui.display_system_message("Token usage tracking not implemented in this example.")
+        context = {}
+        for msg in self.messages:
+            context[msg.role] = context.get(msg.role, 0) + self.token_counter.count_message(msg)
+        
+        models = {}
+        for model, totals in self.usage.models.items():
+            models[model] = dict(totals, cost=self.usage.cost(model))
+        
+        self.ui.display_token_usage(context, models, self.usage.totals())
+        
+        limit = self.context.context_limit(self.llm.model)
+        message = f"Context window for {self.llm.model}: {limit} tokens ({self.llm.max_tokens} reserved for the reply)"
+        if self.context.last_dropped:
+            message += f"; last request left out {self.context.last_dropped} older messages"
+        self.ui.display_system_message(message)
+    
+    def cmd_cache(self, args):
+        """Manage the response cache"""
+        action = args[0].lower() if args else "stats"
+        if action == "on":
+            self.llm.enable_cache(True)
+            self.ui.display_system_message("Response cache enabled")
+            return
+        if action == "off":
+            self.llm.enable_cache(False)
+            self.ui.display_system_message("Response cache disabled")
+            return
+        
+        if self.llm.cache is None:
+            self.ui.display_system_message("Response cache is disabled. Use /cache on or set ENABLED in [CACHE].")
+            return
+        
+        if action == "stats":
+            stats = self.llm.cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            hit_rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "n/a"
+            self.ui.display_system_message(
+                f"Response cache: {stats['entries']} entries, {stats['bytes'] / 1024:.1f} KiB, "
+                f"{stats['hits']} hits / {stats['misses']} misses this session (hit rate {hit_rate})"
+            )
+            if not self.llm.cache.should_cache(self.llm.temperature):
+                self.ui.display_system_message(
+                    f"Temperature is {self.llm.temperature}, so requests bypass the cache (set FORCE in [CACHE] to override)"
+                )
+        elif action == "clear":
+            self.llm.cache.clear()
+            self.ui.display_system_message("Response cache cleared")
+        else:
+            self.ui.display_error("Usage: /cache [stats|clear|on|off]")
+    
+    def cmd_search(self, args):
+        """Full-text search across this and all saved conversations"""
+        if not self.store:
+            self.ui.display_error("Conversation search is disabled")
+            return
+        
+        reindex = "--reindex" in args
+        query = " ".join(arg for arg in args if arg != "--reindex")
+        importing = reindex or not self.use_store(lambda store: store.has_imported())
+        # Hits in a loaded conversation still being indexed show up once it is
+        # done; an import would index it a second time, so that waits for it
+        self.finish_indexing(wait=importing)
+        if importing:
+            if not self.store:
+                return
+            self.ui.display_system_message("Indexing saved conversations...")
+            imported = self.use_store(lambda store: store.import_directory(self.conversations_dir))
+            if imported is None:
+                return
+            self.ui.display_system_message(f"Indexed {imported} conversations")
+        if not query:
+            if not reindex:
+                self.ui.display_error("Usage: /search <query>")
+            return
+        
+        start = time.perf_counter()
+        results = self.use_store(lambda store: store.search(query))
+        if results is None:
+            return
+        elapsed = time.perf_counter() - start
+        self.ui.display_search_results(query, results, elapsed)
+    
+    def cmd_recall(self, args):
+        """Show what semantic memory recalls for a query, or its status"""
+        if not self.memory:
+            self.ui.display_error("Semantic memory is disabled. Set ENABLED in [MEMORY] (needs NumPy).")
+            return
+        
+        if args and args[0] == "--reindex":
+            self.memory.index_directory_async(self.conversations_dir)
+            self.ui.display_system_message("Indexing saved conversations in the background")
+            return
+        if not args:
+            status = (f"Semantic memory ({self.memory.embedder.name}): {len(self.memory.index)} snippets, "
+                      f"{len(self.memory.index.meta.get('sources', {}))} saved conversations indexed")
+            if self.memory.reindexing:
+                status += "; indexing saved conversations..."
+            if self.memory.last_error:
+                status += f"; last indexing error: {self.memory.last_error}"
+            if self.last_recall:
+                status += f". The last prompt included {len(self.last_recall)} recalled snippets."
+            self.ui.display_system_message(status)
+            return
+        
+        query = " ".join(args)
+        start = time.perf_counter()
+        try:
+            # Leave out what the next prompt would already include, as add_recall does
+            window = self.context.pack(self.messages, self.llm.model)
+            hits = self.memory.recall(query, exclude=[msg["content"] for msg in window])
+        except Exception as e:
+            self.ui.display_error(f"Memory recall failed: {str(e)}")
+            return
+        self.ui.display_recall(query, hits, time.perf_counter() - start)
     
     def cmd_export(self, args):
         """Export conversation in different formats"""
@@ -230,7 +888,7 @@ class ChatSession:
             return
         
         format_type = args[0].lower()
-        if format_type not in ["md", "txt", "html"]:
+        if format_type not in FORMATS:
             self.ui.display_error("Supported formats: md, txt, html")
             return
         
@@ -241,44 +899,8 @@ class ChatSession:
         filepath = os.path.join(self.conversations_dir, filename)
         
         try:
-            with open(filepath, 'w') as f:
-                if format_type == "md":
-                    f.write(f"# Conversation with {self.llm.model}\n\n")
-                    for msg in self.messages:
-                        if msg["role"] == "system":
-                            continue
-                        if msg["role"] == "user":
-                            f.write(f"## User\n\n{msg['content']}\n\n")
-                        elif msg["role"] == "assistant":
-                            f.write(f"## AI ({self.llm.model})\n\n{msg['content']}\n\n")
-                elif format_type == "txt":
-                    for msg in self.messages:
-                        if msg["role"] == "system":
-                            continue
-                        if msg["role"] == "user":
-                            f.write(f"User: {msg['content']}\n\n")
-                        elif msg["role"] == "assistant":
-                            f.write(f"AI: {msg['content']}\n\n")
-                elif format_type == "html":
-                    f.write(f"<!DOCTYPE html>\n<html>\n<head>\n")
-                    f.write(f"<title>Conversation with {self.llm.model}</title>\n")
-                    f.write(f"<style>\n")
-                    f.write(f"body {{ font-family: Arial, sans-serif; margin: 20px; }}\n")
-                    f.write(f".user {{ background-color: #e6f7ff; padding: 10px; border-radius: 5px; margin-bottom: 10px; }}\n")
-                    f.write(f".ai {{ background-color: #f0f0f0; padding: 10px; border-radius: 5px; margin-bottom: 10px; }}\n")
-                    f.write(f"h2 {{ font-size: 1em; margin-top: 0; }}\n")
-                    f.write(f"</style>\n</head>\n<body>\n")
-                    f.write(f"<h1>Conversation with {self.llm.model}</h1>\n")
-                    
-                    for msg in self.messages:
-                        if msg["role"] == "system":
-                            continue
-                        if msg["role"] == "user":
-                            f.write(f"<div class=\"user\">\n<h2>User:</h2>\n<p>{msg['content']}</p>\n</div>\n")
-                        elif msg["role"] == "assistant":
-                            f.write(f"<div class=\"ai\">\n<h2>AI ({self.llm.model}):</h2>\n<p>{msg['content']}</p>\n</div>\n")
-                    
-                    f.write(f"</body>\n</html>")
+            with open(filepath, 'w', encoding='utf-8') as f:
+                write_export(f, self.messages, self.llm.model, format_type)
             
             self.ui.display_system_message(f"Conversation exported to {filename}")
         except Exception as e:
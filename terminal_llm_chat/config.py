@@ -2,7 +2,6 @@
 
 import os
 import configparser
-from pathlib import Path
 
 class Config:
     def __init__(self, config_dir=None):
@@ -39,7 +38,11 @@ class Config:
             "THEME": "green",
             "ANIMATION_SPEED": "10",
             "ENABLE_SOUNDS": "true",
-            "MAX_WIDTH": "80"
+            "MAX_WIDTH": "80",
+            "LOAD_TURNS": "10",
+            "FRAME_MS": "16",
+            "MAX_ANIMATION_MS": "2000",
+            "RENDER_QUEUE_SIZE": "256"
         }
         
         self.config["SYSTEM"] = {
@@ -48,6 +51,100 @@ class Config:
             "MAX_TOKENS": "2000"
         }
         
+        self.config["NETWORK"] = {
+            "POOL_SIZE": "4",
+            "CONNECT_TIMEOUT": "10",
+            "READ_TIMEOUT": "120",
+            "KEEP_ALIVE": "true"
+        }
+        
+        self.config["CACHE"] = {
+            "ENABLED": "false",
+            "FORCE": "false",
+            "TTL": "604800",
+            "MAX_ENTRIES": "10000",
+            "MAX_BYTES": "104857600"
+        }
+        
+        self.config["CATALOG"] = {
+            "TTL": "86400",
+            "OLLAMA_TTL": "300"
+        }
+        
+        self.config["JOURNAL"] = {
+            "ENABLED": "true",
+            "FSYNC_INTERVAL_MS": "200",
+            "KEEP": "20"
+        }
+        
+        self.config["STORE"] = {
+            "ENABLED": "true"
+        }
+        
+        self.config["PROMPT_CACHE"] = {
+            "ENABLED": "true",
+            "TRIM_SLACK": "0.2",
+            "REPORT": "true"
+        }
+        
+        self.config["OLLAMA"] = {
+            "KEEP_ALIVE": "30m",
+            "WARM_UP": "true"
+        }
+        
+        self.config["RATE_LIMIT"] = {
+            "REQUESTS_PER_MIN": "0",
+            "TOKENS_PER_MIN": "0",
+            "MAX_CONCURRENCY": "8",
+            "MAX_RETRIES": "4",
+            "BACKOFF_BASE": "1.0",
+            "BACKOFF_MAX": "60"
+        }
+        
+        self.config["FAILOVER"] = {
+            "CHAIN": "",
+            "HEDGE_AFTER_MS": "2000",
+            "BREAKER_FAILURES": "3",
+            "BREAKER_COOLDOWN": "60"
+        }
+        
+        self.config["METRICS"] = {
+            "WINDOW": "1000",
+            "TRACE": "false",
+            "PROMETHEUS": "false"
+        }
+        
+        self.config["BATCH"] = {
+            "CONCURRENCY": "8"
+        }
+        
+        self.config["EXPORT"] = {
+            "JOBS": "0"
+        }
+        
+        self.config["ARCHIVE"] = {
+            "FORMAT": "json",
+            "COMPRESSION": "gzip",
+            "BLOCK_MESSAGES": "256"
+        }
+        
+        self.config["MEMORY"] = {
+            "ENABLED": "false",
+            "EMBEDDER": "hash",
+            "DIM": "1024",
+            "CHUNK_CHARS": "800",
+            "TOP_K": "4",
+            "MIN_SCORE": "0.2",
+            "HISTORY_TOKENS": "4000",
+            "INDEX_SAVED": "true"
+        }
+        
+        self.config["PROFILE"] = {
+            "TOP": "20",
+            "SAMPLE_MS": "0",
+            "MEMORY": "true"
+        }
+        
         self.config["CUSTOM_THEME"] = {
             "USER_COLOR": "green",
             "AI_COLOR": "cyan",
@@ -68,21 +165,21 @@ class Config:
         """Get a boolean config value"""
         try:
             return self.config.getboolean(section, key)
-        except (KeyError, configparser.NoSectionError, ValueError):
+        except (KeyError, configparser.NoSectionError, configparser.NoOptionError, ValueError):
             return default
     
     def get_int(self, section, key, default=0):
         """Get an integer config value"""
         try:
             return self.config.getint(section, key)
-        except (KeyError, configparser.NoSectionError, ValueError):
+        except (KeyError, configparser.NoSectionError, configparser.NoOptionError, ValueError):
             return default
     
     def get_float(self, section, key, default=0.0):
         """Get a float config value"""
         try:
             return self.config.getfloat(section, key)
-        except (KeyError, configparser.NoSectionError, ValueError):
+        except (KeyError, configparser.NoSectionError, configparser.NoOptionError, ValueError):
             return default
     
     def set(self, section, key, value):
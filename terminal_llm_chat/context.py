@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from terminal_llm_chat.tokens import REPLY_OVERHEAD, match_model
+
+# Context window sizes in tokens, matched by model-name prefix
+CONTEXT_LIMITS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "claude-3": 200000,
+    "claude-2.1": 200000,
+    "claude-2": 100000,
+    "claude-instant": 100000,
+    "llama3": 8192,
+    "llama3.1": 131072,
+    "mistral": 32768,
+    "gemma": 8192,
+}
+DEFAULT_CONTEXT_LIMIT = 4096
+
+class ContextWindow:
+    """Pick the newest messages that fit a model's context window
+    
+    Keeps a running prefix sum of per-message token counts so each request
+    is packed with a binary search instead of rescanning the history. The
+    leading system prompt is always kept.
+    
+    Once old messages must be dropped, a ``slack`` fraction of the budget
+    is freed at once and the window then keeps the same first message for
+    as long as it fits. The prompt prefix only changes every few turns, so
+    the provider's prompt cache of it stays useful.
+    
+    ``history_limit`` caps the history sent below the model's window, e.g.
+    when semantic memory recalls what falls outside it.
+    """
+    
+    def __init__(self, counter, max_tokens: int, limit: int = 0, catalog=None, slack: float = 0.0,
+                 history_limit: int = 0):
+        self.counter = counter
+        self.catalog = catalog
+        self.max_tokens = max_tokens
+        self.limit = limit
+        self.slack = slack
+        self.history_limit = history_limit
+        # prefix[i] is the token count of messages[:i]
+        self.prefix = [0]
+        # First message sent in the last full request, per model
+        self.starts: Dict[str, int] = {}
+        self.last_sent = 0
+        self.last_dropped = 0
+    
+    def context_limit(self, model: str) -> int:
+        """Get the context window size for a model"""
+        if self.limit > 0:
+            return self.limit
+        if self.catalog:
+            info = self.catalog.model_info(model)
+            if info.get("context_length"):
+                return info["context_length"]
+        return match_model(CONTEXT_LIMITS, model, DEFAULT_CONTEXT_LIMIT)
+    
+    def reset(self, messages: List[Dict]):
+        """Rebuild the index for a replaced message list"""
+        self.prefix = [0]
+        self.starts.clear()
+        for msg in messages:
+            self.append(msg)
+    
+    def append(self, message: Dict):
+        """Add a message appended to the conversation to the index"""
+        self.prefix.append(self.prefix[-1] + self.counter.count_message(message))
+    
+    def pack(self, messages: List[Dict], model: str, end: Optional[int] = None) -> List[Dict]:
+        """Get the messages to send for messages[:end] within the model's limit"""
+        if len(self.prefix) != len(messages) + 1:
+            # The list was replaced behind our back (e.g. a loaded conversation)
+            self.reset(messages)
+        end = len(messages) if end is None else end
+        
+        pinned = 1 if messages and messages[0]["role"] == "system" else 0
+        pinned_tokens = sum(self.counter.count_message(msg) for msg in messages[:pinned])
+        budget = self.context_limit(model) - self.max_tokens - pinned_tokens - REPLY_OVERHEAD
+        if self.history_limit > 0:
+            budget = min(budget, self.history_limit)
+        
+        # Smallest start with prefix[end] - prefix[start] <= budget
+        start = bisect_left(self.prefix, self.prefix[end] - budget, pinned, end)
+        previous = self.starts.get(model)
+        if previous is not None and start <= previous < end:
+            # Still fits; keep the prompt prefix unchanged
+            start = previous
+        elif start > pinned and self.slack > 0:
+            # Make room for the next few turns in one go
+            start = bisect_left(self.prefix, self.prefix[end] - budget * (1 - self.slack), pinned, end)
+        # Always send the latest message, even if it alone is over budget
+        start = min(start, max(end - 1, pinned))
+        # Don't open the window on a dangling assistant reply
+        while start < end - 1 and messages[start]["role"] != "user":
+            start += 1
+        
+        if end == len(messages):
+            self.starts[model] = start
+        self.last_sent = end - start
+        self.last_dropped = start - pinned
+        return messages[:pinned] + messages[start:end]
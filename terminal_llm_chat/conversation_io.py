@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+from typing import Dict, Iterator, Optional, Tuple
+
+from terminal_llm_chat.archive import ARCHIVE_EXT, is_archive, iter_archive
+
+EXTENSIONS = (".json", ARCHIVE_EXT)
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = ",:]}" + _WHITESPACE
+
+class _StreamReader:
+    """Pull complete JSON values out of a file read in chunks"""
+    
+    def __init__(self, f, chunk_size: int = 64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self, size: int):
+        """Read more text, dropping what has already been consumed"""
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+    
+    def peek(self) -> str:
+        """Get the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+            self._fill(self.chunk_size)
+    
+    def expect(self, char: str):
+        """Consume one expected structural character"""
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of the current chunk")
+        self.pos += 1
+    
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the chunk boundary (e.g. "1.5e") still
+                # decodes, so only trust a value followed by a delimiter
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads geometrically so a huge value isn't re-parsed often
+            self._fill(size)
+            size *= 2
+
+def iter_conversation(f, chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, object]]:
+    """Parse a saved conversation incrementally
+    
+    Yields ("message", message) for each entry of the "messages" array as
+    soon as it is decoded, and (key, value) for every other top-level field.
+    """
+    reader = _StreamReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "messages" and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield "message", reader.value()
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            yield key, reader.value()
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
+
+def iter_saved(path: str) -> Iterator[Tuple[str, object]]:
+    """``iter_conversation`` for a saved file in either format"""
+    with open(path, 'rb') as f:
+        if is_archive(f):
+            yield from iter_archive(f)
+        else:
+            yield from iter_conversation(io.TextIOWrapper(f, encoding='utf-8'))
+
+def iter_messages(path: str, fields: Dict) -> Iterator:
+    """Yield a saved conversation's messages, putting its other fields in ``fields``"""
+    for key, value in iter_saved(path):
+        if key == "message":
+            yield value
+        else:
+            fields[key] = value
+
+def find_conversation(conversations_dir: str, name: str) -> Optional[str]:
+    """Resolve a name given to /load to a saved file of either format
+    
+    Without an extension the most recently saved of ``name.json`` and the
+    compact file wins.
+    """
+    if name.endswith(EXTENSIONS):
+        path = os.path.join(conversations_dir, name)
+        return path if os.path.exists(path) else None
+    newest = None
+    for ext in EXTENSIONS:
+        path = os.path.join(conversations_dir, name + ext)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if newest is None or mtime > newest[0]:
+            newest = (mtime, path)
+    return newest[1] if newest else None
+
+def read_conversation(path: str, messages=None) -> Dict:
+    """Read a saved conversation file without holding its text in memory
+    
+    Messages are appended to ``messages`` (a new list by default), so a
+    ``MessageList`` can be filled without building a list of dicts first.
+    Both JSON and compact files are read.
+    """
+    data = {"messages": [] if messages is None else messages}
+    for key, value in iter_saved(path):
+        if key == "message":
+            data["messages"].append(value)
+        else:
+            data[key] = value
+    return data
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+from itertools import chain
+from html import escape as escape_html
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from terminal_llm_chat.conversation_io import EXTENSIONS, find_conversation, iter_saved
+
+FORMATS = ("md", "txt", "html")
+
+_HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Conversation with {model}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 20px; }}
+.user {{ background-color: #e6f7ff; padding: 10px; border-radius: 5px; margin-bottom: 10px; }}
+.ai {{ background-color: #f0f0f0; padding: 10px; border-radius: 5px; margin-bottom: 10px; }}
+h2 {{ font-size: 1em; margin-top: 0; }}
+p {{ white-space: pre-wrap; }}
+</style>
+</head>
+<body>
+<h1>Conversation with {model}</h1>
+"""
+
+# Per format: text before and after the messages, one template per role
+# (roles without one, like system, are left out) and the escaping applied
+# to the model name and message content
+TEMPLATES: Dict[str, Dict] = {
+    "md": {
+        "header": "# Conversation with {model}\n\n",
+        "user": "## User\n\n{content}\n\n",
+        "assistant": "## AI ({model})\n\n{content}\n\n",
+        "footer": "",
+        "escape": None
+    },
+    "txt": {
+        "header": "",
+        "user": "User: {content}\n\n",
+        "assistant": "AI: {content}\n\n",
+        "footer": "",
+        "escape": None
+    },
+    "html": {
+        "header": _HTML_HEADER,
+        "user": "<div class=\"user\">\n<h2>User:</h2>\n<p>{content}</p>\n</div>\n",
+        "assistant": "<div class=\"ai\">\n<h2>AI ({model}):</h2>\n<p>{content}</p>\n</div>\n",
+        "footer": "</body>\n</html>",
+        "escape": escape_html
+    }
+}
+
+def render(messages: Iterable, model: str, format_type: str, batch: int = 500) -> Iterator[str]:
+    """Render a conversation, yielding the text in pieces of ``batch`` messages
+    
+    ``messages`` may be dicts or ``Message`` objects and is consumed lazily,
+    so a conversation streamed from disk is never held in memory whole.
+    """
+    template = TEMPLATES[format_type]
+    escape = template["escape"]
+    if escape:
+        model = escape(model)
+    # The model is the same in every block, so fill it in once
+    roles = {role: template[role].replace("{model}", model).split("{content}")
+             for role in ("user", "assistant")}
+    yield template["header"].format(model=model)
+    parts = []
+    for msg in messages:
+        block = roles.get(msg["role"])
+        if block is None:
+            continue
+        content = msg["content"]
+        parts.append(block[0] + (escape(content) if escape else content) + block[1])
+        if len(parts) >= batch:
+            yield "".join(parts)
+            parts = []
+    parts.append(template["footer"])
+    yield "".join(parts)
+
+def write_export(f, messages: Iterable, model: str, format_type: str):
+    """Write a rendered conversation to an open text file"""
+    for text in render(messages, model, format_type):
+        f.write(text)
+
+def _stream_messages(path: str, fields: Dict) -> Iterator:
+    """Messages of a saved conversation, filling ``fields`` with the other keys
+    
+    Compact files and JSON saved with the model before the messages stream
+    straight through; older JSON files list the model last, so their
+    messages are held until it has been read.
+    """
+    held = None
+    for key, value in iter_saved(path):
+        if key != "message":
+            fields[key] = value
+        elif "model" in fields:
+            yield value
+        else:
+            if held is None:
+                held = []
+            held.append(value)
+    if held:
+        yield from held
+
+def export_file(source: str, target: str, format_type: str):
+    """Export one saved conversation, replacing ``target`` only when complete"""
+    fields = {}
+    temp = target + ".tmp"
+    messages = _stream_messages(source, fields)
+    # Once the first message is out, the model has been read either way
+    first = next(messages, None)
+    if first is not None:
+        messages = chain((first,), messages)
+    try:
+        with open(temp, 'w', encoding='utf-8') as out:
+            write_export(out, messages, fields.get("model", "unknown model"), format_type)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    # A partial export must not look newer than its source on the next run
+    os.replace(temp, target)
+
+def needs_export(source: str, target: str) -> bool:
+    """Whether ``target`` is missing or older than ``source``"""
+    try:
+        return os.path.getmtime(target) < os.path.getmtime(source)
+    except OSError:
+        return True
+
+def _export_job(job: Tuple[str, str, str]) -> Tuple[str, Optional[str]]:
+    """Worker entry point; returns (source, error message or None)"""
+    source, target, format_type = job
+    try:
+        export_file(source, target, format_type)
+        return source, None
+    except Exception as e:
+        return source, str(e)
+
+def plan_exports(conversations_dir: str, output_dir: str, format_type: str,
+                 names: Optional[List[str]] = None) -> Tuple[List[Tuple[str, str, str]], int]:
+    """List (source, target, format) jobs for conversations needing export
+    
+    Returns the jobs and how many conversations were already up to date.
+    """
+    if names is None:
+        # A conversation saved in both formats is exported once, from the newer file
+        names = sorted({os.path.splitext(name)[0] for name in os.listdir(conversations_dir)
+                        if name.endswith(EXTENSIONS)})
+    sources = [find_conversation(conversations_dir, name) for name in names]
+    jobs = []
+    skipped = 0
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        target = os.path.join(output_dir, stem + "." + format_type)
+        if needs_export(source, target):
+            jobs.append((source, target, format_type))
+        else:
+            skipped += 1
+    return jobs, skipped
+
+def export_conversations(jobs: List[Tuple[str, str, str]], workers: int,
+                         progress: Optional[Callable[[int, int], None]] = None) -> List[Tuple[str, str]]:
+    """Run export jobs across ``workers`` processes; returns (source, error) failures"""
+    failures = []
+    done = 0
+    if workers <= 1 or len(jobs) <= 1:
+        results = map(_export_job, jobs)
+        pool = None
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+        # Hand out work in chunks, so tens of thousands of small files
+        # don't each cost a round trip to a worker
+        results = pool.map(_export_job, jobs, chunksize=max(1, min(64, len(jobs) // (workers * 4))))
+    try:
+        for source, error in results:
+            done += 1
+            if error is not None:
+                failures.append((source, error))
+            if progress:
+                progress(done, len(failures))
+    finally:
+        if pool:
+            pool.shutdown()
+    return failures
+
+def run_export(conversations_dir: str, output_dir: str, format_type: str, jobs: int,
+               names: Optional[List[str]] = None) -> int:
+    """Export conversations from the command line, reporting progress on stderr"""
+    if not os.path.isdir(conversations_dir):
+        print(f"Conversations folder not found: {conversations_dir}", file=sys.stderr)
+        return 1
+    missing = [name for name in names or [] if find_conversation(conversations_dir, name) is None]
+    if missing:
+        print(f"Conversation not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    os.makedirs(output_dir, exist_ok=True)
+    
+    start = time.perf_counter()
+    interactive = sys.stderr.isatty()
+    pending, skipped = plan_exports(conversations_dir, output_dir, format_type, names)
+    
+    def progress(done, failed):
+        if interactive:
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            sys.stderr.write(f"\r{done}/{len(pending)} exported, {failed} failed ({rate:.1f}/s)")
+            sys.stderr.flush()
+    
+    try:
+        failures = export_conversations(pending, jobs, progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to export the rest.", file=sys.stderr)
+        return 130
+    if interactive and pending:
+        sys.stderr.write("\n")
+    for source, error in failures:
+        print(f"{os.path.basename(source)}: {error}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{len(pending) - len(failures)} exported ({len(failures)} failed), "
+          f"{skipped} up to date, in {elapsed:.1f}s -> {output_dir}", file=sys.stderr)
+    return 1 if failures else 0
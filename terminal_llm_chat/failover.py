@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+class CircuitBreaker:
+    """Skip providers that keep failing until a cooldown has passed
+    
+    After ``threshold`` consecutive failures a provider's circuit opens and
+    it is skipped for ``cooldown`` seconds. Then a single trial request is
+    let through (half-open): success closes the circuit, failure reopens it.
+    """
+    
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures: Dict[str, int] = {}
+        self.opened: Dict[str, float] = {}
+        self.trial: Dict[str, bool] = {}
+    
+    def allow(self, name: str) -> bool:
+        """Check whether a request to ``name`` should be attempted"""
+        with self.lock:
+            opened = self.opened.get(name)
+            if opened is None:
+                return True
+            if time.monotonic() - opened < self.cooldown or self.trial.get(name):
+                return False
+            self.trial[name] = True
+            return True
+    
+    def record_success(self, name: str):
+        """Close the circuit"""
+        with self.lock:
+            self.failures.pop(name, None)
+            self.opened.pop(name, None)
+            self.trial.pop(name, None)
+    
+    def abandon(self, name: str):
+        """Forget an attempt cancelled before it succeeded or failed
+        
+        A half-open trial that loses a hedge race proves nothing either way;
+        without this its trial flag would stay set and keep the circuit from
+        ever letting another request through.
+        """
+        with self.lock:
+            self.trial.pop(name, None)
+    
+    def record_failure(self, name: str):
+        """Count a failure, opening the circuit at the threshold"""
+        with self.lock:
+            self.failures[name] = self.failures.get(name, 0) + 1
+            if self.trial.pop(name, False) or self.failures[name] >= self.threshold:
+                self.opened[name] = time.monotonic()
+    
+    def state(self, name: str) -> str:
+        """closed, open or half-open"""
+        with self.lock:
+            opened = self.opened.get(name)
+            if opened is None:
+                return "closed"
+            return "open" if time.monotonic() - opened < self.cooldown else "half-open"
+
+class Cancelled(Exception):
+    """Raised in an attempt that was cancelled while waiting to send"""
+
+class Cancellation:
+    """Stop flag of one hedged attempt that can abort its request in flight
+    
+    Request code running on the attempt's thread finds it through
+    ``current_cancellation()``, checks it while waiting on the rate limiter
+    and registers how to abort its response. Setting it then wakes a read
+    blocked on the network at once, so the loser gives back its limiter
+    slot and connection without waiting for a delta or the read timeout.
+    """
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.abort: Optional[Callable[[], None]] = None
+    
+    def is_set(self) -> bool:
+        return self.event.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.event.wait(timeout)
+    
+    def set(self):
+        with self.lock:
+            self.event.set()
+            abort, self.abort = self.abort, None
+        if abort:
+            abort()
+    
+    def register(self, abort: Callable[[], None]) -> bool:
+        """Set how to abort the request; False if already cancelled"""
+        with self.lock:
+            if self.event.is_set():
+                return False
+            self.abort = abort
+            return True
+    
+    def unregister(self):
+        with self.lock:
+            self.abort = None
+
+_current = threading.local()
+
+def current_cancellation() -> Optional[Cancellation]:
+    """The cancellation of the hedged attempt running on this thread, if any"""
+    return getattr(_current, "cancellation", None)
+
+# An attempt is (provider, model, start), where start() begins the request
+# lazily and returns its (chunks, usage, timings)
+Attempt = Tuple[str, str, Callable[[], Tuple[Iterator[str], Dict, Dict]]]
+
+def hedged_chunks(attempts: List[Attempt], breaker: CircuitBreaker, hedge_after: float,
+                  on_winner: Callable[[str, str, Dict, Dict], None], queue_size: int = 256) -> Iterator[str]:
+    """Stream the reply of whichever attempt produces a first token first
+    
+    The first attempt starts immediately. If no attempt has produced a
+    token ``hedge_after`` seconds after the latest one started, or when
+    every running attempt has failed, the next one is started. The first
+    to produce text wins and the others are cancelled, aborting their
+    requests (see ``Cancellation``). Failures before
+    the first token fail over; once text has been shown, an error is
+    raised as usual. ``on_winner(provider, model, usage, timings)`` is called
+    when the winner is known; ``usage`` is filled in by the end of the stream.
+    """
+    events = queue.Queue(maxsize=queue_size)
+    cancelled: List[Cancellation] = []
+    running = set()
+    started: List[Attempt] = []
+    remaining = list(attempts)
+    details: List[Tuple[Dict, Dict]] = []
+    
+    def send(item, stop) -> bool:
+        """Queue an event unless the attempt is cancelled while waiting"""
+        while not stop.is_set():
+            try:
+                events.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def run(index, chunks, stop):
+        _current.cancellation = stop
+        try:
+            first = True
+            for delta in chunks:
+                if first and delta.startswith("ERROR:"):
+                    # Missing keys and unreachable local servers come back as text
+                    raise RuntimeError(delta[len("ERROR:"):].strip())
+                first = False
+                if not send((index, "delta", delta), stop):
+                    break
+            else:
+                send((index, "done", None), stop)
+        except Exception as e:
+            # A cancelled attempt's aborted read lands here and is dropped
+            send((index, "error", e), stop)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+    
+    def start_next():
+        """Start the next attempt whose circuit allows it; None if none left"""
+        while remaining:
+            provider, model, start = remaining.pop(0)
+            if breaker.allow(provider):
+                break
+        else:
+            if started:
+                return None
+            # Every circuit is open; trying the primary beats failing outright
+            provider, model, start = attempts[0]
+        chunks, usage, timings = start()
+        stop = Cancellation()
+        index = len(started)
+        started.append((provider, model, start))
+        details.append((usage, timings))
+        cancelled.append(stop)
+        running.add(index)
+        threading.Thread(target=run, args=(index, chunks, stop), daemon=True).start()
+        return time.monotonic()
+    
+    last_start = start_next()
+    winner = None
+    last_error = None
+    try:
+        while True:
+            timeout = None
+            if winner is None and remaining and hedge_after > 0:
+                timeout = max(0.0, last_start + hedge_after - time.monotonic())
+            try:
+                index, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                # Nobody has answered in time; hedge with the next provider
+                last_start = start_next() or time.monotonic()
+                continue
+            
+            if winner is not None and index != winner:
+                continue
+            provider = started[index][0]
+            if kind == "error":
+                running.discard(index)
+                breaker.record_failure(provider)
+                if winner is not None:
+                    raise value
+                last_error = value
+                if not running:
+                    last_start = start_next()
+                    if last_start is None:
+                        raise last_error
+                continue
+            if winner is None:
+                winner = index
+                for other, stop in enumerate(cancelled):
+                    if other != winner:
+                        stop.set()
+                for other in running - {winner}:
+                    breaker.abandon(started[other][0])
+                running.intersection_update({winner})
+                on_winner(provider, started[index][1], *details[index])
+            if kind == "done":
+                breaker.record_success(provider)
+                return
+            yield value
+    finally:
+        for stop in cancelled:
+            stop.set()
+        # Attempts still running when the stream ends or is dropped
+        for index in running:
+            breaker.abandon(started[index][0])
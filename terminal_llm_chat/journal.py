@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from terminal_llm_chat.conversation_io import read_conversation
+from terminal_llm_chat.messages import Message
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+class SessionJournal:
+    """Append-only JSONL log of a chat session for autosave and crash recovery
+    
+    Records are queued and written by a background thread that batches
+    fsync calls, so adding a message never waits on the disk. A session that
+    exits cleanly ends its journal with an "end" record; a journal without
+    one is left over from a crash and can be recovered.
+    """
+    
+    def __init__(self, journal_dir: str, model: str, fsync_interval: float = 0.2):
+        self.journal_dir = journal_dir
+        os.makedirs(journal_dir, exist_ok=True)
+        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f") + f"_{os.getpid()}"
+        self.path = os.path.join(journal_dir, f"{self.session_id}.jsonl")
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue()
+        self.closed = False
+        
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self._lock_file(self.file)
+        self._write_direct({"type": "start", "model": model, "started": datetime.now().isoformat()})
+        
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer.start()
+    
+    def _lock_file(self, f):
+        """Hold an exclusive lock so other instances see the session as live"""
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    
+    def _write_direct(self, record: Dict):
+        """Write a record immediately (only before the writer thread starts)"""
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+    
+    def _writer_loop(self):
+        """Write queued records, fsyncing at most once per interval"""
+        dirty = False
+        last_sync = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.fsync_interval if dirty else None)
+            except queue.Empty:
+                item = None
+            
+            if item is None or item == "close":
+                if dirty:
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+                    dirty = False
+                    last_sync = time.monotonic()
+                if item == "close":
+                    return
+                continue
+            
+            op, payload = item
+            if op == "record":
+                self.file.write(payload)
+                dirty = True
+            elif op == "rotate":
+                self._rotate(payload)
+                dirty = False
+                last_sync = time.monotonic()
+            
+            if dirty and time.monotonic() - last_sync >= self.fsync_interval:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                dirty = False
+                last_sync = time.monotonic()
+    
+    def _rotate(self, lines: str):
+        """Atomically replace the journal with a compacted one
+        
+        The new file is locked before it takes the journal's name, so
+        another instance never finds it unlocked and offers to recover a
+        live session.
+        """
+        tmp_path = self.path + ".tmp"
+        f = open(tmp_path, 'w', encoding='utf-8')
+        try:
+            self._lock_file(f)
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            f.close()
+            raise
+        self.file.close()
+        self.file = f
+    
+    def _append(self, record: Dict):
+        """Queue a record for the writer thread"""
+        if not self.closed:
+            self.queue.put(("record", json.dumps(record, ensure_ascii=False) + "\n"))
+    
+    def add_message(self, message: Dict):
+        """Record a message appended to the conversation"""
+        if isinstance(message, Message):
+            # Reuse the message's cached JSON instead of encoding it again
+            if not self.closed:
+                self.queue.put(("record", '{"type":"message",' + message.json()[1:] + "\n"))
+            return
+        self._append({"type": "message", "role": message["role"], "content": message["content"]})
+    
+    def update_system(self, content: str):
+        """Record a change to the system prompt"""
+        self._append({"type": "system", "content": content})
+    
+    def reset(self, messages: List[Dict], model: str):
+        """Record that the conversation was replaced, e.g. by /load"""
+        self._append({"type": "reset", "model": model})
+        for msg in messages:
+            self.add_message(msg)
+    
+    def compact(self, snapshot_path: str, count: int, model: str):
+        """Replace the journal with a pointer to a saved snapshot
+        
+        ``snapshot_path`` must hold the first ``count`` messages; only
+        messages added after it remain in the journal. The snapshot's size
+        and mtime are recorded, so recovery notices if it is overwritten
+        or removed later instead of replaying onto the wrong messages.
+        """
+        if self.closed:
+            return
+        stat = os.stat(snapshot_path)
+        records = [
+            {"type": "start", "model": model, "started": datetime.now().isoformat()},
+            {"type": "snapshot", "file": snapshot_path, "count": count,
+             "size": stat.st_size, "mtime": stat.st_mtime_ns}
+        ]
+        self.queue.put(("rotate", "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)))
+    
+    def close(self):
+        """Mark the session as cleanly ended and stop the writer"""
+        if self.closed:
+            return
+        self._append({"type": "end"})
+        self.closed = True
+        self.queue.put("close")
+        self.writer.join()
+        self.file.close()
+    
+    @staticmethod
+    def replay(path: str) -> Dict:
+        """Rebuild the messages and model recorded in a journal"""
+        messages = []
+        model = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    break
+                kind = record.get("type")
+                if kind == "start":
+                    model = record.get("model", model)
+                elif kind == "message":
+                    messages.append({"role": record["role"], "content": record["content"]})
+                elif kind == "system":
+                    for msg in messages:
+                        if msg["role"] == "system":
+                            msg["content"] = record["content"]
+                            break
+                elif kind == "reset":
+                    messages = []
+                    model = record.get("model", model)
+                elif kind == "snapshot":
+                    messages = SessionJournal._read_snapshot(record)
+        return {"messages": messages, "model": model}
+    
+    @staticmethod
+    def _read_snapshot(record: Dict) -> List[Dict]:
+        """The messages a snapshot record points to, if its file is unchanged"""
+        path = record["file"]
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise ValueError(f"{os.path.basename(path)}, which holds the start of the session, was removed")
+        if "size" in record and (stat.st_size, stat.st_mtime_ns) != (record["size"], record["mtime"]):
+            raise ValueError(f"{os.path.basename(path)}, which holds the start of the session, "
+                             "was changed after it was saved")
+        return read_conversation(path)["messages"][:record["count"]]
+    
+    @staticmethod
+    def find_unfinished(journal_dir: str, exclude: Optional[str] = None) -> List[str]:
+        """List journals left behind by sessions that did not exit cleanly"""
+        if not os.path.isdir(journal_dir):
+            return []
+        unfinished = []
+        for name in sorted(os.listdir(journal_dir)):
+            path = os.path.join(journal_dir, name)
+            if not name.endswith(".jsonl") or path == exclude:
+                continue
+            if SessionJournal._is_live(path):
+                continue
+            if SessionJournal._last_record(path).get("type") != "end":
+                unfinished.append(path)
+        return unfinished
+    
+    @staticmethod
+    def _is_live(path: str) -> bool:
+        """Check whether another running instance still holds a journal"""
+        if not fcntl:
+            return False
+        with open(path, 'a') as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+    
+    @staticmethod
+    def _last_record(path: str) -> Dict:
+        """Read the last complete record of a journal without scanning it all"""
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+        return {}
+    
+    @staticmethod
+    def mark_ended(path: str):
+        """Close out an old journal so it is not offered for recovery again"""
+        with open(path, 'a', encoding='utf-8') as f:
+            # Start on a fresh line in case the last record was torn
+            f.write("\n" + json.dumps({"type": "end"}) + "\n")
+    
+    @staticmethod
+    def prune(journal_dir: str, keep: int):
+        """Delete the oldest finished journals beyond ``keep``"""
+        finished = [path for path in (os.path.join(journal_dir, name)
+                                      for name in sorted(os.listdir(journal_dir))
+                                      if name.endswith(".jsonl"))
+                    if SessionJournal._last_record(path).get("type") == "end"]
+        for path in finished[:max(0, len(finished) - keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
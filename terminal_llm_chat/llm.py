@@ -1,8 +1,55 @@
 #!/usr/bin/env python3
 
 import json
-import requests
-from typing import Dict, List, Tuple, Optional
+import time
+import socket
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Tuple, Optional, Union
+from terminal_llm_chat.cache import ResponseCache
+from terminal_llm_chat.catalog import FALLBACK_MODELS, ModelCatalog
+from terminal_llm_chat.failover import CircuitBreaker, Cancelled, current_cancellation, hedged_chunks
+from terminal_llm_chat.metrics import MetricsRecorder
+from terminal_llm_chat.ratelimit import (RETRY_STATUSES, THROTTLE_STATUSES, backoff_delay,
+                                         parse_retry_after, shared_limiter)
+
+PROVIDERS = ["openai", "anthropic", "openrouter", "ollama"]
+
+# API roots; [API] <PROVIDER>_BASE_URL points a provider elsewhere, such as
+# a proxy or the benchmark suite's mock server
+BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "anthropic": "https://api.anthropic.com/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+    "ollama": "http://localhost:11434/api"
+}
+
+
+class CompletionStream:
+    """Iterator of text deltas that also carries the provider's usage report
+
+    ``usage`` is filled in with ``prompt_tokens`` and ``completion_tokens``
+    once the provider reports them, normally at the end of the stream.
+    """
+    
+    def __init__(self, chunks: Iterator[str], usage: Dict, provider: str, model: str, cached=False):
+        self.chunks = chunks
+        self.usage = usage
+        self.provider = provider
+        self.model = model
+        self.cached = cached
+        # Filled in by the request (wait, connect) and once the stream ends
+        self.timings = {}
+        self.metrics = {}
+        # Callers that add their own numbers (e.g. render time) turn this
+        # off and record the metrics themselves
+        self.auto_record = True
+    
+    def __iter__(self):
+        return self.chunks
+    
+    def __next__(self):
+        return next(self.chunks)
 
 class LLMProvider:
     def __init__(self, config):
@@ -13,6 +60,280 @@ class LLMProvider:
         self.system_prompt = config.get("SYSTEM", "DEFAULT_PROMPT", "You are a helpful AI assistant.")
         self.temperature = config.get_float("SYSTEM", "TEMPERATURE", 0.7)
         self.max_tokens = config.get_int("SYSTEM", "MAX_TOKENS", 2000)
+        
+        # HTTP connection pooling
+        self.pool_size = config.get_int("NETWORK", "POOL_SIZE", 4)
+        self.timeout = (
+            config.get_float("NETWORK", "CONNECT_TIMEOUT", 10.0),
+            config.get_float("NETWORK", "READ_TIMEOUT", 120.0)
+        )
+        self.keep_alive = config.get_bool("NETWORK", "KEEP_ALIVE", True)
+        self._sessions = {}
+        
+        # Retries of throttled and failed requests
+        self.max_retries = config.get_int("RATE_LIMIT", "MAX_RETRIES", 4)
+        self.backoff_base = config.get_float("RATE_LIMIT", "BACKOFF_BASE", 1.0)
+        self.backoff_max = config.get_float("RATE_LIMIT", "BACKOFF_MAX", 60.0)
+        
+        # Fallback providers tried after the active one, as provider:model targets
+        chain = config.get("FAILOVER", "CHAIN", "")
+        self.failover_chain = [self.parse_target(target.strip()) for target in chain.split(",") if target.strip()]
+        self.hedge_after = config.get_float("FAILOVER", "HEDGE_AFTER_MS", 2000) / 1000
+        self.breaker = CircuitBreaker(config.get_int("FAILOVER", "BREAKER_FAILURES", 3),
+                                      config.get_float("FAILOVER", "BREAKER_COOLDOWN", 60.0))
+        
+        # Let providers reuse their cache of the unchanged start of each prompt
+        self.prompt_cache = config.get_bool("PROMPT_CACHE", "ENABLED", True)
+        
+        # How long Ollama keeps a model loaded, and whether to load it early
+        self.ollama_keep_alive = config.get("OLLAMA", "KEEP_ALIVE", "30m")
+        self.auto_warm = config.get_bool("OLLAMA", "WARM_UP", True)
+        self.warm_status: Dict[str, str] = {}
+        self._warming: Dict[str, threading.Thread] = {}
+        self._warm_lock = threading.Lock()
+        
+        # Per-call latency and throughput, for /stats and optional export
+        self.metrics = MetricsRecorder(config.config_dir,
+                                       window=config.get_int("METRICS", "WINDOW", 1000),
+                                       trace=config.get_bool("METRICS", "TRACE", False),
+                                       prometheus=config.get_bool("METRICS", "PROMETHEUS", False))
+        
+        # Usage reported for the most recent completion
+        self.last_usage = {}
+        
+        # Cached model lists and metadata, refreshed in the background
+        self.catalog = ModelCatalog(self, config)
+        
+        # Optional on-disk cache of deterministic responses
+        self.cache = None
+        if config.get_bool("CACHE", "ENABLED", False):
+            self.enable_cache(True)
+    
+    def _session(self, provider: str) -> "requests.Session":
+        """Get the pooled HTTP session for a provider, creating it on first use"""
+        session = self._sessions.get(provider)
+        if session is None:
+            # requests is slow to import, so load it on the first network call
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            self._sessions[provider] = session
+        return session
+    
+    def close(self):
+        """Close all pooled HTTP connections and the response cache"""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+        self.metrics.close()
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+    
+    def limiter(self, provider: str):
+        """Get the rate limiter shared by every caller using a provider and key
+
+        Budgets come from [RATE_LIMIT], where e.g. OPENAI_TOKENS_PER_MIN
+        overrides TOKENS_PER_MIN for one provider.
+        """
+        def setting(name, default):
+            value = self.config.get_float("RATE_LIMIT", name, default)
+            return self.config.get_float("RATE_LIMIT", f"{provider.upper()}_{name}", value)
+        
+        return shared_limiter(
+            (provider, self._api_key(provider)),
+            requests_per_min=setting("REQUESTS_PER_MIN", 0),
+            tokens_per_min=setting("TOKENS_PER_MIN", 0),
+            max_concurrency=int(setting("MAX_CONCURRENCY", 8)),
+            min_concurrency=int(setting("MIN_CONCURRENCY", 1))
+        )
+    
+    def _estimate_tokens(self, payload: Dict) -> int:
+        """Rough token cost of a request for the tokens/min budget
+
+        Providers count the requested max_tokens against the budget up
+        front, so this does too and is corrected from the reported usage.
+        """
+        def length(content):
+            # Content given as blocks, as when marked for prompt caching
+            if isinstance(content, list):
+                return sum(len(block.get("text", "")) for block in content)
+            return len(content or "")
+        
+        text = sum(length(msg.get("content")) for msg in payload.get("messages", []))
+        text += length(payload.get("system"))
+        return text // 4 + self.max_tokens
+    
+    @contextmanager
+    def _request(self, provider: str, url: str, payload: Dict, headers: Optional[Dict] = None,
+                 stream=True, usage: Optional[Dict] = None, timings: Optional[Dict] = None):
+        """POST a completion request under the provider's rate limiter
+
+        Throttling and server errors are retried with exponential backoff
+        and jitter, waiting at least as long as any Retry-After header, as
+        long as nothing has been received yet. The concurrency slot is held
+        until the caller has finished reading the response. ``timings`` gets
+        the time spent waiting on the limiter and retries ("wait") and from
+        sending the final attempt to its response headers ("connect").
+
+        Run as a hedged attempt, the request gives up while waiting once the
+        attempt is cancelled, and cancelling it aborts the response's reads.
+        """
+        import requests
+        timings = timings if timings is not None else {}
+        start = time.perf_counter()
+        limiter = self.limiter(provider)
+        estimate = self._estimate_tokens(payload)
+        cancel = current_cancellation()
+        if not limiter.acquire(cancel):
+            raise Cancelled(provider)
+        try:
+            attempt = 0
+            while True:
+                if not limiter.wait_turn(estimate, cancel):
+                    raise Cancelled(provider)
+                sent = time.perf_counter()
+                try:
+                    response = self._session(provider).post(url, headers=headers, json=payload,
+                                                            stream=stream, timeout=self.timeout)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    # A local Ollama that isn't running won't start by waiting
+                    if provider == "ollama" or attempt >= self.max_retries:
+                        raise
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                        break
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status_code in THROTTLE_STATUSES:
+                        limiter.throttle(retry_after)
+                    response.close()
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+                attempt += 1
+                limiter.record_retry()
+                if cancel is None:
+                    time.sleep(delay)
+                elif cancel.wait(delay):
+                    raise Cancelled(provider)
+            
+            timings["wait"] = sent - start
+            timings["connect"] = time.perf_counter() - sent
+            with response:
+                if cancel is not None and not cancel.register(lambda: self._abort(response)):
+                    raise Cancelled(provider)
+                try:
+                    if response.status_code in THROTTLE_STATUSES:
+                        limiter.throttle(parse_retry_after(response.headers.get("Retry-After")))
+                    response.raise_for_status()
+                    limiter.succeeded()
+                    yield response
+                finally:
+                    if cancel is not None:
+                        cancel.unregister()
+            if usage:
+                limiter.settle(estimate, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+        finally:
+            limiter.release()
+    
+    @staticmethod
+    def _abort(response):
+        """Make a read blocked on a streamed response fail, from another thread
+
+        Closing the response would wait for the reader; shutting the socket
+        down wakes it at once, and it closes the response as it unwinds.
+        """
+        sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def enable_cache(self, enabled: bool):
+        """Turn the response cache on or off"""
+        if enabled and self.cache is None:
+            self.cache = ResponseCache(self.config)
+        elif not enabled and self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
+    def _api_key(self, provider: str) -> str:
+        """Get the API key for a provider
+
+        The main API_KEY belongs to the configured provider; keys for other
+        providers can be given as e.g. ANTHROPIC_API_KEY in the [API] section.
+        """
+        key = self.config.get("API", f"{provider.upper()}_API_KEY", "")
+        if not key and provider == self.provider:
+            key = self.api_key
+        return key
+    
+    def _url(self, provider: str, path: str) -> str:
+        """Build an API URL under a provider's (possibly overridden) root"""
+        base = self.config.get("API", f"{provider.upper()}_BASE_URL", "") or BASE_URLS[provider]
+        return f"{base.rstrip('/')}/{path}"
+    
+    def warm_up(self, model: Optional[str] = None, provider: Optional[str] = None) -> Optional[threading.Thread]:
+        """Load an Ollama model in the background so the next request doesn't wait
+
+        Hosted providers need no warming, so nothing happens for them. The
+        outcome is kept in ``warm_status``. Returns the loading thread, or
+        None if there is nothing to do or the model is already loading.
+        """
+        provider = provider or self.provider
+        model = model or self.model
+        if provider != "ollama":
+            return None
+        with self._warm_lock:
+            thread = self._warming.get(model)
+            if thread is not None and thread.is_alive():
+                return None
+            self.warm_status[model] = "loading"
+            thread = threading.Thread(target=self._warm, args=(model,), daemon=True)
+            self._warming[model] = thread
+            thread.start()
+        return thread
+    
+    def _warm(self, model: str):
+        """Ask Ollama to load a model; an empty chat request only loads it"""
+        payload = {"model": model, "messages": []}
+        if self.ollama_keep_alive:
+            payload["keep_alive"] = self.ollama_keep_alive
+        start = time.perf_counter()
+        try:
+            response = self._session("ollama").post(self._url("ollama", "chat"), json=payload,
+                                                    timeout=self.timeout)
+            response.raise_for_status()
+            status = f"ready (loaded in {time.perf_counter() - start:.1f}s)"
+        except Exception as e:
+            status = f"failed: {str(e)}"
+        with self._warm_lock:
+            self.warm_status[model] = status
+    
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        """Get embeddings for texts from a local Ollama model"""
+        payload = {"model": model, "input": texts}
+        if self.ollama_keep_alive:
+            payload["keep_alive"] = self.ollama_keep_alive
+        response = self._session("ollama").post(self._url("ollama", "embed"), json=payload,
+                                                timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
+    
+    def parse_target(self, target: str) -> Tuple[str, str]:
+        """Split a "provider:model" string into (provider, model)
+
+        Targets without a known provider prefix use the configured provider.
+        """
+        prefix, sep, model = target.partition(":")
+        if sep and prefix in PROVIDERS:
+            return prefix, model
+        return self.provider, target
     
     def set_model(self, model_name):
         """Set the active model"""
@@ -22,127 +343,435 @@ class LLMProvider:
         """Set the system prompt"""
         self.system_prompt = prompt
     
-    def get_available_models(self) -> List[str]:
-        """Get a list of available models from the provider"""
-        if self.provider == "openai":
+    def get_available_models(self, provider: Optional[str] = None) -> List[str]:
+        """Get a list of available models from the provider's cached catalog"""
+        return self.catalog.get_models(provider or self.provider)
+    
+    def fetch_models(self, provider: str) -> Dict[str, Dict]:
+        """Fetch available models and their metadata from a provider's API"""
+        if provider == "openai":
             return self._get_openai_models()
-        elif self.provider == "anthropic":
+        elif provider == "anthropic":
             return self._get_anthropic_models()
-        elif self.provider == "openrouter":
+        elif provider == "openrouter":
             return self._get_openrouter_models()
-        elif self.provider == "ollama":
+        elif provider == "ollama":
             return self._get_ollama_models()
         else:
-            return [self.model]  # Return current model as fallback
+            raise ValueError(f"Unsupported provider: {provider}")
     
-    def _get_openai_models(self) -> List[str]:
+    def _get_openai_models(self) -> Dict[str, Dict]:
         """Get available OpenAI models"""
-        try:
-            url = "https://api.openai.com/v1/models"
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Filter for chat models
-            chat_models = [model["id"] for model in data["data"] 
-                          if model["id"].startswith(("gpt-")) and 
-                          not model["id"].endswith(("instruct"))]
-            return sorted(chat_models)
-        except Exception as e:
-            print(f"Error fetching OpenAI models: {str(e)}")
-            return ["gpt-3.5-turbo", "gpt-4"]
+        url = self._url("openai", "models")
+        headers = {"Authorization": f"Bearer {self._api_key('openai')}"}
+        response = self._session("openai").get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Filter for chat models
+        chat_models = [model["id"] for model in data["data"] 
+                      if model["id"].startswith(("gpt-")) and 
+                      not model["id"].endswith(("instruct"))]
+        return {model: {} for model in sorted(chat_models)}
     
-    def _get_anthropic_models(self) -> List[str]:
+    def _get_anthropic_models(self) -> Dict[str, Dict]:
         """Get available Anthropic models"""
         # Anthropic doesn't have a models endpoint in their API v1
         # So we return a static list of known models
-        return [
-            "claude-3-opus",
-            "claude-3-sonnet",
-            "claude-3-haiku",
-            "claude-2.1",
-            "claude-2.0",
-            "claude-instant-1.2"
-        ]
-    
-    def _get_openrouter_models(self) -> List[str]:
+        return {model: {} for model in FALLBACK_MODELS["anthropic"]}
+    
+    def _get_openrouter_models(self) -> Dict[str, Dict]:
         """Get available OpenRouter models"""
-        try:
-            url = "https://openrouter.ai/api/v1/models"
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            return [model["id"] for model in data["data"]]
-        except Exception as e:
-            print(f"Error fetching OpenRouter models: {str(e)}")
-            return ["openai/gpt-3.5-turbo", "anthropic/claude-3-opus"]
+        url = self._url("openrouter", "models")
+        headers = {"Authorization": f"Bearer {self._api_key('openrouter')}"}
+        response = self._session("openrouter").get(url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        models = {}
+        for model in data["data"]:
+            info = {}
+            if model.get("context_length"):
+                info["context_length"] = int(model["context_length"])
+            pricing = model.get("pricing") or {}
+            try:
+                # OpenRouter prices are USD per token; keep them per million
+                info["pricing"] = [float(pricing["prompt"]) * 1_000_000,
+                                   float(pricing["completion"]) * 1_000_000]
+            except (KeyError, TypeError, ValueError):
+                pass
+            models[model["id"]] = info
+        return models
     
-    def _get_ollama_models(self) -> List[str]:
+    def _get_ollama_models(self) -> Dict[str, Dict]:
         """Get available Ollama models"""
+        url = self._url("ollama", "tags")
+        response = self._session("ollama").get(url, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        
+        return {model["name"]: {} for model in data["models"]}
+    
+    def get_completion(self, messages: List[Dict], stream=True, model: Optional[str] = None,
+                       provider: Optional[str] = None) -> Union[str, Iterator[str]]:
+        """Get completion from the LLM provider
+
+        With ``stream=True`` a ``CompletionStream`` of text deltas is returned
+        as they arrive from the provider; otherwise the finished reply as a
+        string. ``model`` and ``provider`` override the active ones for this
+        call only. Without an explicit provider, a configured failover chain
+        is hedged and failed over to, and the stream reports which provider
+        and model answered.
+        """
+        failover = provider is None and bool(self.failover_chain)
+        provider = provider or self.provider
+        model = model or self.model
+        usage = {}
+        self.last_usage = usage
+        
+        cache_key = None
+        if self.cache and self.cache.should_cache(self.temperature):
+            cache_key = self.cache.make_key(provider, model, self.system_prompt, messages,
+                                            self.temperature, self.max_tokens)
+            hit = self.cache.get(cache_key)
+            if hit:
+                response, cached_usage = hit
+                usage.update(cached_usage)
+                if stream:
+                    return CompletionStream(iter([response]), usage, provider, model, cached=True)
+                return response
+        
+        timings = {}
+        chunks = self._dispatch(provider, messages, stream, model, usage, timings)
+        if cache_key:
+            chunks = self._cache_chunks(cache_key, chunks, usage)
+        completion = CompletionStream(chunks, usage, provider, model)
+        completion.timings = timings
+        if failover:
+            completion.chunks = self._failover_chunks(completion, messages, stream)
+        completion.chunks = self._measured_chunks(completion, completion.chunks)
+        if stream:
+            return completion
+        return "".join(completion)
+    
+    def _dispatch(self, provider: str, messages: List[Dict], stream: bool, model: str,
+                  usage: Dict, timings: Optional[Dict] = None) -> Iterator[str]:
+        """Start a completion with one provider"""
+        if provider == "openai":
+            return self._get_openai_completion(messages, stream, model, usage, timings)
+        elif provider == "anthropic":
+            return self._get_anthropic_completion(messages, stream, model, usage, timings)
+        elif provider == "openrouter":
+            return self._get_openrouter_completion(messages, stream, model, usage, timings)
+        elif provider == "ollama":
+            return self._get_ollama_completion(messages, stream, model, usage, timings)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+    
+    def _failover_chunks(self, completion: CompletionStream, messages: List[Dict], stream: bool) -> Iterator[str]:
+        """Hedge the completion across the failover chain
+
+        The primary attempt is the completion's own (possibly cache-wrapped)
+        stream, so only a reply from the primary is cached.
+        """
+        primary = (completion.chunks, completion.usage, completion.timings)
+        attempts = [(completion.provider, completion.model, lambda: primary)]
+        for provider, model in self.failover_chain:
+            def start(provider=provider, model=model):
+                usage, timings = {}, {}
+                return self._dispatch(provider, messages, stream, model, usage, timings), usage, timings
+            attempts.append((provider, model, start))
+        
+        def on_winner(provider, model, usage, timings):
+            completion.provider = provider
+            completion.model = model
+            completion.usage = usage
+            completion.timings = timings
+            self.last_usage = usage
+        
+        return hedged_chunks(attempts, self.breaker, self.hedge_after, on_winner)
+    
+    def _measured_chunks(self, completion: CompletionStream, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass deltas through, timing the call into ``completion.metrics``
+
+        The metrics are recorded when the stream ends or fails, unless the
+        caller turned ``auto_record`` off; abandoned streams are not recorded.
+        """
+        start = time.perf_counter()
+        first = None
         try:
-            url = "http://localhost:11434/api/tags"
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            return [model["name"] for model in data["models"]]
+            for delta in chunks:
+                if first is None:
+                    first = time.perf_counter()
+                yield delta
         except Exception as e:
-            print(f"Error fetching Ollama models: {str(e)}")
-            return ["llama3", "mistral", "gemma"]
-    
-    def get_completion(self, messages: List[Dict], stream=True) -> str:
-        """Get completion from the LLM provider"""
-        if self.provider == "openai":
-            return self._get_openai_completion(messages, stream)
-        elif self.provider == "anthropic":
-            return self._get_anthropic_completion(messages, stream)
-        elif self.provider == "openrouter":
-            return self._get_openrouter_completion(messages, stream)
-        elif self.provider == "ollama":
-            return self._get_ollama_completion(messages, stream)
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
+            self._finish_metrics(completion, start, first, str(e))
+            raise
+        self._finish_metrics(completion, start, first)
+    
+    def _finish_metrics(self, completion: CompletionStream, start: float, first: Optional[float],
+                        error: Optional[str] = None):
+        """Fill in a finished call's metrics and record them"""
+        end = time.perf_counter()
+        completion_tokens = completion.usage.get("completion_tokens")
+        generation = end - first if first is not None else 0
+        completion.metrics = dict(
+            completion.timings,
+            provider=completion.provider,
+            model=completion.model,
+            ttft=first - start if first is not None else None,
+            total=end - start,
+            prompt_tokens=completion.usage.get("prompt_tokens"),
+            completion_tokens=completion_tokens,
+            # Decode speed: tokens after the first over the time after it
+            tokens_per_sec=(completion_tokens - 1) / generation
+            if completion_tokens and completion_tokens > 1 and generation > 0 else None
+        )
+        if error:
+            completion.metrics["error"] = error
+        if completion.auto_record:
+            self.metrics.record(completion.metrics)
+    
+    def _cache_chunks(self, key: str, chunks: Iterator[str], usage: Dict) -> Iterator[str]:
+        """Pass deltas through and cache the reply once the stream completes"""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        response = "".join(parts)
+        if not response.startswith("ERROR:"):
+            self.cache.put(key, response, usage)
+    
+    def _iter_lines(self, response) -> Iterator[str]:
+        """Iterate over the decoded lines of a streamed HTTP response"""
+        for line in response.iter_lines():
+            if line:
+                yield line.decode("utf-8")
+    
+    def _iter_sse(self, response) -> Iterator[Tuple[str, str]]:
+        """Parse a server-sent event stream into (event, data) pairs"""
+        event = "message"
+        data = []
+        for line in response.iter_lines():
+            line = line.decode("utf-8")
+            if not line:
+                # A blank line terminates the current event
+                if data:
+                    yield event, "\n".join(data)
+                event = "message"
+                data = []
+                continue
+            if line.startswith(":"):
+                continue
+            field, _, value = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+        if data:
+            yield event, "\n".join(data)
+    
+    def _openai_compatible_completion(self, provider: str, url: str, headers: Dict, messages: List[Dict],
+                                      stream=True, model=None, usage=None, timings=None) -> Iterator[str]:
+        """Stream a chat completion from an OpenAI-compatible endpoint"""
+        usage = usage if usage is not None else {}
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+        if stream:
+            # Ask for a final chunk carrying the token usage
+            payload["stream_options"] = {"include_usage": True}
+        with self._request(provider, url, payload, headers, stream, usage, timings) as response:
+            if not stream:
+                data = response.json()
+                self._openai_usage(data.get("usage"), usage)
+                yield data["choices"][0]["message"]["content"] or ""
+                return
+            
+            for _, data in self._iter_sse(response):
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"].get("message", str(chunk["error"])))
+                self._openai_usage(chunk.get("usage"), usage)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    
+    def _openai_usage(self, reported: Optional[Dict], usage: Dict):
+        """Copy an OpenAI-style usage object into ``usage``"""
+        if reported:
+            usage["prompt_tokens"] = reported.get("prompt_tokens", 0)
+            usage["completion_tokens"] = reported.get("completion_tokens", 0)
+            # Prefixes of 1024+ tokens are cached automatically
+            details = reported.get("prompt_tokens_details") or {}
+            if "cached_tokens" in details:
+                usage["cached_tokens"] = details["cached_tokens"] or 0
     
-    def _get_openai_completion(self, messages: List[Dict], stream=True) -> str:
+    def _anthropic_usage(self, reported: Dict, usage: Dict):
+        """Copy an Anthropic usage object into ``usage``
+
+        ``input_tokens`` leaves out tokens read from or written to the prompt
+        cache, so they are added back to give the whole prompt.
+        """
+        read = reported.get("cache_read_input_tokens") or 0
+        written = reported.get("cache_creation_input_tokens") or 0
+        usage["prompt_tokens"] = reported.get("input_tokens", 0) + read + written
+        usage["completion_tokens"] = reported.get("output_tokens", 0)
+        if "cache_read_input_tokens" in reported or "cache_creation_input_tokens" in reported:
+            usage["cached_tokens"] = read
+            usage["cache_write_tokens"] = written
+    
+    def _anthropic_cache_points(self, payload: Dict):
+        """Mark the system prompt and the newest message as cache breakpoints
+
+        The cache entry written at the newest message covers the whole
+        conversation so far, and the next turn, which repeats it and adds
+        two messages, reads it back. Prompts below the model's minimum
+        cacheable length are sent normally.
+        """
+        marker = {"type": "ephemeral"}
+        if payload.get("system"):
+            payload["system"] = [{"type": "text", "text": payload["system"], "cache_control": marker}]
+        if payload["messages"]:
+            last = payload["messages"][-1]
+            last["content"] = [{"type": "text", "text": last["content"], "cache_control": marker}]
+    
+    def _get_openai_completion(self, messages: List[Dict], stream=True, model=None, usage=None,
+                               timings=None) -> Iterator[str]:
         """Get completion from OpenAI API"""
-        # Placeholder implementation - in a real application, this would
-        # handle streaming responses properly
-        if not self.api_key:
-            return "ERROR: OpenAI API key not configured. Run --setup to configure."
+        api_key = self._api_key("openai")
+        if not api_key:
+            yield "ERROR: OpenAI API key not configured. Run --setup to configure."
+            return
         
-        # Dummy implementation for example purposes
-        prompt = messages[-1]["content"] if messages else ""
-        return f"This is a simulated OpenAI response to: {prompt}"
+        url = self._url("openai", "chat/completions")
+        headers = {"Authorization": f"Bearer {api_key}"}
+        yield from self._openai_compatible_completion("openai", url, headers, messages, stream, model, usage, timings)
     
-    def _get_anthropic_completion(self, messages: List[Dict], stream=True) -> str:
+    def _get_anthropic_completion(self, messages: List[Dict], stream=True, model=None, usage=None,
+                                  timings=None) -> Iterator[str]:
         """Get completion from Anthropic API"""
-        # Placeholder implementation
-        if not self.api_key:
-            return "ERROR: Anthropic API key not configured. Run --setup to configure."
+        api_key = self._api_key("anthropic")
+        if not api_key:
+            yield "ERROR: Anthropic API key not configured. Run --setup to configure."
+            return
+        usage = usage if usage is not None else {}
+        
+        # Anthropic takes the system prompt as a separate field
+        system = "\n\n".join(msg["content"] for msg in messages if msg["role"] == "system")
+        payload = {
+            "model": model or self.model,
+            "messages": [{"role": msg["role"], "content": msg["content"]}
+                         for msg in messages if msg["role"] != "system"],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+        if system:
+            payload["system"] = system
+        if self.prompt_cache:
+            self._anthropic_cache_points(payload)
         
-        # Dummy implementation for example purposes
-        prompt = messages[-1]["content"] if messages else ""
-        return f"This is a simulated Anthropic response to: {prompt}"
+        url = self._url("anthropic", "messages")
+        headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01"
+        }
+        with self._request("anthropic", url, payload, headers, stream, usage, timings) as response:
+            if not stream:
+                data = response.json()
+                self._anthropic_usage(data.get("usage", {}), usage)
+                yield "".join(block.get("text", "") for block in data["content"]
+                              if block.get("type") == "text")
+                return
+            
+            for event, data in self._iter_sse(response):
+                if event == "content_block_delta":
+                    delta = json.loads(data).get("delta", {})
+                    if delta.get("type") == "text_delta" and delta.get("text"):
+                        yield delta["text"]
+                elif event == "message_start":
+                    self._anthropic_usage(json.loads(data).get("message", {}).get("usage", {}), usage)
+                elif event == "message_delta":
+                    reported = json.loads(data).get("usage", {})
+                    if "output_tokens" in reported:
+                        usage["completion_tokens"] = reported["output_tokens"]
+                elif event == "error":
+                    error = json.loads(data).get("error", {})
+                    raise RuntimeError(error.get("message", data))
+                elif event == "message_stop":
+                    break
     
-    def _get_openrouter_completion(self, messages: List[Dict], stream=True) -> str:
+    def _get_openrouter_completion(self, messages: List[Dict], stream=True, model=None, usage=None,
+                                   timings=None) -> Iterator[str]:
         """Get completion from OpenRouter API"""
-        # Placeholder implementation
-        if not self.api_key:
-            return "ERROR: OpenRouter API key not configured. Run --setup to configure."
+        api_key = self._api_key("openrouter")
+        if not api_key:
+            yield "ERROR: OpenRouter API key not configured. Run --setup to configure."
+            return
         
-        # Dummy implementation for example purposes
-        prompt = messages[-1]["content"] if messages else ""
-        return f"This is a simulated OpenRouter response to: {prompt}"
+        url = self._url("openrouter", "chat/completions")
+        headers = {"Authorization": f"Bearer {api_key}"}
+        yield from self._openai_compatible_completion("openrouter", url, headers, messages, stream, model, usage, timings)
     
-    def _get_ollama_completion(self, messages: List[Dict], stream=True) -> str:
+    def _get_ollama_completion(self, messages: List[Dict], stream=True, model=None, usage=None,
+                               timings=None) -> Iterator[str]:
         """Get completion from Ollama API"""
-        # Placeholder implementation
-        try:
-            # Dummy implementation for example purposes
-            prompt = messages[-1]["content"] if messages else ""
-            return f"This is a simulated Ollama response to: {prompt}"
-        except Exception as e:
-            return f"ERROR: Could not connect to Ollama. Make sure it's running locally: {str(e)}"
+        usage = usage if usage is not None else {}
+        url = self._url("ollama", "chat")
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.max_tokens
+            }
+        }
+        if self.ollama_keep_alive:
+            # Stay loaded between turns; Ollama also only reuses the KV cache
+            # of a matching prompt prefix while the model is loaded
+            payload["keep_alive"] = self.ollama_keep_alive
+        import requests
+        with ExitStack() as stack:
+            try:
+                response = stack.enter_context(
+                    self._request("ollama", url, payload, None, stream, usage, timings))
+            except requests.exceptions.ConnectionError as e:
+                yield f"ERROR: Could not connect to Ollama. Make sure it's running locally: {str(e)}"
+                return
+            
+            if not stream:
+                data = response.json()
+                self._ollama_usage(data, usage)
+                yield data["message"]["content"]
+                return
+            
+            # Ollama streams newline-delimited JSON objects
+            for line in self._iter_lines(response):
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    self._ollama_usage(chunk, usage)
+                    break
+    
+    def _ollama_usage(self, chunk: Dict, usage: Dict):
+        """Copy the token counts from Ollama's final chunk into ``usage``"""
+        if "prompt_eval_count" in chunk or "eval_count" in chunk:
+            usage["prompt_tokens"] = chunk.get("prompt_eval_count", 0)
+            usage["completion_tokens"] = chunk.get("eval_count", 0)
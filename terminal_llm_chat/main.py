@@ -2,10 +2,8 @@
 
 import argparse
 import sys
-from terminal_llm_chat.chat import ChatSession
 from terminal_llm_chat.config import Config
-from terminal_llm_chat.ui import TerminalUI
-from terminal_llm_chat.llm import LLMProvider
+from terminal_llm_chat.startup import StartupProfiler
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Terminal LLM Chat - A retro terminal interface for AI chat")
@@ -14,36 +12,138 @@ def parse_args():
     parser.add_argument("--theme", type=str, help="UI theme (green, amber, blue, matrix, custom)")
     parser.add_argument("--setup", action="store_true", help="Run the setup wizard")
     parser.add_argument("--load", type=str, help="Load a previous conversation")
-    return parser.parse_args()
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print a breakdown of startup and import time before the first prompt")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile CPU time and memory of every turn (see /profile)")
+    
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser("batch", help="Run a JSONL file of prompts without the chat interface")
+    batch.add_argument("--input", required=True, help="JSONL file with one prompt or messages list per line")
+    batch.add_argument("--output", required=True, help="JSONL file for results; an existing one is resumed")
+    batch.add_argument("--concurrency", type=int, help="Number of requests to run at once")
+    batch.add_argument("--model", type=str, default=argparse.SUPPRESS, help="Default model for the batch")
+    batch.add_argument("--system", type=str, default=argparse.SUPPRESS, help="Default system prompt")
+    
+    export = subparsers.add_parser("export", help="Export saved conversations to Markdown, text or HTML")
+    export.add_argument("names", nargs="*", help="Conversations to export (file names in the conversations folder)")
+    export.add_argument("--all", action="store_true", help="Export every saved conversation")
+    export.add_argument("--format", choices=["md", "txt", "html"], default="md", help="Output format")
+    export.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    export.add_argument("--output-dir", help="Folder for the exports (default: the conversations folder)")
+    
+    archive = subparsers.add_parser("archive", help="Convert saved JSON conversations to the compact format")
+    archive.add_argument("names", nargs="*", help="Conversations to convert")
+    archive.add_argument("--all", action="store_true", help="Convert every saved JSON conversation")
+    archive.add_argument("--compression", choices=["gzip", "zstd"], help="Block compression (default from [ARCHIVE])")
+    archive.add_argument("--remove-json", action="store_true", help="Delete each JSON file once converted")
+    args = parser.parse_args()
+    if args.command == "export" and not (args.all or args.names):
+        export.error("give conversation names or --all")
+    if args.command == "archive" and not (args.all or args.names):
+        archive.error("give conversation names or --all")
+    return args
+
+def run_batch_command(config, args):
+    """Run ``terminal-chat batch`` headlessly"""
+    from terminal_llm_chat.batch import run_batch
+    from terminal_llm_chat.llm import LLMProvider
+    
+    llm = LLMProvider(config)
+    if args.model:
+        llm.set_model(args.model)
+    if args.system:
+        llm.set_system_prompt(args.system)
+    concurrency = args.concurrency or config.get_int("BATCH", "CONCURRENCY", 8)
+    try:
+        return run_batch(llm, args.input, args.output, concurrency)
+    finally:
+        llm.close()
+
+def run_export_command(config, args):
+    """Run ``terminal-chat export`` headlessly"""
+    import os
+    from terminal_llm_chat.export import run_export
+    
+    conversations_dir = os.path.join(config.config_dir, "conversations")
+    jobs = args.jobs or config.get_int("EXPORT", "JOBS", 0) or os.cpu_count() or 1
+    return run_export(conversations_dir, args.output_dir or conversations_dir, args.format, jobs,
+                      None if args.all else args.names)
+
+def run_archive_command(config, args):
+    """Run ``terminal-chat archive`` headlessly"""
+    import os
+    from terminal_llm_chat.archive import run_convert
+    
+    conversations_dir = os.path.join(config.config_dir, "conversations")
+    compression = args.compression or config.get("ARCHIVE", "COMPRESSION", "gzip").lower()
+    block_messages = max(1, config.get_int("ARCHIVE", "BLOCK_MESSAGES", 256))
+    return run_convert(conversations_dir, None if args.all else args.names, compression,
+                       block_messages, args.remove_json)
 
 def main():
     args = parse_args()
+    profiler = StartupProfiler(enabled=args.startup_profile)
+    profiler.install()
     
     # Load configuration
     config = Config()
+    profiler.mark("config")
     if args.setup:
         config.run_setup_wizard()
         return
+    if args.command == "batch":
+        return run_batch_command(config, args)
+    if args.command == "export":
+        return run_export_command(config, args)
+    if args.command == "archive":
+        return run_archive_command(config, args)
+    
+    # Imported here rather than at the top so --setup and --help stay fast;
+    # heavier dependencies are deferred further, to their first use
+    from terminal_llm_chat.chat import ChatSession
+    from terminal_llm_chat.ui import TerminalUI
+    from terminal_llm_chat.llm import LLMProvider
+    profiler.mark("imports")
     
     # Initialize components
     ui = TerminalUI(config, theme=args.theme)
+    profiler.mark("ui")
     llm = LLMProvider(config)
+    llm.catalog.prefetch()
+    profiler.mark("llm provider")
     
     # Override with command line arguments if provided
     if args.model:
         llm.set_model(args.model)
     if args.system:
         llm.set_system_prompt(args.system)
+    if llm.auto_warm:
+        # Start loading a local model while the user types the first question
+        llm.warm_up()
     
     # Create chat session
     session = ChatSession(ui, llm, config)
-    
-    # Load previous conversation if requested
-    if args.load:
-        session.load(args.load)
+    profiler.mark("chat session")
     
     # Display welcome message
     ui.display_welcome()
+    profiler.mark("welcome screen")
+    
+    # Load previous conversation if requested, else offer to restore a session that crashed
+    if args.load:
+        session.cmd_load([args.load])
+    else:
+        session.recover_journal()
+    
+    if args.startup_profile:
+        profiler.mark("load / recovery")
+        profiler.uninstall()
+        ui.display_system_message("\n" + profiler.report())
+    
+    if args.profile:
+        folder = session.profiler.start()
+        ui.display_system_message(f"Profiling each turn; profiles are written to {folder}")
     
     # Start the main loop
     try:
@@ -53,6 +153,9 @@ def main():
     except Exception as e:
         ui.display_error(f"An error occurred: {str(e)}")
         return 1
+    finally:
+        session.close()
+        llm.close()
     
     return 0
 
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+import zlib
+import queue
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from terminal_llm_chat.conversation_io import EXTENSIONS, iter_messages
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_WORD = re.compile(r"\w+")
+
+# Words too common to say what a snippet is about
+STOP_WORDS = frozenset("""
+a about all also an and any are as at be been but by can could did do does for from had has have
+how i if in into is it its me my no not of on or our so that the their them then there these they
+this to was we were what when where which who why will with would you your
+""".split())
+
+def text_hash(text: str) -> int:
+    """Stable 64-bit hash of a text, the same in every process"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def split_chunks(content: str, size: int) -> List[str]:
+    """Split a message into pieces of about ``size`` characters at paragraph
+    or word boundaries
+    """
+    content = content.strip()
+    if len(content) <= size:
+        return [content] if content else []
+    chunks = []
+    current = ""
+    for paragraph in content.split("\n\n"):
+        while len(paragraph) > size:
+            cut = paragraph.rfind(" ", 0, size)
+            cut = cut if cut > size // 2 else size
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 2 > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk]
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+class HashingVectorizer:
+    """Offline embeddings: words and word pairs hashed into a fixed-size vector
+    
+    Stop words are left out. Needs no model or vocabulary, so vectors from
+    different sessions and machines are comparable. Counts are damped with
+    log(1 + n) and rows are L2-normalized, so a dot product is the cosine
+    similarity.
+    """
+    
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hash:{dim}"
+    
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features),
+                                 dtype=np.uint32, count=len(features))
+            # The top bit picks the sign, so collisions tend to cancel out
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            counts = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+            vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return _normalize(vectors)
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama model, e.g. nomic-embed-text"""
+    
+    def __init__(self, llm, model: str):
+        self.llm = llm
+        self.model = model
+        self.name = f"ollama:{model}"
+    
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        return _normalize(np.asarray(self.llm.embed(texts, self.model), dtype=np.float32))
+
+class VectorIndex:
+    """Embeddings of message chunks in memory-mapped files, searched by cosine
+    
+    ``vectors.f32`` holds one normalized float32 row per chunk and
+    ``rows.u64`` three uint64 per chunk: the offset of its JSON line in
+    ``texts.jsonl``, the hash of the chunk (to skip duplicates) and the hash
+    of the message it came from (to leave out messages already in the
+    prompt). All three files are only ever appended to, under a lock, and a
+    row counts once both its vector and its row entry are complete.
+    ``index.json`` names the embedder the vectors came from; switching
+    embedders starts a new index.
+    """
+    
+    ROW_FIELDS = 3
+    
+    def __init__(self, path: str, embedder_name: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta_path = os.path.join(path, "index.json")
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.rows_path = os.path.join(path, "rows.u64")
+        self.texts_path = os.path.join(path, "texts.jsonl")
+        self.lock_path = os.path.join(path, "lock")
+        self.meta = {}
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if self.meta.get("embedder") != embedder_name:
+            self.meta = {"embedder": embedder_name, "dim": None, "sources": {}}
+            with self._locked():
+                for name in (self.vectors_path, self.rows_path, self.texts_path):
+                    open(name, 'wb').close()
+                self.save_meta()
+        self.dim = self.meta.get("dim")
+        self._hashes = None
+        self._cache = None  # (count, vectors memmap, rows memmap)
+    
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across sessions sharing the index"""
+        with open(self.lock_path, 'a') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    def save_meta(self):
+        temp = self.meta_path + ".tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(temp, self.meta_path)
+    
+    def __len__(self) -> int:
+        if not self.dim:
+            return 0
+        try:
+            vectors = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            rows = os.path.getsize(self.rows_path) // (8 * self.ROW_FIELDS)
+        except OSError:
+            return 0
+        return min(vectors, rows)
+    
+    def _arrays(self) -> Tuple[int, Optional["np.ndarray"], Optional["np.ndarray"]]:
+        """Memory maps of the complete rows, reopened when rows were added"""
+        count = len(self)
+        if self._cache is None or self._cache[0] != count:
+            if count == 0:
+                self._cache = (0, None, None)
+            else:
+                vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(count, self.dim))
+                rows = np.memmap(self.rows_path, dtype=np.uint64, mode='r', shape=(count, self.ROW_FIELDS))
+                self._cache = (count, vectors, rows)
+        return self._cache
+    
+    def known(self, chunk_hash: int) -> bool:
+        """Whether a chunk with this hash is already indexed"""
+        return chunk_hash in self._chunk_hashes()
+    
+    def _chunk_hashes(self) -> set:
+        if self._hashes is None:
+            count, _, rows = self._arrays()
+            self._hashes = set(rows[:, 1].tolist()) if count else set()
+        return self._hashes
+    
+    def add(self, entries: List[Dict], vectors: "np.ndarray"):
+        """Append chunks (dicts with source, position, role, text, hash and
+        message_hash) and their normalized vectors
+        """
+        if not entries:
+            return
+        if self.dim is None:
+            self.dim = self.meta["dim"] = int(vectors.shape[1])
+            self.save_meta()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding size changed from {self.dim} to {vectors.shape[1]}")
+        hashes = self._chunk_hashes()
+        with self._locked():
+            count = len(self)
+            # Drop a row torn by a crash, so vectors and rows stay aligned
+            for name, width in ((self.vectors_path, 4 * self.dim), (self.rows_path, 8 * self.ROW_FIELDS)):
+                if os.path.getsize(name) != count * width:
+                    with open(name, 'r+b') as f:
+                        f.truncate(count * width)
+            rows = np.empty((len(entries), self.ROW_FIELDS), dtype=np.uint64)
+            with open(self.texts_path, 'ab') as f:
+                for i, entry in enumerate(entries):
+                    rows[i] = (f.tell(), entry["hash"], entry["message_hash"])
+                    record = {key: entry[key] for key in ("source", "position", "role", "text")}
+                    f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.rows_path, 'ab') as f:
+                f.write(rows.tobytes())
+        hashes.update(entry["hash"] for entry in entries)
+    
+    def search(self, query: "np.ndarray", k: int, exclude: Iterable[int] = (),
+               batch_rows: int = 65536) -> List[Tuple[float, Dict]]:
+        """Top ``k`` chunks by cosine similarity to a normalized query vector
+        
+        The matrix is scored in batches of ``batch_rows``, so only one batch
+        of it is paged in at a time however large the index grows. Chunks of
+        messages whose hash is in ``exclude`` are skipped.
+        """
+        count, vectors, rows = self._arrays()
+        if not count or k <= 0:
+            return []
+        exclude = np.fromiter(exclude, dtype=np.uint64)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, count, batch_rows):
+            scores = vectors[start:start + batch_rows] @ query
+            if exclude.size:
+                scores[np.isin(rows[start:start + batch_rows, 2], exclude)] = -np.inf
+            if scores.size > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(scores.size)
+            best_scores = np.concatenate((best_scores, scores[top]))
+            best_rows = np.concatenate((best_rows, top + start))
+            if best_scores.size > k:
+                keep = np.argpartition(best_scores, -k)[-k:]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores)
+        results = []
+        with open(self.texts_path, 'rb') as f:
+            for i in order:
+                if not np.isfinite(best_scores[i]):
+                    continue
+                f.seek(int(rows[best_rows[i], 0]))
+                results.append((float(best_scores[i]), json.loads(f.readline())))
+        return results
+
+class SemanticMemory:
+    """Recall relevant snippets of this and saved conversations
+    
+    Messages are split into chunks, embedded (offline by hashing, or with
+    an Ollama embedding model) and appended to a ``VectorIndex`` in
+    ``memory/`` under the config dir. New messages and saved conversations
+    are indexed in order on one background thread, so an embedding round
+    trip never holds up the chat. ``recall`` finds the chunks most similar
+    to a query, for the prompt and for /recall.
+    """
+    
+    def __init__(self, config_dir: str, embedder, chunk_chars: int = 800, top_k: int = 4,
+                 min_score: float = 0.2):
+        self.embedder = embedder
+        self.chunk_chars = chunk_chars
+        self.top_k = top_k
+        self.min_score = min_score
+        self.index = VectorIndex(os.path.join(config_dir, "memory"), embedder.name)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.indexing = None
+        self.reindexing = False
+        self.last_error = None
+        self.stop_event = threading.Event()
+    
+    def _submit(self, job, *args):
+        """Queue work for the background indexing thread, starting it if needed"""
+        self.jobs.put((job, args))
+        if self.indexing is None:
+            self.indexing = threading.Thread(target=self._work, name="memory-index", daemon=True)
+            self.indexing.start()
+    
+    def _work(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            job, args = item
+            try:
+                job(*args)
+            except Exception as e:
+                # E.g. Ollama went away; the next job may well succeed
+                self.last_error = str(e)
+    
+    def _entries(self, source: str, position: int, role: str, content: str) -> List[Dict]:
+        """Chunks of one message that are not indexed yet"""
+        if role == "system":
+            return []
+        message_hash = text_hash(content)
+        entries = []
+        for text in split_chunks(content, self.chunk_chars):
+            chunk_hash = text_hash(text)
+            if not self.index.known(chunk_hash):
+                entries.append({"source": source, "position": position, "role": role, "text": text,
+                                "hash": chunk_hash, "message_hash": message_hash})
+        return entries
+    
+    def _add(self, entries: List[Dict]):
+        # The same chunk can appear twice in one batch
+        unique = list({entry["hash"]: entry for entry in entries}.values())
+        if unique:
+            self.index.add(unique, self.embedder.embed([entry["text"] for entry in unique]))
+    
+    def _add_message(self, source: str, position: int, role: str, content: str):
+        with self.lock:
+            self._add(self._entries(source, position, role, content))
+    
+    def add_message(self, source: str, position: int, role: str, content: str):
+        """Queue one message for indexing as it is added to a conversation"""
+        self._submit(self._add_message, source, position, role, content)
+    
+    def add_messages(self, source: str, messages: Iterable, batch: int = 256):
+        """Index a whole conversation, embedding ``batch`` chunks at a time"""
+        pending = []
+        for position, msg in enumerate(messages):
+            if self.stop_event.is_set():
+                return
+            with self.lock:
+                pending.extend(self._entries(source, position, msg["role"], msg["content"]))
+                if len(pending) >= batch:
+                    self._add(pending)
+                    pending = []
+        with self.lock:
+            self._add(pending)
+    
+    def index_directory(self, conversations_dir: str) -> int:
+        """Index saved conversations that are new or changed since last time"""
+        sources = self.index.meta.setdefault("sources", {})
+        indexed = 0
+        try:
+            for filename in sorted(os.listdir(conversations_dir)):
+                if self.stop_event.is_set():
+                    break
+                if not filename.endswith(EXTENSIONS):
+                    continue
+                path = os.path.join(conversations_dir, filename)
+                try:
+                    mtime = os.path.getmtime(path)
+                    if sources.get(filename) == mtime:
+                        continue
+                    self.add_messages(filename, iter_messages(path, {}))
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+                if self.stop_event.is_set():
+                    break
+                sources[filename] = mtime
+                indexed += 1
+                if indexed % 100 == 0:
+                    with self.lock:
+                        self.index.save_meta()
+            with self.lock:
+                self.index.save_meta()
+        finally:
+            self.reindexing = False
+        return indexed
+    
+    def index_directory_async(self, conversations_dir: str):
+        """Queue indexing of saved conversations, unless it is already pending"""
+        if not self.reindexing:
+            self.reindexing = True
+            self._submit(self.index_directory, conversations_dir)
+    
+    def recall(self, query: str, exclude: Iterable[str] = (), k: Optional[int] = None,
+               min_score: Optional[float] = None) -> List[Dict]:
+        """Chunks most similar to ``query``, leaving out those of the messages
+        in ``exclude`` (e.g. those already in the prompt)
+        """
+        k = self.top_k if k is None else k
+        min_score = self.min_score if min_score is None else min_score
+        vector = self.embedder.embed([query])[0]
+        with self.lock:
+            hits = self.index.search(vector, k, (text_hash(content) for content in exclude))
+        return [dict(record, score=score) for score, record in hits if score >= min_score]
+    
+    @staticmethod
+    def format_recall(hits: List[Dict]) -> str:
+        """The recalled snippets as a preamble for the user's message"""
+        parts = ["Possibly relevant excerpts from earlier conversations (use them only if they help):"]
+        for hit in hits:
+            parts.append(f"[{hit['source']}, {hit['role']}]\n{hit['text']}")
+        return "\n\n".join(parts)
+    
+    def close(self):
+        """Stop indexing saved conversations, finish indexing queued messages"""
+        self.stop_event.set()
+        if self.indexing is not None:
+            self.jobs.put(None)
+            self.indexing.join()
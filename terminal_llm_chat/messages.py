@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import sys
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Iterable, Iterator, List, Union
+
+class Message:
+    """One chat message, read like a ``{"role": ..., "content": ...}`` dict
+    
+    Roles are interned so a long conversation shares a handful of strings.
+    The token count (filled in by ``TokenCounter.count_message``) and the
+    JSON encoding are cached on the message and dropped when it changes.
+    """
+    
+    __slots__ = ("role", "content", "tokens", "_json")
+    
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = None
+        self._json = None
+    
+    def __getitem__(self, key: str):
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value: str):
+        if key == "role":
+            self.role = sys.intern(value)
+        elif key == "content":
+            self.content = value
+            self.tokens = None
+        else:
+            raise KeyError(key)
+        self._json = None
+    
+    def __contains__(self, key) -> bool:
+        return key in ("role", "content")
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(("role", "content"))
+    
+    def __len__(self) -> int:
+        return 2
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Message, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+    
+    def get(self, key: str, default=None):
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        return default
+    
+    def keys(self):
+        return ("role", "content")
+    
+    def items(self):
+        return (("role", self.role), ("content", self.content))
+    
+    def to_dict(self) -> Dict:
+        """A plain dict copy, e.g. for a request payload"""
+        return {"role": self.role, "content": self.content}
+    
+    def json(self) -> str:
+        """Compact JSON encoding, as written by /save"""
+        if self._json is None:
+            self._json = (f'{{"role":{encode_basestring_ascii(self.role)},'
+                          f'"content":{encode_basestring_ascii(self.content)}}}')
+        return self._json
+
+class MessageList:
+    """A conversation's messages, stored compactly but used like a list of dicts
+    
+    Indexing gives a ``Message``, which supports ``msg["role"]`` and
+    ``msg["content"]``. Slicing gives a new list of plain dicts, so the
+    result of ``ContextWindow.pack`` can go straight to ``LLMProvider``
+    and into JSON payloads.
+    """
+    
+    def __init__(self, messages: Iterable[Union[Dict, Message]] = ()):
+        self._items: List[Message] = []
+        self.extend(messages)
+    
+    def append(self, message: Union[Dict, Message]) -> Message:
+        """Add a message, converting a dict; returns the stored Message"""
+        if not isinstance(message, Message):
+            message = Message(message["role"], message["content"])
+        self._items.append(message)
+        return message
+    
+    def extend(self, messages: Iterable[Union[Dict, Message]]):
+        for message in messages:
+            self.append(message)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._items)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [message.to_dict() for message in self._items[index]]
+        return self._items[index]
+    
+    def __repr__(self) -> str:
+        return f"MessageList({len(self._items)} messages)"
+    
+    def to_dicts(self) -> List[Dict]:
+        return [message.to_dict() for message in self._items]
+    
+    def write_json(self, f):
+        """Write the messages as a compact JSON array, reusing cached encodings"""
+        f.write("[")
+        # In batches, so a huge conversation is never one string in memory
+        for start in range(0, len(self._items), 1000):
+            if start:
+                f.write(",")
+            f.write(",".join([message.json() for message in self._items[start:start + 1000]]))
+        f.write("]")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict, List
+
+# Per-call measurements kept for percentiles, with their display names.
+# Times are in seconds.
+METRIC_FIELDS = {
+    "wait": "Rate limit wait",
+    "connect": "Connect (to headers)",
+    "ttft": "First token",
+    "total": "Total",
+    "tokens_per_sec": "Tokens/sec",
+    "prompt_tokens": "Prompt tokens",
+    "completion_tokens": "Completion tokens",
+    "render": "Render"
+}
+
+TIME_FIELDS = {"wait", "connect", "ttft", "total", "render"}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(q * len(values) + 0.5) - 1))
+    return values[rank]
+
+class MetricsRecorder:
+    """Per-call latency and throughput numbers, summarised per model
+    
+    The last ``window`` calls of each model are kept in memory for
+    percentiles. Each record can also be appended to a JSONL trace, and a
+    Prometheus textfile with per-model summaries can be rewritten after
+    every call for node_exporter's textfile collector.
+    """
+    
+    def __init__(self, config_dir: str, window: int = 1000, trace: bool = False,
+                 prometheus: bool = False):
+        self.window = window
+        self.samples: Dict[str, Dict[str, deque]] = {}
+        self.sums: Dict[str, Dict[str, List[float]]] = {}  # model -> field -> [sum, count]
+        self.counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.trace_path = os.path.join(config_dir, "metrics.jsonl") if trace else None
+        self.prometheus_path = os.path.join(config_dir, "metrics.prom") if prometheus else None
+        self.trace_file = None
+    
+    def record(self, metrics: Dict):
+        """Add one call's measurements"""
+        model = f"{metrics.get('provider')}:{metrics.get('model')}"
+        with self.lock:
+            samples = self.samples.setdefault(model, {})
+            sums = self.sums.setdefault(model, {})
+            self.counts[model] = self.counts.get(model, 0) + 1
+            for field in METRIC_FIELDS:
+                value = metrics.get(field)
+                if value is None:
+                    continue
+                samples.setdefault(field, deque(maxlen=self.window)).append(value)
+                total = sums.setdefault(field, [0.0, 0])
+                total[0] += value
+                total[1] += 1
+            if self.trace_path:
+                if self.trace_file is None:
+                    self.trace_file = open(self.trace_path, 'a', encoding='utf-8')
+                self.trace_file.write(json.dumps(dict(metrics, ts=time.time())) + "\n")
+                self.trace_file.flush()
+            if self.prometheus_path:
+                self._write_prometheus()
+    
+    def summary(self) -> Dict[str, Dict]:
+        """Per model: call count and (p50, p95, p99) for each field"""
+        with self.lock:
+            result = {}
+            for model, samples in self.samples.items():
+                fields = {}
+                for field in METRIC_FIELDS:
+                    values = sorted(samples.get(field, ()))
+                    if values:
+                        fields[field] = tuple(percentile(values, q) for q in QUANTILES)
+                result[model] = {"calls": self.counts[model], "fields": fields}
+            return result
+    
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.samples.clear()
+            self.sums.clear()
+            self.counts.clear()
+    
+    def _write_prometheus(self):
+        """Rewrite the Prometheus textfile atomically (lock held)"""
+        lines = []
+        for field, description in METRIC_FIELDS.items():
+            name = f"terminal_chat_{field}" + ("_seconds" if field in TIME_FIELDS else "")
+            lines.append(f"# HELP {name} {description} per completion")
+            lines.append(f"# TYPE {name} summary")
+            for model, samples in self.samples.items():
+                values = sorted(samples.get(field, ()))
+                if not values:
+                    continue
+                label = model.replace("\\", "\\\\").replace('"', '\\"')
+                for q in QUANTILES:
+                    lines.append(f'{name}{{model="{label}",quantile="{q}"}} {percentile(values, q):.6g}')
+                total, count = self.sums[model][field]
+                lines.append(f'{name}_sum{{model="{label}"}} {total:.6g}')
+                lines.append(f'{name}_count{{model="{label}"}} {count}')
+        tmp_path = self.prometheus_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, self.prometheus_path)
+        except OSError:
+            pass
+    
+    def close(self):
+        """Close the trace file"""
+        with self.lock:
+            if self.trace_file:
+                self.trace_file.close()
+                self.trace_file = None
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator
+
+PHASES = ("build", "network", "parsing", "rendering")
+
+class StackSampler:
+    """Low-overhead alternative to cProfile that samples every thread's stack
+    
+    Samples are written as collapsed stacks ("a;b;c count" lines), which
+    flamegraph.pl and speedscope read directly.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self.stop_event.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+    
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class TurnProfile:
+    """Profiling state for one iteration of the chat loop"""
+    
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.thread_profile = None  # cProfile of the thread reading the stream
+        self.owner = threading.get_ident()
+    
+    def phase(self, name: str, seconds: float):
+        """Add time spent in one of PHASES"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    def stream(self, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass ``chunks`` through, splitting the time spent waiting for them
+        
+        Time in the iterator that the reading thread spends on the CPU counts
+        as parsing and the rest as network. Under cProfile the reading thread
+        is profiled too, since the renderer consumes the stream on its own
+        thread.
+        """
+        if threading.get_ident() == self.owner:
+            # Already covered by the turn's own profiler
+            self.thread_profile = None
+        if self.thread_profile is not None:
+            try:
+                self.thread_profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one profiler per process, and it
+                # already covers every thread
+                self.thread_profile = None
+        try:
+            while True:
+                wall = time.perf_counter()
+                cpu = time.thread_time()
+                try:
+                    delta = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    cpu = time.thread_time() - cpu
+                    wall = time.perf_counter() - wall
+                    self.phase("parsing", cpu)
+                    self.phase("network", max(0.0, wall - cpu))
+                yield delta
+        finally:
+            if self.thread_profile is not None:
+                self.thread_profile.disable()
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+class TurnProfiler:
+    """CPU and allocation profiles of each chat turn, for /profile and --profile
+    
+    While enabled, every iteration of the chat loop runs under cProfile (or
+    a stack sampler when ``sample_interval`` is set) and tracemalloc. Each
+    turn leaves a ``turn-NNN.pstats`` (or ``.folded``) file and a
+    ``turn-NNN-alloc.txt`` report of the ``top`` allocation sites that grew
+    most since the previous turn in ``profiles/<session>/`` under the config
+    dir, and ``report`` is given a one-line summary of where the time went.
+    """
+    
+    def __init__(self, config_dir: str, report: Callable[[str], None], top: int = 20,
+                 sample_interval: float = 0.0, memory: bool = True):
+        self.profiles_dir = os.path.join(config_dir, "profiles")
+        self.report = report
+        self.top = top
+        self.sample_interval = sample_interval
+        self.memory = memory
+        self.enabled = False
+        self.session_dir = None
+        self.turn_number = 0
+        self.last_snapshot = None
+        self.started_tracemalloc = False
+    
+    def start(self) -> str:
+        """Enable profiling; returns the folder profiles are written to"""
+        if not self.enabled:
+            self.enabled = True
+            if self.session_dir is None:
+                self.session_dir = os.path.join(self.profiles_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+                os.makedirs(self.session_dir, exist_ok=True)
+            if self.memory:
+                import tracemalloc
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self.started_tracemalloc = True
+                self.last_snapshot = tracemalloc.take_snapshot()
+        return self.session_dir
+    
+    def stop(self):
+        """Disable profiling"""
+        self.enabled = False
+        self.last_snapshot = None
+        if self.started_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+    
+    @contextmanager
+    def turn(self):
+        """Profile one iteration of the chat loop, yielding its TurnProfile"""
+        profile = TurnProfile()
+        if not self.enabled:
+            yield profile
+            return
+        
+        profiler = sampler = None
+        if self.sample_interval > 0:
+            sampler = StackSampler(self.sample_interval)
+            sampler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profile.thread_profile = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.stop()
+        
+        # Not reached when the turn raised, e.g. SystemExit from /exit
+        if not self.enabled:
+            # The turn was /profile off
+            return
+        self.turn_number += 1
+        base = os.path.join(self.session_dir, f"turn-{self.turn_number:03d}")
+        try:
+            if profiler:
+                import pstats
+                stats = pstats.Stats(profiler)
+                if profile.thread_profile is not None and profile.thread_profile.getstats():
+                    stats.add(profile.thread_profile)
+                stats.dump_stats(base + ".pstats")
+            else:
+                sampler.write(base + ".folded")
+            memory = self._write_allocations(base + "-alloc.txt") if self.last_snapshot else ""
+        except OSError as e:
+            self.report(f"Could not write profile: {str(e)}")
+            return
+        self.report(self._summary(elapsed, profile.phases, memory))
+    
+    def _write_allocations(self, path: str) -> str:
+        """Write the top allocation growth since the last turn; returns a summary"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            return ""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            # The profiler's own bookkeeping
+            tracemalloc.Filter(False, "*/cProfile.py"),
+            tracemalloc.Filter(False, "*/pstats.py"),
+        ))
+        diff = snapshot.compare_to(self.last_snapshot, "lineno")
+        self.last_snapshot = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        growth = sum(stat.size_diff for stat in diff)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory: {current / 1048576:.1f} MiB (peak {peak / 1048576:.1f} MiB), "
+                    f"{growth / 1048576:+.2f} MiB this turn\n\n")
+            f.write(f"Top {self.top} allocation sites by growth since the previous turn:\n")
+            for stat in diff[:self.top]:
+                f.write(f"{stat}\n")
+        return f"; {growth / 1048576:+.2f} MiB, {current / 1048576:.1f} MiB traced"
+    
+    def _summary(self, elapsed: float, phases: Dict[str, float], memory: str) -> str:
+        """One line: turn time split into phases, memory growth and output file
+        
+        The stream is read on its own thread while the reply is rendered, so
+        network and parsing overlap rendering and may add up to more than
+        the turn took.
+        """
+        parts = [f"{name} {phases[name] * 1000:.0f}ms" for name in PHASES if name in phases]
+        other = elapsed - sum(phases.values())
+        if parts and other > 0.0005:
+            parts.append(f"other {other * 1000:.0f}ms")
+        breakdown = f" ({', '.join(parts)})" if parts else ""
+        name = f"turn-{self.turn_number:03d}"
+        return f"Profile {name}: {elapsed * 1000:.0f}ms{breakdown}{memory} -> {self.session_dir}"
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+# HTTP statuses worth retrying, and the subset that means "slow down"
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+THROTTLE_STATUSES = {429, 503, 529}
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate
+    
+    A request larger than the bucket is let through once the bucket is
+    full and leaves it in debt, so it is delayed rather than starved.
+    Not thread-safe on its own; ``RateLimiter`` holds the lock.
+    """
+    
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be now)"""
+        self._refill()
+        need = min(amount, self.capacity)
+        if self.level >= need:
+            return 0.0
+        return (need - self.level) / self.rate
+    
+    def take(self, amount: float):
+        """Take ``amount``, possibly leaving the bucket in debt"""
+        self._refill()
+        self.level -= amount
+    
+    def give_back(self, amount: float):
+        """Return an over-estimate (or take more for an under-estimate)"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """Requests/min and tokens/min budgets plus adaptive concurrency
+    
+    Concurrency follows AIMD: every successful request raises the limit by
+    about one per round of requests, and a throttling response halves it.
+    A Retry-After from the provider pauses every caller sharing the
+    limiter, not only the one that received it. A rate of 0 is unlimited.
+    """
+    
+    def __init__(self, requests_per_min: float = 0, tokens_per_min: float = 0,
+                 max_concurrency: int = 8, min_concurrency: int = 1):
+        self.requests = TokenBucket(requests_per_min) if requests_per_min > 0 else None
+        self.tokens = TokenBucket(tokens_per_min) if tokens_per_min > 0 else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.active = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+        self.throttled = 0
+        self.retries = 0
+        self.waited = 0.0
+    
+    def acquire(self, cancel=None) -> bool:
+        """Take a concurrency slot, waiting while the limit is reached
+        
+        With a ``cancel`` event, gives up and returns False once it is set.
+        """
+        with self.cond:
+            while self.active >= int(self.limit):
+                if cancel is not None and cancel.is_set():
+                    return False
+                self.cond.wait(0.1 if cancel is not None else None)
+            self.active += 1
+            return True
+    
+    def release(self):
+        """Give back a concurrency slot"""
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+    
+    def wait_turn(self, tokens: float, cancel=None) -> bool:
+        """Block until the request and token budgets allow one more request
+        
+        Returns False, without taking from the budgets, if ``cancel`` is set
+        while waiting.
+        """
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if self.requests:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.tokens:
+                    wait = max(wait, self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.tokens:
+                        self.tokens.take(tokens)
+                    return True
+                self.waited += wait
+            if cancel is None:
+                time.sleep(wait)
+            elif cancel.wait(wait):
+                return False
+    
+    def settle(self, estimate: float, actual: Optional[float]):
+        """Correct the token budget once the real usage is known"""
+        if self.tokens and actual is not None:
+            with self.cond:
+                self.tokens.give_back(estimate - actual)
+    
+    def succeeded(self):
+        """Additive increase after a request the provider accepted"""
+        with self.cond:
+            if self.limit < self.max_concurrency:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.cond.notify_all()
+    
+    def record_retry(self):
+        """Count a request retried after a failed attempt"""
+        with self.cond:
+            self.retries += 1
+    
+    def throttle(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease, and a shared pause for Retry-After"""
+        with self.cond:
+            now = time.monotonic()
+            self.throttled += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            # Requests already in flight hit the same wall; count that once
+            if now - self.last_decrease >= 1.0:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self.last_decrease = now
+    
+    def stats(self) -> Dict:
+        """Current limit and counters for display"""
+        with self.cond:
+            return {
+                "concurrency": int(self.limit),
+                "active": self.active,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "waited": self.waited
+            }
+
+_limiters: Dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def shared_limiter(key: tuple, **settings) -> RateLimiter:
+    """Get the process-wide limiter for a key, e.g. (provider, api key)"""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(**settings)
+        return limiter
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        # A little jitter on top so paused callers don't all retry at once
+        delay = retry_after + random.uniform(0, min(1.0, base))
+    return delay
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import re
+import time
+import queue
+import threading
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.syntax import Syntax
+from rich.text import Text
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})\s*([^`\s]*)")
+_HEADING = re.compile(r"^ {0,3}#{1,6}(\s|$)")
+_LIST_ITEM = re.compile(r"^ {0,3}([-*+]|\d{1,9}[.)])(\s|$)")
+
+class StreamingMarkdown:
+    """Render Markdown incrementally as text deltas arrive
+    
+    Text is split into blocks (paragraphs, lists, headings, fenced code) by
+    a line-based state machine. Finished blocks are printed once; only the
+    block still being written is redrawn, in a live region whose refresh
+    rate is capped.
+    """
+    
+    def __init__(self, console, code_theme="monokai", max_fps=30):
+        self.console = console
+        self.code_theme = code_theme
+        self.min_interval = 1 / max_fps if max_fps > 0 else 0
+        self.live = None
+        self.last_draw = 0.0
+        self.dirty = False
+        self.render_time = 0.0  # Seconds spent parsing and drawing
+        
+        self.parts = []         # Every delta, for the full message text
+        self.partial = ""       # The current line, not yet terminated
+        self.lines = []         # Complete lines of the unfinished block
+        self.in_code = False
+        self.fence = ""
+        self.code_lang = ""
+        self.pending_blank = False
+        self.block_is_list = False
+        self.blocks = 0
+    
+    def __enter__(self):
+        self.live = Live(console=self.console, auto_refresh=False, transient=True)
+        self.live.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.finish()
+        self.live.__exit__(*exc_info)
+    
+    def feed(self, delta: str):
+        """Add a text delta and redraw if the frame budget allows"""
+        if not delta:
+            return
+        start = time.perf_counter()
+        self.parts.append(delta)
+        text = self.partial + delta
+        lines = text.split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self._process_line(line)
+        self.dirty = True
+        self._draw()
+        self.render_time += time.perf_counter() - start
+    
+    def refresh(self):
+        """Draw any text the frame cap held back"""
+        start = time.perf_counter()
+        self._draw()
+        self.render_time += time.perf_counter() - start
+    
+    def finish(self):
+        """Flush the unfinished block and return the full text"""
+        start = time.perf_counter()
+        if self.partial:
+            self._process_line(self.partial)
+            self.partial = ""
+        self._commit()
+        self.dirty = False
+        if self.live:
+            self.live.update(Text(""), refresh=True)
+        self.render_time += time.perf_counter() - start
+        return self.text
+    
+    @property
+    def text(self) -> str:
+        """The full text received so far"""
+        return "".join(self.parts)
+    
+    def _process_line(self, line: str):
+        """Advance the block state machine by one complete line"""
+        if self.in_code:
+            stripped = line.strip()
+            if stripped.startswith(self.fence) and not stripped.strip(self.fence[0]):
+                self._commit()
+            else:
+                self.lines.append(line)
+            return
+        
+        fence = _FENCE.match(line)
+        if fence:
+            self._commit()
+            self.in_code = True
+            self.fence = fence.group(1)
+            self.code_lang = fence.group(2)
+            return
+        
+        if not line.strip():
+            if self.lines:
+                # Whether a blank line ends the block depends on the next line
+                self.pending_blank = True
+            return
+        
+        is_item = bool(_LIST_ITEM.match(line))
+        if self.pending_blank:
+            continues_list = self.block_is_list and (is_item or line.startswith((" ", "\t")))
+            if continues_list:
+                self.lines.append("")
+            else:
+                self._commit()
+            self.pending_blank = False
+        
+        if _HEADING.match(line):
+            self._commit()
+            self.lines.append(line)
+            self._commit()
+            return
+        
+        if not self.lines:
+            self.block_is_list = is_item
+        self.lines.append(line)
+    
+    def _commit(self):
+        """Print the unfinished block permanently and start a new one"""
+        renderable = self._block_renderable(self.lines)
+        if renderable is not None:
+            # Blank line between blocks, as a whole-message Markdown render has
+            if self.blocks:
+                self.console.print()
+            self.console.print(renderable)
+            self.blocks += 1
+        self.lines = []
+        self.in_code = False
+        self.fence = ""
+        self.code_lang = ""
+        self.pending_blank = False
+        self.block_is_list = False
+    
+    def _block_renderable(self, lines, tail=None):
+        """Build the renderable for a block's lines"""
+        if self.in_code:
+            code = "\n".join(lines + ([tail] if tail else []))
+            return Syntax(code, self.code_lang or "text", theme=self.code_theme)
+        text = "\n".join(lines + ([tail] if tail else []))
+        if not text.strip():
+            return None
+        return Markdown(text)
+    
+    def _draw(self):
+        """Redraw the live region with the unfinished block"""
+        if not self.live or not self.dirty:
+            return
+        now = time.monotonic()
+        if now - self.last_draw < self.min_interval:
+            return
+        # Only the tail fits on screen; the whole block is printed on commit
+        height = max(1, self.console.size.height - 2)
+        lines = self.lines[-height:]
+        renderable = self._block_renderable(lines, self.partial)
+        self.live.update(renderable if renderable is not None else Text(""), refresh=True)
+        self.last_draw = now
+        self.dirty = False
+
+class _StreamFailed:
+    """Carries a producer exception across the queue"""
+    
+    def __init__(self, error):
+        self.error = error
+
+_DONE = object()
+
+def pump_stream(chunks, renderer, frame_budget=0.016, queue_size=256):
+    """Render a delta stream with network reading and drawing decoupled
+    
+    A producer thread reads ``chunks`` into a bounded queue, so a slow
+    terminal pushes back on the network read instead of buffering without
+    limit. The caller's thread drains everything that arrived within one
+    frame budget and hands it to ``renderer`` as a single write.
+    """
+    deltas = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    
+    def produce():
+        try:
+            for delta in chunks:
+                while not stop.is_set():
+                    try:
+                        deltas.put(delta, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+            item = _DONE
+        except Exception as e:
+            item = _StreamFailed(e)
+        finally:
+            if stop.is_set() and hasattr(chunks, "close"):
+                chunks.close()
+        if not stop.is_set():
+            deltas.put(item)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        done = False
+        while not done:
+            try:
+                item = deltas.get(timeout=frame_budget)
+            except queue.Empty:
+                # Nothing new this frame; show anything the last one held back
+                renderer.refresh()
+                continue
+            
+            # Coalesce everything that arrives within this frame
+            batch = []
+            deadline = time.monotonic() + frame_budget
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                if isinstance(item, _StreamFailed):
+                    if batch:
+                        renderer.feed("".join(batch))
+                    raise item.error
+                batch.append(item)
+                if time.monotonic() >= deadline:
+                    break
+                try:
+                    item = deltas.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                renderer.feed("".join(batch))
+    finally:
+        stop.set()
+    producer.join()
+
+def animate_text(text, renderer, char_delay, frame_budget=0.016, max_duration=2.0):
+    """Reveal finished text at a typewriter pace, one write per frame
+    
+    The pace is ``char_delay`` seconds per character, sped up as needed so
+    the whole text never takes longer than ``max_duration``.
+    """
+    start = time.monotonic()
+    shown = 0
+    while shown < len(text):
+        time.sleep(frame_budget)
+        elapsed = time.monotonic() - start
+        target = int(elapsed / char_delay) if char_delay > 0 else len(text)
+        if max_duration > 0:
+            target = max(target, int(len(text) * elapsed / max_duration))
+        target = min(len(text), max(target, shown + 1))
+        renderer.feed(text[shown:target])
+        shown = target
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import threading
+from typing import Dict, List, Tuple
+
+class StartupProfiler:
+    """Time startup phases and module imports for --startup-profile
+    
+    While installed, the profiler sits first on ``sys.meta_path`` and wraps
+    the loader of every module imported from then on, recording how long
+    each one takes to execute including and excluding its own imports.
+    When disabled every method is a no-op, so callers need no checks.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last_mark = self.start
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, List[float]] = {}  # module -> [total, self]
+        self.packages: Dict[str, float] = {}        # top-level package -> self
+        self.local = threading.local()
+    
+    def install(self):
+        """Start timing imports"""
+        if self.enabled and self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+    
+    def uninstall(self):
+        """Stop timing imports"""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+    
+    def mark(self, phase: str):
+        """Record the time since the previous mark as a named phase"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+    
+    def find_spec(self, fullname, path, target=None):
+        """Find a module with the other finders and time its loader"""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            # Builtin and frozen importers are classes shared by all their
+            # modules, so only per-module loader instances are wrapped
+            loader = spec.loader
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                loader.exec_module = self._timed(fullname, loader.exec_module)
+            return spec
+        return None
+    
+    def _timed(self, name: str, exec_module):
+        """Wrap a loader's exec_module to record its inclusive and self time"""
+        def timed_exec_module(module):
+            stack = self.local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                # Summing self times attributes each import to exactly one package
+                root = name.split(".")[0]
+                self.packages[root] = self.packages.get(root, 0.0) + total - children
+                self.imports[name] = [total, total - children]
+        return timed_exec_module
+    
+    def report(self, top: int = 15) -> str:
+        """Format the phase timings and the slowest imports"""
+        lines = ["Startup profile", ""]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<28} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total':<28} {(self.last_mark - self.start) * 1000:8.1f} ms")
+        
+        if self.imports:
+            lines += ["", f"  {'package':<28} {'import':>8}"]
+            for root, seconds in sorted(self.packages.items(), key=lambda item: -item[1])[:top]:
+                lines.append(f"  {root:<28} {seconds * 1000:8.1f} ms")
+            
+            lines += ["", f"  {'module':<40} {'self':>8} {'total':>9}"]
+            slowest = sorted(self.imports.items(), key=lambda item: -item[1][1])[:top]
+            for name, (total, own) in slowest:
+                lines.append(f"  {name:<40} {own * 1000:6.1f} ms {total * 1000:6.1f} ms")
+        return "\n".join(lines)
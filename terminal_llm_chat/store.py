@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+from terminal_llm_chat.conversation_io import EXTENSIONS, read_conversation
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    model TEXT,
+    created REAL NOT NULL,
+    source_mtime REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    conversation_id INTEGER NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    turn INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation_id, turn);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    content, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Markers around matched terms in search snippets
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+class ConversationStore:
+    """SQLite index of all conversations with full-text search over messages
+    
+    The current session is indexed as messages are added; saved
+    conversations are imported once and re-indexed when they change.
+    System prompts are not indexed. Each write is committed at once, so no
+    transaction stays open to lock out another running instance. Messages
+    are numbered by user turn, as /history counts them.
+    """
+    
+    def __init__(self, config_dir: str, timeout: float = 5.0):
+        self.path = os.path.join(config_dir, "conversations.sqlite3")
+        # Wait for another instance's write instead of failing with "database is locked"
+        self.db = sqlite3.connect(self.path, timeout=timeout)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+        self._number_turns()
+    
+    def _number_turns(self):
+        """Renumber messages indexed before "turn" was the 1-based user turn"""
+        if self.db.execute("SELECT 1 FROM meta WHERE key = 'turn_numbers'").fetchone():
+            return
+        with self.db:
+            rows = self.db.execute("SELECT id, conversation_id, role FROM messages ORDER BY conversation_id, id")
+            updates = []
+            conversation = turn = None
+            for message_id, conversation_id, role in rows.fetchall():
+                if conversation_id != conversation:
+                    conversation, turn = conversation_id, 0
+                if role == "user":
+                    turn += 1
+                updates.append((turn, message_id))
+            self.db.executemany("UPDATE messages SET turn = ? WHERE id = ?", updates)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('turn_numbers', 'user')")
+    
+    def commit(self):
+        """Commit pending writes"""
+        self.db.commit()
+    
+    def start_conversation(self, name: str, model: str, source_mtime: Optional[float] = None) -> int:
+        """Create an empty conversation, replacing any with the same name"""
+        self.db.execute("DELETE FROM conversations WHERE name = ?", (name,))
+        cursor = self.db.execute(
+            "INSERT INTO conversations (name, model, created, source_mtime) VALUES (?, ?, ?, ?)",
+            (name, model, time.time(), source_mtime))
+        self.commit()
+        return cursor.lastrowid
+    
+    def add_message(self, conversation_id: int, turn: int, role: str, content: str):
+        """Index one message of a conversation under its 1-based user turn"""
+        if role == "system":
+            return
+        with self.db:
+            self.db.execute("INSERT INTO messages (conversation_id, turn, role, content) VALUES (?, ?, ?, ?)",
+                            (conversation_id, turn, role, content))
+    
+    def index_messages(self, name: str, messages: Iterable[Dict], model: Optional[str] = None,
+                       source_mtime: Optional[float] = None) -> int:
+        """(Re)index a whole conversation under a name, in one transaction"""
+        rows = []
+        turn = 0
+        for msg in messages:
+            role = msg["role"]
+            if role == "user":
+                turn += 1
+            if role != "system":
+                rows.append((turn, role, msg["content"]))
+        with self.db:
+            self.db.execute("DELETE FROM conversations WHERE name = ?", (name,))
+            conversation_id = self.db.execute(
+                "INSERT INTO conversations (name, model, created, source_mtime) VALUES (?, ?, ?, ?)",
+                (name, model, time.time(), source_mtime)).lastrowid
+            self.db.executemany(
+                "INSERT INTO messages (conversation_id, turn, role, content) VALUES (?, ?, ?, ?)",
+                [(conversation_id, turn, role, content) for turn, role, content in rows])
+        return conversation_id
+    
+    def rename(self, conversation_id: int, name: str, source_mtime: Optional[float] = None):
+        """Give a conversation a new name, replacing any other with that name"""
+        self.db.execute("DELETE FROM conversations WHERE name = ? AND id != ?", (name, conversation_id))
+        self.db.execute("UPDATE conversations SET name = ?, source_mtime = ? WHERE id = ?",
+                        (name, source_mtime, conversation_id))
+        self.commit()
+    
+    def find(self, name: str) -> Optional[int]:
+        """Get the id of a conversation by name"""
+        row = self.db.execute("SELECT id FROM conversations WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+    
+    def find_indexed(self, name: str, source_mtime: float, count: int) -> Optional[int]:
+        """Get the id of a conversation indexed from the file as it is now
+        
+        It must have been indexed from a file with this mtime and hold
+        exactly ``count`` messages, so one that a session has since added
+        unsaved messages to is indexed again.
+        """
+        row = self.db.execute("SELECT id, source_mtime FROM conversations WHERE name = ?", (name,)).fetchone()
+        if not row or row[1] != source_mtime:
+            return None
+        indexed, = self.db.execute("SELECT count(*) FROM messages WHERE conversation_id = ?",
+                                   (row[0],)).fetchone()
+        return row[0] if indexed == count else None
+    
+    def import_directory(self, conversations_dir: str) -> int:
+        """Index saved conversations that are new or changed since last import"""
+        known = dict(self.db.execute(
+            "SELECT name, source_mtime FROM conversations WHERE source_mtime IS NOT NULL"))
+        imported = 0
+        for filename in os.listdir(conversations_dir):
+            if not filename.endswith(EXTENSIONS):
+                continue
+            path = os.path.join(conversations_dir, filename)
+            mtime = os.path.getmtime(path)
+            if known.get(filename) == mtime:
+                continue
+            try:
+                data = read_conversation(path)
+                self.index_messages(filename, data["messages"], data.get("model"), mtime)
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            imported += 1
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('imported', ?)", (str(time.time()),))
+        self.commit()
+        return imported
+    
+    def has_imported(self) -> bool:
+        """Check whether saved conversations have been imported before"""
+        return self.db.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone() is not None
+    
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Full-text search over all messages, best matches first"""
+        # Quote every term so user input can't trip over FTS5 query syntax
+        terms = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not terms:
+            return []
+        self.commit()
+        rows = self.db.execute(f"""
+            SELECT c.name, m.turn, m.role,
+                   snippet(messages_fts, 0, '{MATCH_START}', '{MATCH_END}', '…', 16)
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE messages_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (terms, limit)).fetchall()
+        return [{"conversation": name, "turn": turn, "role": role, "snippet": snippet}
+                for name, turn, role, snippet in rows]
+    
+    def close(self):
+        """Commit and close the database"""
+        self.commit()
+        self.db.close()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from terminal_llm_chat.messages import Message
+
+# Approximate USD prices per million tokens as (prompt, completion).
+# Entries are matched by prefix, so "gpt-4o" also covers "gpt-4o-2024-08-06";
+# the longest matching prefix wins.
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-opus": (15.00, 75.00),
+    "claude-3-sonnet": (3.00, 15.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-2": (8.00, 24.00),
+    "claude-instant": (0.80, 2.40),
+}
+
+# Tokens added by the chat format around every message, and to prime the reply
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+
+def match_model(table: Dict, model: str, default=None):
+    """Look up a model in a table keyed by model-name prefix
+    
+    Provider prefixes such as "openai/" are ignored and the longest
+    matching key wins.
+    """
+    name = model.split("/")[-1]
+    best = None
+    for prefix in table:
+        if name.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return table[best] if best else default
+
+class TokenCounter:
+    """Count tokens with tiktoken, caching the count for each message text
+    
+    ``Message`` objects keep their own count. Plain dict messages (system
+    prompts, batch and /compare requests) share an LRU of ``cache_size``
+    texts, so a long session or batch run can't grow it without bound.
+    """
+    
+    def __init__(self, model: str = "gpt-3.5-turbo", cache_size: int = 1024):
+        self.model = model
+        self._encodings = {}
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+    
+    def _encoding(self, model: str):
+        """Get the tiktoken encoding for a model, or None if unavailable"""
+        if model not in self._encodings:
+            try:
+                import tiktoken
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    # Non-OpenAI models: cl100k_base is a reasonable estimate
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                encoding = None
+            self._encodings[model] = encoding
+        return self._encodings[model]
+    
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """Count the tokens in a piece of text"""
+        encoding = self._encoding(model or self.model)
+        if encoding is None:
+            # Rough fallback of four characters per token
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+    
+    def count_message(self, message: Dict) -> int:
+        """Count the tokens in a chat message, computing each text only once"""
+        if isinstance(message, Message):
+            # Cached on the message itself, so long sessions need no lookup table
+            if message.tokens is None:
+                message.tokens = self.count(message.content)
+            return message.tokens + MESSAGE_OVERHEAD
+        content = message["content"]
+        tokens = self._cache.get(content)
+        if tokens is None:
+            tokens = self.count(content)
+            self._cache[content] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(content)
+        return tokens + MESSAGE_OVERHEAD
+    
+    def count_messages(self, messages: List[Dict]) -> int:
+        """Count the tokens a list of messages takes up as a prompt"""
+        return sum(self.count_message(msg) for msg in messages) + REPLY_OVERHEAD
+
+class UsageTracker:
+    """Running prompt/completion token totals and cost per model"""
+    
+    def __init__(self, pricing: Optional[Dict] = None, catalog=None):
+        self.pricing = pricing if pricing is not None else MODEL_PRICING
+        self.catalog = catalog
+        self.models = {}
+    
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, estimated=False,
+               cached_tokens: int = 0):
+        """Add one request's token usage to the totals
+        
+        ``cached_tokens`` is the part of the prompt read from the provider's
+        prompt cache.
+        """
+        totals = self.models.setdefault(model, {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "estimated": 0
+        })
+        totals["requests"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["cached_tokens"] += cached_tokens
+        if estimated:
+            totals["estimated"] += 1
+    
+    def price(self, model: str):
+        """Get (prompt, completion) USD prices per million tokens, or None"""
+        if self.catalog:
+            info = self.catalog.model_info(model)
+            if info.get("pricing"):
+                return tuple(info["pricing"])
+        return match_model(self.pricing, model)
+    
+    def cost(self, model: str) -> Optional[float]:
+        """Get the USD cost of the tokens used with a model, or None if unknown"""
+        price = self.price(model)
+        if price is None:
+            return None
+        totals = self.models.get(model, {})
+        return (totals.get("prompt_tokens", 0) * price[0] +
+                totals.get("completion_tokens", 0) * price[1]) / 1_000_000
+    
+    def totals(self) -> Dict:
+        """Get prompt/completion totals and known cost over all models"""
+        prompt = sum(t["prompt_tokens"] for t in self.models.values())
+        completion = sum(t["completion_tokens"] for t in self.models.values())
+        cached = sum(t["cached_tokens"] for t in self.models.values())
+        costs = [self.cost(model) for model in self.models]
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "cost": sum(c for c in costs if c is not None)
+        }
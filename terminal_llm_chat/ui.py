@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
-import os
-import sys
 import time
+import threading
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.syntax import Syntax
-from rich.panel import Panel
+from rich.markup import escape
+from rich.text import Text
+from terminal_llm_chat.metrics import METRIC_FIELDS, TIME_FIELDS
+from terminal_llm_chat.store import MATCH_START, MATCH_END
+
+# Rich renderables beyond the console (Markdown pulls in markdown-it and
+# Pygments) are imported where they are first used, to keep startup fast
 
 class TerminalUI:
     def __init__(self, config, theme=None):
@@ -16,6 +19,10 @@ class TerminalUI:
         self.animation_speed = int(config.get("UI", "ANIMATION_SPEED", 10))
         self.enable_sounds = config.get_bool("UI", "ENABLE_SOUNDS", True)
         self.max_width = int(config.get("UI", "MAX_WIDTH", 80))
+        self.frame_ms = max(1, config.get_int("UI", "FRAME_MS", 16))
+        self.max_animation_ms = config.get_int("UI", "MAX_ANIMATION_MS", 2000)
+        self.render_queue_size = config.get_int("UI", "RENDER_QUEUE_SIZE", 256)
+        self.last_render_time = 0.0
         self.setup_theme()
     
     def setup_theme(self):
@@ -36,18 +43,22 @@ class TerminalUI:
         # Default to green if theme not found
         if self.theme not in self.themes:
             self.theme = "green"
-            
+        
         self.colors = self.themes[self.theme]
     
     def clear_screen(self):
         """Clear the terminal screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if self.console.is_terminal:
+            # Erase the screen and scrollback and home the cursor, without
+            # spawning a shell for clear/cls
+            self.console.file.write("\033[2J\033[3J\033[H")
+            self.console.file.flush()
     
     def play_beep(self):
         """Play terminal beep sound if enabled"""
         if self.enable_sounds:
-            sys.stdout.write('\a')
-            sys.stdout.flush()
+            self.console.file.write('\a')
+            self.console.file.flush()
     
     def display_welcome(self):
         """Display welcome message and ASCII art"""
@@ -79,12 +90,15 @@ class TerminalUI:
         ║          ╚═════╝╚═╝  ╚═╝╚═╝  ╚═╝   ╚═╝                   ║
         ║                                                            ║
         ╚════════════════════════════════════════════════════════════╝
-        
+           
            v0.1.0 | Type your message or /help for commands
         """
         
+        # rich.panel is cheap next to the rich modules already loaded
+        from rich.panel import Panel
         self.console.print(Panel(welcome_text, style=f"bold {self.colors['system']}"))
-        self.console.print(f"\nUsing model: [bold]{self.config.get('API', 'MODEL')}[/bold]\n", style=self.colors['system'])
+        self.console.print(f"\nUsing model: [bold]{escape(self.config.get('API', 'MODEL'))}[/bold]\n",
+                           style=self.colors['system'])
     
     def display_exit_message(self):
         """Display exit message"""
@@ -104,53 +118,199 @@ class TerminalUI:
         self.console.print(f"\n> {message}", style=self.colors['user'])
     
     def display_ai_message(self, message, streaming=True):
-        """Display AI message with optional character-by-character animation"""
+        """Display AI message with optional character-by-character animation
+        
+        ``message`` may be a finished string or an iterator of text deltas
+        from ``LLMProvider.get_completion``; deltas are rendered as Markdown
+        as they arrive. Returns the full message text.
+        """
+        from rich.markdown import Markdown
+        from terminal_llm_chat.render import StreamingMarkdown, animate_text, pump_stream
+        
         self.console.print("\nAI:", style=f"bold {self.colors['ai']}")
         
-        if not streaming or self.animation_speed <= 0:
+        if isinstance(message, str) and (not streaming or self.animation_speed <= 0):
             # Render markdown if not streaming
+            start = time.perf_counter()
+            self.console.print(Markdown(message))
+            self.last_render_time = time.perf_counter() - start
+            return message
+        if not streaming:
+            message = "".join(message)
+            start = time.perf_counter()
             self.console.print(Markdown(message))
+            self.last_render_time = time.perf_counter() - start
+            return message
+        
+        frame_budget = self.frame_ms / 1000
+        with StreamingMarkdown(self.console, max_fps=1 / frame_budget) as renderer:
+            if isinstance(message, str):
+                # Only animate text that is already complete; a live stream
+                # is paced by the provider itself
+                animate_text(message, renderer, self.animation_speed / 1000, frame_budget,
+                             self.max_animation_ms / 1000)
+            else:
+                pump_stream(message, renderer, frame_budget, self.render_queue_size)
+        self.last_render_time = renderer.render_time
+        return renderer.text
+    
+    def comparison_view(self, labels):
+        """Create a live view with one labeled region per compared model"""
+        return ComparisonView(self, labels)
+    
+    def display_comparison_summary(self, results):
+        """Display latency and throughput for each compared model"""
+        from rich.table import Table
+        table = Table(title="Comparison summary", style=self.colors['system'])
+        table.add_column("Model")
+        table.add_column("First token", justify="right")
+        table.add_column("Total", justify="right")
+        table.add_column("Tokens", justify="right")
+        table.add_column("Tokens/sec", justify="right")
+        for label, result in results.items():
+            if result.get("error"):
+                table.add_row(escape(label), "-", "-", "-", escape(f"error: {result['error']}"))
+                continue
+            ttft = result.get("first_token")
+            table.add_row(
+                escape(label),
+                f"{ttft:.2f}s" if ttft is not None else "-",
+                f"{result['total']:.2f}s",
+                str(result["tokens"]),
+                f"{result['tokens_per_sec']:.1f}"
+            )
+        self.console.print()
+        self.console.print(table)
+    
+    def display_token_usage(self, context, models, totals):
+        """Display context size by role and session token usage per model"""
+        context_total = sum(context.values())
+        breakdown = ", ".join(f"{role} {tokens}" for role, tokens in context.items())
+        self.console.print(f"\nContext: {context_total} tokens ({breakdown})", style=self.colors['system'])
+        
+        if not models:
+            self.display_system_message("No requests sent yet in this session.")
             return
         
-        # Character-by-character streaming with markdown support
-        # This is a simplified version - a real implementation would need 
-        # more sophisticated markdown parsing
-        buffer = ""
-        in_code_block = False
-        code_lang = ""
-        code_buffer = ""
+        from rich.table import Table
+        table = Table(title="Session token usage", style=self.colors['system'])
+        table.add_column("Model")
+        table.add_column("Requests", justify="right")
+        table.add_column("Prompt", justify="right")
+        table.add_column("Cached", justify="right")
+        table.add_column("Completion", justify="right")
+        table.add_column("Cost (USD)", justify="right")
+        for model, usage in models.items():
+            estimated = " *" if usage["estimated"] else ""
+            cost = f"${usage['cost']:.4f}" if usage["cost"] is not None else "-"
+            table.add_row(model, str(usage["requests"]), f"{usage['prompt_tokens']}{estimated}",
+                          str(usage["cached_tokens"]), f"{usage['completion_tokens']}{estimated}", cost)
+        table.add_row("Total", "", str(totals["prompt_tokens"]), str(totals["cached_tokens"]),
+                      str(totals["completion_tokens"]), f"${totals['cost']:.4f}", style="bold")
+        self.console.print(table)
+        if any(usage["estimated"] for usage in models.values()):
+            self.console.print("* includes local estimates where the provider reported no usage",
+                               style=self.colors['system'])
+    
+    def display_stats(self, summary, limiters):
+        """Display per-model latency percentiles and rate limiter state"""
+        if not summary:
+            self.display_system_message("No completions measured yet in this session.")
+            return
         
-        for char in message:
-            if buffer.endswith("```") and not in_code_block:
-                in_code_block = True
-                code_lang = ""
-                code_buffer = ""
-                self.console.print(buffer[:-3], end="")
-                self.console.print("```", style="bright_black", end="")
-                buffer = ""
-            elif buffer.endswith("```") and in_code_block:
-                in_code_block = False
-                syntax = Syntax(code_buffer, code_lang, theme="monokai")
-                self.console.print("")
-                self.console.print(syntax)
-                buffer = ""
-            elif in_code_block and char == '\n' and not code_lang and code_buffer == "":
-                # First line in code block defines the language
-                code_lang = buffer.strip()
-                buffer = ""
-                continue
-            elif in_code_block:
-                code_buffer += char
-            else:
-                buffer += char
-            
-            if not in_code_block:
-                self.console.print(char, end="", flush=True)
-                time.sleep(self.animation_speed / 1000)
+        from rich.table import Table
+        table = Table(title="Completion latency (p50 / p95 / p99)", style=self.colors['system'])
+        table.add_column("Model")
+        table.add_column("Metric")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("p99", justify="right")
+        for model, stats in summary.items():
+            first = True
+            for field, values in stats["fields"].items():
+                if field in TIME_FIELDS:
+                    cells = [f"{value * 1000:.0f} ms" for value in values]
+                elif field == "tokens_per_sec":
+                    cells = [f"{value:.1f}" for value in values]
+                else:
+                    cells = [f"{value:.0f}" for value in values]
+                label = f"{model} ({stats['calls']} calls)" if first else ""
+                table.add_row(label, METRIC_FIELDS[field], *cells, end_section=field == list(stats["fields"])[-1])
+                first = False
+        self.console.print()
+        self.console.print(table)
+        for name, state in limiters.items():
+            self.console.print(
+                f"{name}: concurrency {state['concurrency']}, {state['throttled']} throttled, "
+                f"{state['retries']} retries, {state['waited']:.1f}s waiting on rate limits",
+                style=self.colors['system'])
+    
+    def display_conversation_list(self, entries, total, elapsed):
+        """Display saved conversations from the manifest"""
+        if not entries:
+            self.display_system_message("No saved conversations")
+            return
+        
+        from rich.table import Table
+        shown = f"{len(entries)} of {total}" if len(entries) < total else f"{total}"
+        table = Table(title=f"{shown} saved conversations ({elapsed * 1000:.0f} ms)",
+                      style=self.colors['system'])
+        table.add_column("Name")
+        table.add_column("Model")
+        table.add_column("Saved")
+        table.add_column("Turns", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("Title")
+        for entry in entries:
+            saved = (entry.get("timestamp") or "")[:16].replace("T", " ")
+            table.add_row(escape(entry["name"]), escape(entry.get("model") or ""), saved,
+                          str(entry.get("turns", 0)), f"{entry.get('size', 0) / 1024:.1f} KiB",
+                          escape(entry.get("title") or ""))
+        self.console.print()
+        self.console.print(table)
+    
+    def display_recall(self, query, hits, elapsed):
+        """Display the snippets semantic memory recalls for a query"""
+        if not hits:
+            self.display_system_message(f"Nothing recalled for '{escape(query)}'")
+            return
         
-        # Print any remaining buffer
-        if buffer:
-            self.console.print(buffer)
+        from rich.table import Table
+        table = Table(title=f"{len(hits)} snippets recalled for '{escape(query)}' ({elapsed * 1000:.0f} ms)",
+                      style=self.colors['system'])
+        table.add_column("Score", justify="right")
+        table.add_column("Conversation")
+        table.add_column("Message", justify="right")
+        table.add_column("Snippet")
+        for hit in hits:
+            snippet = hit["text"].replace("\n", " ")
+            if len(snippet) > 200:
+                snippet = snippet[:197] + "..."
+            table.add_row(f"{hit['score']:.2f}", escape(hit["source"]), f"{hit['position']} ({hit['role']})",
+                          escape(snippet))
+        self.console.print()
+        self.console.print(table)
+    
+    def display_search_results(self, query, results, elapsed):
+        """Display ranked full-text search hits with matches highlighted"""
+        if not results:
+            self.display_system_message(f"No matches for '{escape(query)}'")
+            return
+        
+        from rich.table import Table
+        table = Table(title=f"{len(results)} matches for '{escape(query)}' ({elapsed * 1000:.0f} ms)",
+                      style=self.colors['system'])
+        table.add_column("Conversation")
+        table.add_column("Turn", justify="right")
+        table.add_column("Snippet")
+        for result in results:
+            snippet = Text()
+            for i, part in enumerate(result["snippet"].replace(MATCH_END, MATCH_START).split(MATCH_START)):
+                # Odd-numbered parts sit between a start and an end marker
+                snippet.append(part.replace("\n", " "), style="bold reverse" if i % 2 else None)
+            table.add_row(escape(result["conversation"]), f"{result['turn']} ({result['role']})", snippet)
+        self.console.print()
+        self.console.print(table)
     
     def display_system_message(self, message):
         """Display system message"""
@@ -162,7 +322,62 @@ class TerminalUI:
         for cmd, desc in commands.items():
             self.console.print(f"  {cmd:<15} - {desc}", style=self.colors['system'])
     
+    def confirm(self, question):
+        """Ask a yes/no question, defaulting to no"""
+        self.console.print(f"\n{question} [y/N] ", style=f"bold {self.colors['system']}", end="")
+        return input().strip().lower() in ("y", "yes")
+    
     def get_user_input(self):
         """Get user input with command history support"""
         self.display_user_input_prompt()
         return input()
+
+
+class ComparisonView:
+    """Live terminal regions that several streams can write into concurrently"""
+    
+    def __init__(self, ui, labels):
+        self.ui = ui
+        self.labels = list(labels)
+        self.texts = {label: [] for label in self.labels}
+        self.status = {label: "waiting" for label in self.labels}
+        self.lock = threading.Lock()
+        from rich.live import Live
+        self.live = Live(get_renderable=self.render, console=ui.console,
+                         refresh_per_second=10, transient=False)
+    
+    def __enter__(self):
+        self.live.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        return self.live.__exit__(*exc_info)
+    
+    def append(self, label, delta):
+        """Append a text delta to a model's region (thread-safe)"""
+        with self.lock:
+            self.texts[label].append(delta)
+            self.status[label] = "streaming"
+    
+    def set_status(self, label, status):
+        """Set the status shown in a model's region title (thread-safe)"""
+        with self.lock:
+            self.status[label] = status
+    
+    def render(self):
+        """Build the renderable for the current state of all regions"""
+        from rich.console import Group
+        from rich.panel import Panel
+        with self.lock:
+            panels = [
+                # Model output is plain text; as markup, "a[i]" would vanish
+                # and a stray "[/bold]" would raise from the Live refresh
+                Panel(
+                    Text("".join(self.texts[label])),
+                    title=escape(f"{label} ({self.status[label]})"),
+                    title_align="left",
+                    border_style=self.ui.colors['ai']
+                )
+                for label in self.labels
+            ]
+        return Group(*panels)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import io
+import os
+
+import pytest
+from rich.console import Console
+
+from benchmarks.mock_server import MockServer, MockSettings
+from terminal_llm_chat.config import Config
+
+@pytest.fixture
+def mock_server():
+    """The benchmark suite's mock provider server on a free port"""
+    with MockServer(MockSettings(reply_tokens=5)) as server:
+        yield server
+
+@pytest.fixture
+def config(tmp_path, mock_server):
+    """A config in a temporary directory with every provider pointed at the mock server"""
+    config = Config(config_dir=str(tmp_path))
+    for name, value in mock_server.base_urls().items():
+        config.set("API", name, value)
+    config.set("API", "API_KEY", "test")
+    config.set("API", "MODEL", "mock-model")
+    config.set("UI", "ENABLE_SOUNDS", "false")
+    config.set("UI", "ANIMATION_SPEED", "0")
+    config.save()
+    os.makedirs(os.path.join(config.config_dir, "conversations"), exist_ok=True)
+    return config
+
+@pytest.fixture
+def ui(config):
+    """A TerminalUI writing to a string; read it with ``ui.console.file.getvalue()``"""
+    from terminal_llm_chat.ui import TerminalUI
+    ui = TerminalUI(config)
+    ui.console = Console(file=io.StringIO(), width=120, color_system=None)
+    return ui
+
+@pytest.fixture
+def session(ui, config):
+    """A ChatSession on the temporary config, closed after the test"""
+    from terminal_llm_chat.chat import ChatSession
+    from terminal_llm_chat.llm import LLMProvider
+    llm = LLMProvider(config)
+    chat = ChatSession(ui, llm, config)
+    yield chat
+    chat.close()
+    llm.close()
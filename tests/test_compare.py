@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+def test_compare_streams_every_model(session):
+    session.add_message("user", "hello")
+    session.cmd_compare(["openai:model-a", "ollama:model-b"])
+    output = session.ui.console.file.getvalue()
+    assert "Comparison summary" in output
+    assert "openai:model-a" in output and "ollama:model-b" in output
+    assert "error" not in output
+
+def test_failing_worker_is_reported_not_raised(session, monkeypatch):
+    session.add_message("user", "hello")
+    real = session.llm.get_completion
+    
+    def get_completion(messages, provider=None, **kwargs):
+        if provider == "ollama":
+            # Streams fine, but lacks the usage the worker reads at the end
+            return iter(["partial"])
+        return real(messages, provider=provider, **kwargs)
+    
+    monkeypatch.setattr(session.llm, "get_completion", get_completion)
+    session.cmd_compare(["openai:model-a", "ollama:model-b"])
+    output = session.ui.console.file.getvalue()
+    assert "Comparison summary" in output
+    assert "error: 'list_iterator' object has no attribute 'usage'" in output
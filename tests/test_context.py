@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+from terminal_llm_chat.context import ContextWindow
+from terminal_llm_chat.tokens import REPLY_OVERHEAD
+
+class FlatCounter:
+    """Ten tokens per message, so budgets are easy to reason about"""
+    
+    def count_message(self, message):
+        return 10
+
+def conversation(turns):
+    messages = [{"role": "system", "content": "system prompt"}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}"})
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+def window(history_tokens, **kwargs):
+    # Room for the system prompt plus history_tokens of history
+    return ContextWindow(FlatCounter(), 0, limit=10 + REPLY_OVERHEAD + history_tokens, **kwargs)
+
+def test_everything_is_sent_while_it_fits():
+    context = window(100)
+    messages = conversation(3)
+    assert context.pack(messages, "m") == messages
+    assert context.last_dropped == 0
+
+def test_newest_messages_are_kept_with_the_system_prompt():
+    context = window(40)
+    messages = conversation(5)
+    packed = context.pack(messages, "m")
+    assert packed == messages[:1] + messages[-4:]
+    assert context.last_sent == 4
+    assert context.last_dropped == 6
+
+def test_window_never_opens_on_an_assistant_reply():
+    context = window(30)
+    messages = conversation(5)
+    packed = context.pack(messages, "m")
+    # Three messages fit, but the oldest would be an answer without its question
+    assert [msg["role"] for msg in packed] == ["system", "user", "assistant"]
+    assert packed[1:] == messages[-2:]
+
+def test_latest_message_is_sent_even_over_budget():
+    context = window(5)
+    messages = conversation(2) + [{"role": "user", "content": "question 2"}]
+    assert context.pack(messages, "m") == [messages[0], messages[-1]]
+
+def test_slack_keeps_the_first_message_for_several_turns():
+    context = window(80, slack=0.5)
+    messages = conversation(4)
+    context.pack(messages, "m")
+    assert context.last_dropped == 0
+    firsts = []
+    for i in range(4, 8):
+        for msg in ({"role": "user", "content": f"question {i}"},
+                    {"role": "assistant", "content": f"answer {i}"}):
+            messages.append(msg)
+            context.append(msg)
+        firsts.append(context.pack(messages, "m")[1]["content"])
+    # Overflowing drops half the budget at once, then the prefix holds
+    assert firsts == ["question 3", "question 3", "question 3", "question 6"]
+
+def test_without_slack_the_window_slides_every_turn():
+    context = window(80)
+    messages = conversation(4)
+    context.pack(messages, "m")
+    firsts = []
+    for i in range(4, 7):
+        for msg in ({"role": "user", "content": f"question {i}"},
+                    {"role": "assistant", "content": f"answer {i}"}):
+            messages.append(msg)
+            context.append(msg)
+        firsts.append(context.pack(messages, "m")[1]["content"])
+    assert firsts == ["question 1", "question 2", "question 3"]
+
+def test_replaced_message_list_is_reindexed():
+    context = window(40)
+    context.pack(conversation(5), "m")
+    loaded = conversation(1)
+    assert context.pack(loaded, "m") == loaded
+
+def test_history_limit_caps_below_the_model_window():
+    context = window(1000, history_limit=20)
+    messages = conversation(5)
+    assert context.pack(messages, "m") == messages[:1] + messages[-2:]
+
+def test_end_packs_a_prefix_without_moving_the_saved_start():
+    context = window(40)
+    messages = conversation(5)
+    packed = context.pack(messages, "m", end=5)
+    assert packed == messages[:1] + messages[1:5]
+    assert "m" not in context.starts
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+
+import pytest
+
+from terminal_llm_chat.failover import CircuitBreaker, hedged_chunks
+
+def attempt(provider, deltas, delay=0.0, release=None):
+    """An attempt streaming ``deltas`` after ``delay`` seconds (or once ``release`` is set)"""
+    def chunks():
+        if release is not None:
+            release.wait(5)
+        elif delay:
+            time.sleep(delay)
+        yield from deltas
+    return provider, f"{provider}-model", lambda: (chunks(), {}, {})
+
+def run(attempts, breaker, hedge_after=0.05):
+    winners = []
+    text = "".join(hedged_chunks(attempts, breaker, hedge_after,
+                                 lambda provider, model, usage, timings: winners.append(provider)))
+    return text, winners
+
+def test_breaker_opens_after_threshold_and_half_opens_after_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record_failure("a")
+    assert breaker.state("a") == "closed"
+    breaker.record_failure("a")
+    assert breaker.state("a") == "open"
+    assert not breaker.allow("a")
+    time.sleep(0.06)
+    assert breaker.state("a") == "half-open"
+    # One trial at a time
+    assert breaker.allow("a")
+    assert not breaker.allow("a")
+    breaker.record_success("a")
+    assert breaker.state("a") == "closed"
+    assert breaker.allow("a")
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure("a")
+    time.sleep(0.06)
+    assert breaker.allow("a")
+    breaker.record_failure("a")
+    assert breaker.state("a") == "open"
+
+def test_first_attempt_answers_without_hedging():
+    breaker = CircuitBreaker()
+    text, winners = run([attempt("a", ["Hel", "lo"]), attempt("b", ["other"])], breaker)
+    assert text == "Hello"
+    assert winners == ["a"]
+
+def test_slow_attempt_is_hedged_and_loses():
+    release = threading.Event()
+    breaker = CircuitBreaker()
+    try:
+        text, winners = run([attempt("a", ["slow"], release=release), attempt("b", ["fast"])], breaker)
+    finally:
+        release.set()
+    assert text == "fast"
+    assert winners == ["b"]
+    assert breaker.state("a") == "closed"
+
+def test_error_before_first_token_fails_over():
+    breaker = CircuitBreaker(threshold=1)
+    text, winners = run([attempt("a", ["ERROR: no key"]), attempt("b", ["ok"])], breaker, hedge_after=10)
+    assert text == "ok"
+    assert winners == ["b"]
+    assert breaker.state("a") == "open"
+
+def test_every_attempt_failing_raises_last_error():
+    breaker = CircuitBreaker()
+    with pytest.raises(RuntimeError, match="second"):
+        run([attempt("a", ["ERROR: first"]), attempt("b", ["ERROR: second"])], breaker, hedge_after=10)
+
+def test_open_circuit_is_skipped():
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure("a")
+    text, winners = run([attempt("a", ["a"]), attempt("b", ["b"])], breaker)
+    assert winners == ["b"]
+
+def test_losing_half_open_trial_does_not_keep_circuit_shut():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure("a")
+    time.sleep(0.02)
+    release = threading.Event()
+    try:
+        # "a" gets the half-open trial, is hedged and loses to "b"
+        text, winners = run([attempt("a", ["slow"], release=release), attempt("b", ["fast"])], breaker)
+    finally:
+        release.set()
+    assert winners == ["b"]
+    assert breaker.allow("a")
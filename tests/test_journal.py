@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+
+import pytest
+
+from terminal_llm_chat.journal import SessionJournal, fcntl
+
+def crash(journal):
+    """Stop a journal's writer without the "end" record, as a crash would"""
+    journal.closed = True
+    journal.queue.put("close")
+    journal.writer.join()
+    journal.file.close()
+
+def wait_for(journal, text):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with open(journal.path, encoding='utf-8') as f:
+            if text in f.read():
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"{text!r} never reached the journal")
+
+def save_snapshot(path, messages):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"model": "m", "messages": messages}, f)
+
+MESSAGES = [
+    {"role": "system", "content": "sys"},
+    {"role": "user", "content": "hello"},
+    {"role": "assistant", "content": "hi there"}
+]
+
+def test_crashed_session_is_found_and_replayed(tmp_path):
+    journal = SessionJournal(str(tmp_path), "m")
+    for msg in MESSAGES:
+        journal.add_message(msg)
+    journal.update_system("new sys")
+    crash(journal)
+    
+    assert SessionJournal.find_unfinished(str(tmp_path)) == [journal.path]
+    data = SessionJournal.replay(journal.path)
+    assert data["model"] == "m"
+    assert [msg["content"] for msg in data["messages"]] == ["new sys", "hello", "hi there"]
+
+def test_clean_exit_is_not_offered_for_recovery(tmp_path):
+    journal = SessionJournal(str(tmp_path), "m")
+    journal.add_message(MESSAGES[1])
+    journal.close()
+    assert SessionJournal.find_unfinished(str(tmp_path)) == []
+
+@pytest.mark.skipif(fcntl is None, reason="needs flock")
+def test_live_session_is_not_offered_for_recovery(tmp_path):
+    journal = SessionJournal(str(tmp_path), "m")
+    try:
+        assert SessionJournal.find_unfinished(str(tmp_path)) == []
+    finally:
+        journal.close()
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = SessionJournal(str(tmp_path), "m")
+    journal.add_message(MESSAGES[1])
+    crash(journal)
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "message", "role": "assis')
+    assert SessionJournal.replay(journal.path)["messages"] == [MESSAGES[1]]
+    SessionJournal.mark_ended(journal.path)
+    assert SessionJournal.find_unfinished(str(tmp_path)) == []
+
+def test_replay_continues_from_snapshot(tmp_path):
+    snapshot = str(tmp_path / "saved.json")
+    save_snapshot(snapshot, MESSAGES)
+    journal = SessionJournal(str(tmp_path / "journal"), "m")
+    for msg in MESSAGES:
+        journal.add_message(msg)
+    journal.compact(snapshot, len(MESSAGES), "m")
+    journal.add_message({"role": "user", "content": "after the save"})
+    crash(journal)
+    
+    data = SessionJournal.replay(journal.path)
+    assert [msg["content"] for msg in data["messages"]] == ["sys", "hello", "hi there", "after the save"]
+
+@pytest.mark.parametrize("change", ["overwrite", "remove"])
+def test_replay_refuses_a_changed_snapshot(tmp_path, change):
+    snapshot = str(tmp_path / "saved.json")
+    save_snapshot(snapshot, MESSAGES)
+    journal = SessionJournal(str(tmp_path / "journal"), "m")
+    journal.compact(snapshot, len(MESSAGES), "m")
+    journal.add_message({"role": "user", "content": "after the save"})
+    crash(journal)
+    
+    if change == "overwrite":
+        save_snapshot(snapshot, [{"role": "user", "content": "another conversation"}])
+    else:
+        os.remove(snapshot)
+    with pytest.raises(ValueError, match="saved.json"):
+        SessionJournal.replay(journal.path)
+
+@pytest.mark.skipif(fcntl is None, reason="needs flock")
+def test_compacted_journal_stays_locked(tmp_path):
+    snapshot = str(tmp_path / "saved.json")
+    save_snapshot(snapshot, MESSAGES)
+    journal = SessionJournal(str(tmp_path / "journal"), "m")
+    try:
+        journal.compact(snapshot, len(MESSAGES), "m")
+        wait_for(journal, '"snapshot"')
+        assert SessionJournal._is_live(journal.path)
+        journal.add_message({"role": "user", "content": "after the save"})
+        wait_for(journal, "after the save")
+    finally:
+        journal.close()
+    assert SessionJournal._last_record(journal.path) == {"type": "end"}
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import os
+import json
+
+def save(config, name, turns):
+    messages = [{"role": "system", "content": "sys"}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} about otters"})
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    with open(os.path.join(config.config_dir, "conversations", name), 'w', encoding='utf-8') as f:
+        json.dump({"model": "mock-model", "messages": messages}, f)
+
+def indexed(session, name):
+    return session.store.db.execute(
+        "SELECT count(*) FROM messages m JOIN conversations c ON c.id = m.conversation_id WHERE c.name = ?",
+        (name,)).fetchone()[0]
+
+def test_load_indexes_once_and_reuses_the_index(session, config):
+    save(config, "long.json", 50)
+    session.cmd_load(["long"])
+    session.finish_indexing(wait=True)
+    assert indexed(session, "long.json") == 100
+    first = session.conversation_id
+    
+    session.cmd_load(["long"])
+    # Unchanged since it was indexed, so nothing runs in the background
+    assert session.store_indexing is None
+    assert session.conversation_id == first
+
+def test_messages_added_while_indexing_are_kept(session, config):
+    save(config, "long.json", 50)
+    session.cmd_load(["long"])
+    session.add_message("user", "a new question about otters")
+    session.finish_indexing(wait=True)
+    assert indexed(session, "long.json") == 101
+    turn, = session.store.db.execute("SELECT turn FROM messages WHERE content = ?",
+                                      ("a new question about otters",)).fetchone()
+    assert turn == 51
+    
+    # Now holding an unsaved message, so the next load indexes it again
+    session.cmd_load(["long"])
+    session.finish_indexing(wait=True)
+    assert indexed(session, "long.json") == 100
+
+def test_load_journals_a_pointer_not_the_messages(session, config):
+    save(config, "long.json", 50)
+    session.cmd_load(["long"])
+    session.add_message("user", "after loading")
+    session.journal.close()
+    with open(session.journal.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record["type"] for record in records] == ["start", "snapshot", "message", "end"]
+    from terminal_llm_chat.journal import SessionJournal
+    assert len(SessionJournal.replay(session.journal.path)["messages"]) == 102
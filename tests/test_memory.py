@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from terminal_llm_chat.memory import HashingVectorizer, SemanticMemory
+
+CONVERSATION = [
+    {"role": "system", "content": "You are helpful."},
+    {"role": "user", "content": "How do I configure the nginx reverse proxy for websockets?"},
+    {"role": "assistant", "content": "Set proxy_http_version 1.1 and the Upgrade and Connection headers."},
+    {"role": "user", "content": "What is a good sourdough hydration?"},
+    {"role": "assistant", "content": "Around 75 percent water to flour is a forgiving start."}
+]
+
+def open_memory(path):
+    return SemanticMemory(str(path), HashingVectorizer(256), chunk_chars=200, top_k=2, min_score=0.1)
+
+def test_vectors_are_normalized_and_deterministic():
+    vectorizer = HashingVectorizer(64)
+    vectors = vectorizer.embed(["nginx websocket proxy", "nginx websocket proxy", ""])
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+def test_index_survives_reopening_and_skips_duplicates(tmp_path):
+    memory = open_memory(tmp_path)
+    memory.add_messages("old.json", CONVERSATION)
+    count = len(memory.index)
+    # The system prompt is not indexed
+    assert count == 4
+    memory.close()
+    
+    memory = open_memory(tmp_path)
+    assert len(memory.index) == count
+    memory.add_messages("copy.json", CONVERSATION)
+    assert len(memory.index) == count
+    hits = memory.recall("nginx websocket headers")
+    assert hits[0]["source"] == "old.json"
+    assert "Upgrade" in hits[0]["text"] or "nginx" in hits[0]["text"]
+    memory.close()
+
+def test_recall_leaves_out_excluded_messages(tmp_path):
+    memory = open_memory(tmp_path)
+    memory.add_messages("old.json", CONVERSATION)
+    excluded = [msg["content"] for msg in CONVERSATION[1:3]]
+    hits = memory.recall("nginx websocket proxy", exclude=excluded, min_score=0)
+    assert all("nginx" not in hit["text"] and "Upgrade" not in hit["text"] for hit in hits)
+    memory.close()
+
+def test_queued_messages_are_indexed_by_close(tmp_path):
+    memory = open_memory(tmp_path)
+    for position, msg in enumerate(CONVERSATION):
+        memory.add_message("session", position, msg["role"], msg["content"])
+    memory.close()
+    assert len(open_memory(tmp_path).index) == 4
+
+def test_recall_output_is_not_read_as_markup(ui):
+    ui.display_recall("[/x]", [], 0.01)
+    ui.display_recall("[/bold]", [{"score": 0.5, "source": "notes[x].json", "position": 3, "role": "user",
+                                   "text": "a[i] and [/bold]"}], 0.01)
+    output = ui.console.file.getvalue()
+    assert "Nothing recalled for '[/x]'" in output
+    assert "notes[x].json" in output
+    assert "a[i] and [/bold]" in output
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+
+import pytest
+
+from terminal_llm_chat.ratelimit import RateLimiter, TokenBucket, backoff_delay, parse_retry_after
+
+def test_oversized_request_leaves_bucket_in_debt():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(100) == 0
+    bucket.take(100)
+    # 40 tokens of debt plus a full bucket's worth, at one token per second
+    assert bucket.wait_time(60) == pytest.approx(100, abs=0.1)
+    bucket.give_back(70)
+    assert bucket.wait_time(60) == pytest.approx(30, abs=0.1)
+
+def test_concurrency_is_halved_by_throttling_and_regrows():
+    limiter = RateLimiter(max_concurrency=8)
+    limiter.throttle()
+    assert limiter.stats()["concurrency"] == 4
+    # Throttles within a second count once
+    limiter.throttle()
+    assert limiter.stats()["concurrency"] == 4
+    # About one more per round of requests at the current limit
+    for _ in range(4 + 5 + 6 + 7):
+        limiter.succeeded()
+    assert limiter.stats()["concurrency"] == 7
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.stats()["concurrency"] == 8
+
+def test_acquire_waits_for_a_slot_and_gives_up_when_cancelled():
+    limiter = RateLimiter(max_concurrency=1)
+    assert limiter.acquire()
+    cancel = threading.Event()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire(cancel)))
+    waiter.start()
+    time.sleep(0.05)
+    assert waiter.is_alive()
+    cancel.set()
+    waiter.join(2)
+    assert results == [False]
+    limiter.release()
+    assert limiter.stats()["active"] == 0
+
+def test_retry_after_pauses_every_caller():
+    limiter = RateLimiter()
+    limiter.throttle(retry_after=0.2)
+    start = time.monotonic()
+    assert limiter.wait_turn(1)
+    assert time.monotonic() - start >= 0.15
+    cancel = threading.Event()
+    cancel.set()
+    limiter.throttle(retry_after=5)
+    assert not limiter.wait_turn(1, cancel)
+
+def test_retries_are_counted_from_many_threads():
+    limiter = RateLimiter()
+    
+    def retry():
+        for _ in range(1000):
+            limiter.record_retry()
+    
+    threads = [threading.Thread(target=retry) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.stats()["retries"] == 8000
+
+def test_retry_after_parsing_and_backoff():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert 0 <= backoff_delay(3, 0.5, 2.0) <= 2.0
+    assert backoff_delay(0, 0.5, 2.0, retry_after=3) >= 3
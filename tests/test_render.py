@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import io
+
+import pytest
+from rich.console import Console
+
+from terminal_llm_chat.render import StreamingMarkdown, pump_stream
+
+def render(deltas, **kwargs):
+    console = Console(file=io.StringIO(), width=80, color_system=None)
+    with StreamingMarkdown(console, **kwargs) as renderer:
+        pump_stream(iter(deltas), renderer, frame_budget=0.001)
+    return renderer, console.file.getvalue()
+
+def test_blocks_split_across_deltas_render_once():
+    text = "# Title\n\nSome *text* that\ncontinues.\n\n```python\nprint('hi')\n```\n\n- one\n- two\n"
+    # Deltas cut through lines, fences and list markers
+    renderer, output = render([text[i:i + 3] for i in range(0, len(text), 3)])
+    assert renderer.text == text
+    assert output.count("Title") == 1
+    assert output.count("print('hi')") == 1
+    assert "one" in output and "two" in output
+    assert "```" not in output
+
+def test_unterminated_block_is_flushed_at_the_end():
+    renderer, output = render(["last line ", "without newline"])
+    assert "last line without newline" in output
+
+def test_frame_cap_does_not_drop_text():
+    renderer, output = render(["word "] * 200, max_fps=1)
+    assert renderer.text == "word " * 200
+    assert output.count("word") == 200
+
+def test_stream_error_is_raised_after_the_text_before_it():
+    def chunks():
+        yield "partial reply"
+        raise RuntimeError("connection reset")
+    
+    console = Console(file=io.StringIO(), width=80, color_system=None)
+    renderer = StreamingMarkdown(console)
+    with pytest.raises(RuntimeError, match="connection reset"):
+        with renderer:
+            pump_stream(chunks(), renderer, frame_budget=0.001)
+    assert renderer.text == "partial reply"
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import os
+import json
+
+def save(config, name, messages):
+    path = os.path.join(config.config_dir, "conversations", name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"model": "mock-model", "messages": messages}, f)
+
+def output(ui):
+    return ui.console.file.getvalue()
+
+def test_search_numbers_hits_by_user_turn(session, config):
+    save(config, "old.json", [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "first answer"},
+        {"role": "user", "content": "ask about pelicans"},
+        {"role": "assistant", "content": "pelicans are birds"}
+    ])
+    session.cmd_search(["pelicans"])
+    lines = [line for line in output(session.ui).splitlines() if "old.json" in line]
+    assert any("2 (user)" in line for line in lines)
+    assert any("2 (assistant)" in line for line in lines)
+
+def test_query_is_not_read_as_markup(session):
+    session.cmd_search(["[/bold]"])
+    assert "No matches for '[/bold]'" in output(session.ui)
+
+def test_conversation_name_is_not_read_as_markup(session, config):
+    save(config, "notes[x].json", [{"role": "user", "content": "zebra crossing"}])
+    session.cmd_search(["zebra"])
+    assert "notes[x].json" in output(session.ui)
+
+def test_second_session_on_the_same_store_keeps_search(session, ui, config):
+    from terminal_llm_chat.chat import ChatSession
+    from terminal_llm_chat.llm import LLMProvider
+    session.add_message("user", "an idle first session")
+    llm = LLMProvider(config)
+    other = ChatSession(ui, llm, config)
+    try:
+        assert other.store is not None
+        other.add_message("user", "written by the second session")
+        other.cmd_search(["second"])
+        assert "matches for 'second'" in output(ui)
+    finally:
+        other.close()
+        llm.close()
+
+def test_sessions_without_messages_leave_no_conversation(session, ui, config):
+    from terminal_llm_chat.chat import ChatSession
+    from terminal_llm_chat.llm import LLMProvider
+    llm = LLMProvider(config)
+    ChatSession(ui, llm, config).close()
+    llm.close()
+    assert session.store.db.execute("SELECT count(*) FROM conversations").fetchone()[0] == 0
+    session.add_message("user", "now there is something to index")
+    assert session.store.db.execute("SELECT name FROM conversations").fetchall() == [(session.store_name,)]